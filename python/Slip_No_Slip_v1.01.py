@@ -6,8 +6,12 @@ import webbrowser
 import datetime
 import platform
 import os
+import shutil
 from tkinter.scrolledtext import ScrolledText
 
+import slip_model
+from slip_gui_worker import BackgroundRunner, Cancelled
+
 # MIT License text
 MIT_LICENSE = """MIT License
 
@@ -31,11 +35,16 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.""".format(datetime.datetime.now().year)
 
-VERSION = "1.01"
+VERSION = slip_model.VERSION
 AUTHOR = "Le Lu"
 EMAIL = "lulelaboratory@gmail.com"
 APP_NAME = "Slip/No-Slip Estimator"
 
+# Live recalculation waits this long after the last keystroke (ms)
+LIVE_DELAY_MS = 300
+# Jobs shorter than this never show the progress bar (ms)
+BUSY_DELAY_MS = 200
+
 # Color scheme for a professional look
 COLORS = {
     "primary": "#1976d2",      # Primary blue
@@ -51,45 +60,67 @@ COLORS = {
     "card": "#ffffff",         # White for card backgrounds
 }
 
-def calculate():
+def read_inputs():
+    """Read the six model inputs from the Entry fields"""
+    return {name: float(entry.get()) for name, entry in input_entries.items()}
+
+def calculate(live=False):
+    """Start a calculation on the background worker; live calculations stay quiet about bad input"""
+    global live_after_id
+    live_after_id = None
     try:
-        # Show calculation in progress
-        status_var.set("Calculating...")
-        root.update_idletasks()
-        
         # Read input values from the GUI
-        gap_nm = float(gap_entry.get())
-        gap_m = gap_nm * 1e-9  # convert nm to m
-        sliding_speed = float(speed_entry.get())
-        mu = float(viscosity_entry.get())
-        lambda_friction = float(friction_entry.get())
-        # New parameters for shear-dependent slip length
-        gamma_crit = float(crit_shear_entry.get())
-        exponent = float(exp_entry.get())
-        
-        # Calculate shear rate (1/s): γ = U / h
-        shear_rate = sliding_speed / gap_m
-        
-        # Calculate shear stress (Pa): τ = μ × γ
-        shear_stress = mu * shear_rate
-        
-        # Baseline slip length (m) at low shear: b₀ = μ / λ
-        b0 = mu / lambda_friction
-        
-        # Effective slip length (m) including sliding (shear) effect:
-        # bₑff = b₀ * [1 + (γ / γ_c)^m]
-        b_eff = b0 * (1 + (shear_rate / gamma_crit)**exponent)
+        inputs = read_inputs()
+    except ValueError as e:
+        if live:
+            # Typing is still in progress (e.g. "1e"); wait for a valid number
+            status_var.set("Waiting for valid input...")
+        else:
+            messagebox.showerror("Error", f"Calculation error: {str(e)}")
+            status_var.set("Error occurred during calculation")
+            rec_label.config(text="")
+        return
+
+    # Show calculation in progress
+    status_var.set("Calculating...")
+
+    # The text report repeats the inputs as they were typed, as v1.01's export did
+    texts = {name: entry.get() for name, entry in input_entries.items()}
+
+    # Run the headless model: γ = U / h, τ = μ × γ, b₀ = μ / λ, bₑff = b₀ [1 + (γ / γ_c)^m]
+    runner.submit(lambda job: slip_model.evaluate(**inputs), on_done=lambda result: show_result(result, texts),
+                  on_error=live_calculation_error if live else calculation_error)
+
+def live_calculation_error(e):
+    status_var.set(f"Cannot calculate: {str(e)}")
+
+def calculation_error(e):
+    # Handle errors
+    messagebox.showerror("Error", f"Calculation error: {str(e)}")
+    status_var.set("Error occurred during calculation")
+    rec_label.config(text="")
+
+def show_result(result, texts=None):
+    """Display a SlipResult in the results panel; texts are the Entry strings it was calculated from"""
+    global last_result, last_texts
+    last_result = result
+    last_texts = texts or {}
+    try:
+        sliding_speed = result.sliding_speed
+        gap_m = result.gap_m
+        shear_rate = result.shear_rate
+        shear_stress = result.shear_stress
+        b0 = result.b0
+        b_eff = result.b_eff
+        ratio = result.ratio
         
         # Compare effective slip length to gap height to decide on boundary condition
-        ratio = b_eff / gap_m
-        if ratio < 0.01:
-            recommendation = "No-slip condition is appropriate"
-            rec_label.config(fg=COLORS["success"])
-            cfd_suggestion = "For CFD simulation: Use a no-slip boundary condition (e.g., u = 0 at the wall)."
-        else:
-            recommendation = "Slip condition should be considered"
+        recommendation = slip_model.recommendation(ratio)
+        cfd_suggestion = slip_model.cfd_suggestion(ratio, b_eff)
+        if result.slip:
             rec_label.config(fg=COLORS["error"])
-            cfd_suggestion = f"For CFD simulation: Use a Navier slip boundary condition with a slip length of {b_eff:.3e} m."
+        else:
+            rec_label.config(fg=COLORS["success"])
         
         # Clear previous results
         results_text.config(state=tk.NORMAL)
@@ -123,10 +154,10 @@ def calculate():
         results_text.insert(tk.END, "RECOMMENDATION\n", "heading")
         results_text.insert(tk.END, "═" * 50 + "\n\n", "separator")
         
-        if ratio < 0.01:
-            results_text.insert(tk.END, recommendation + "\n\n", "recommend_noslip")
-        else:
+        if result.slip:
             results_text.insert(tk.END, recommendation + "\n\n", "recommend_slip")
+        else:
+            results_text.insert(tk.END, recommendation + "\n\n", "recommend_noslip")
             
         results_text.insert(tk.END, cfd_suggestion + "\n", "cfd_suggestion")
         
@@ -135,14 +166,64 @@ def calculate():
         # Update recommendation label
         rec_label.config(text=recommendation)
         
+        # Move the regime map to the new operating point
+        if regime_map is not None:
+            regime_map.set_inputs({name: getattr(result, name) for name in slip_model.INPUT_NAMES})
+        
         # Update status
         status_var.set("Ready - Last calculation: " + datetime.datetime.now().strftime("%H:%M:%S"))
         
     except Exception as e:
-        # Handle errors
-        messagebox.showerror("Error", f"Calculation error: {str(e)}")
-        status_var.set("Error occurred during calculation")
-        rec_label.config(text="")
+        calculation_error(e)
+
+def schedule_live_calculation(*args):
+    """Recalculate shortly after the last keystroke in an input field"""
+    global live_after_id
+    if live_after_id is not None:
+        root.after_cancel(live_after_id)
+    live_after_id = root.after(LIVE_DELAY_MS, lambda: calculate(live=True))
+
+def any_busy():
+    return runner.busy or analysis_runner.busy or export_runner.busy
+
+def update_busy(*args):
+    """Show the progress bar and Cancel button while a background job runs"""
+    if any_busy():
+        # Quick jobs finish before the indicator would appear; avoid flicker
+        root.after(BUSY_DELAY_MS, show_busy)
+    else:
+        progress_bar.stop()
+        progress_bar.pack_forget()
+        cancel_button.pack_forget()
+
+def show_busy():
+    if any_busy() and not progress_bar.winfo_ismapped():
+        progress_bar.config(mode="indeterminate", value=0)
+        progress_bar.start(15)
+        progress_bar.pack(side=tk.LEFT, padx=(5, 0), before=license_label)
+        cancel_button.pack(side=tk.LEFT, padx=(5, 0), before=license_label)
+
+def show_progress(done, total):
+    """Progress callback of background jobs"""
+    if total:
+        progress_bar.stop()
+        progress_bar.config(mode="determinate", maximum=total, value=done)
+
+def cancel_job():
+    runner.cancel()
+    analysis_runner.cancel()
+    export_runner.cancel()
+    status_var.set("Cancelled")
+
+def submit_analysis(title, status, func, on_done, on_error, parent=None):
+    """Run an analysis on analysis_runner; one still running is only cancelled if the user agrees"""
+    global analysis_title
+    if analysis_runner.busy and not messagebox.askyesno(
+            title, f"{analysis_title} is still running. Cancel it and start {title}?", parent=parent):
+        return None
+    analysis_title = title
+    status_var.set(status)
+    return analysis_runner.submit(func, on_done=on_done, on_error=on_error, on_progress=show_progress)
 
 def show_methodology():
     # HTML content for the methodology page with MathJax and MLA references
@@ -348,77 +429,426 @@ def create_tooltip(widget, text):
     widget.bind("<Enter>", enter)
     widget.bind("<Leave>", leave)
 
+# File types offered by the export dialogs; all but the text report need NumPy
+EXPORT_FILETYPES = [("Text report", "*.txt"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl"),
+                    ("Parquet", "*.parquet"), ("Arrow", "*.arrow"), ("HDF5", "*.h5"), ("All files", "*.*")]
+
+def export_data(data, rows, default_extension=".txt", **report):
+    """Ask for a file name and export results there on the background worker (report keywords go to
+    slip_export.format_report)"""
+    import slip_export
+
+    if export_runner.busy:
+        # Exports have a runner of their own, so that no other job can cut a file short
+        messagebox.showinfo("Export Results", "An export is still running. Wait for it to finish or cancel it.")
+        return
+    filename = filedialog.asksaveasfilename(defaultextension=default_extension, filetypes=EXPORT_FILETYPES,
+                                            title="Export Results")
+    if not filename:  # User cancelled
+        return
+
+    def done(count):
+        status_var.set(f"Ready - Exported {count:,} rows to {os.path.basename(filename)}")
+        messagebox.showinfo("Export Complete", f"Results exported successfully to:\n{filename}")
+
+    def error(e):
+        messagebox.showerror("Export Error", f"Error exporting results: {str(e)}")
+        status_var.set("Error occurred during export")
+
+    def write(job):
+        try:
+            return slip_export.export(filename, data, author=f"{AUTHOR} ({EMAIL})", app_name=APP_NAME,
+                                      progress=lambda n: job.progress(n, rows), **report)
+        except Cancelled:
+            # Do not leave a truncated file behind (.store exports are directories)
+            if os.path.isdir(filename):
+                shutil.rmtree(filename, ignore_errors=True)
+            elif os.path.exists(filename):
+                os.remove(filename)
+            raise
+
+    status_var.set(f"Exporting to {os.path.basename(filename)}...")
+    export_runner.submit(write, on_done=done, on_error=error, on_progress=show_progress)
+
 def export_results():
-    """Export the calculation results to a text file"""
-    if not results_text.get(1.0, tk.END).strip():
+    """Export the last calculated SlipResult (not the widget text)"""
+    if last_result is None:
         messagebox.showinfo("Export Results", "No results to export.")
         return
-        
+    export_data(last_result, 1, inputs=last_texts)
+
+def cached_call(func, *args, **kwargs):
+    """Run func through the analysis cache (slip_cache); returns (result, True if it came from the cache)"""
+    import slip_cache
+
+    cache = slip_cache.get_cache()
+    result = cache.call(func, *args, **kwargs)
+    return result, cache.last_hit
+
+def finished_status(label, cached):
+    """Status line after an analysis, noting results reused from the cache"""
+    status_var.set(f"Ready - Last {label}: " + datetime.datetime.now().strftime("%H:%M:%S")
+                   + (" (cached)" if cached else ""))
+
+def show_cache_stats():
+    """Cache dialog: hit/miss statistics of the analysis cache, with a button to clear it"""
     try:
-        # Get filename from user
-        filename = tk.filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
-            title="Export Results"
-        )
-        
-        if not filename:  # User cancelled
+        import slip_cache
+    except ImportError:
+        messagebox.showerror("Analysis Cache", "The analysis cache requires NumPy (pip install numpy).")
+        return
+    cache = slip_cache.get_cache()
+
+    cache_window = tk.Toplevel(root)
+    cache_window.title("Analysis Cache")
+    cache_window.geometry("560x300")
+    cache_window.transient(root)
+
+    frame = ttk.Frame(cache_window, padding="20")
+    frame.pack(fill=tk.BOTH, expand=True)
+    ttk.Label(frame, text="Analysis Cache", style="Subheader.TLabel").pack(anchor="w")
+    ttk.Label(frame, text=cache.path if cache.enabled else "Disabled (SLIP_CACHE=off)",
+              foreground=COLORS["text_secondary"], font=("Segoe UI", 9)).pack(anchor="w", pady=(0, 10))
+    output = ScrolledText(frame, height=6, wrap=tk.WORD, font=("Consolas", 9))
+    output.pack(fill=tk.BOTH, expand=True)
+
+    def refresh():
+        output.delete(1.0, tk.END)
+        output.insert(tk.END, slip_cache.format_stats(cache.stats(), cache.totals()))
+
+    def clear():
+        cache.clear()
+        refresh()
+        status_var.set("Analysis cache cleared")
+
+    buttons = ttk.Frame(frame)
+    buttons.pack(fill=tk.X, pady=(10, 0))
+    ttk.Button(buttons, text="Clear Cache", command=clear).pack(side=tk.LEFT)
+    ttk.Button(buttons, text="Refresh", command=refresh, style="Accent.TButton").pack(side=tk.RIGHT)
+    refresh()
+
+def show_monte_carlo():
+    """Monte Carlo dialog: propagate input distributions through the model"""
+    try:
+        import slip_montecarlo
+    except ImportError:
+        messagebox.showerror("Monte Carlo", "Monte Carlo analysis requires NumPy (pip install numpy).")
+        return
+
+    mc_window = tk.Toplevel(root)
+    mc_window.title("Monte Carlo Uncertainty")
+    mc_window.geometry("640x600")
+    mc_window.transient(root)
+
+    frame = ttk.Frame(mc_window, padding="20")
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    ttk.Label(frame, text="Input Distributions", style="Subheader.TLabel").grid(row=0, column=0, columnspan=2, sticky="W")
+    ttk.Label(frame,
+              text="VALUE, uniform:LO:HI, loguniform:LO:HI, lognormal:MEDIAN:SIGMA_DECADES, hist:FILE.csv",
+              foreground=COLORS["text_secondary"], font=("Segoe UI", 9)).grid(row=1, column=0, columnspan=2, sticky="W", pady=(0, 10))
+
+    spec_entries = {}
+    for i, name in enumerate(slip_model.INPUT_NAMES):
+        ttk.Label(frame, text=slip_model.INPUT_LABELS[name] + ":").grid(row=i + 2, column=0, sticky="W", pady=4)
+        entry = ttk.Entry(frame, width=30, font=("Segoe UI", 10))
+        entry.insert(0, input_entries[name].get())
+        entry.grid(row=i + 2, column=1, sticky="EW", pady=4, padx=(10, 0))
+        spec_entries[name] = entry
+    # Friction is rarely known better than to an order of magnitude
+    spec_entries["lambda_friction"].delete(0, tk.END)
+    spec_entries["lambda_friction"].insert(0, "loguniform:1e6:1e8")
+
+    row = len(slip_model.INPUT_NAMES) + 2
+    ttk.Label(frame, text="Samples:").grid(row=row, column=0, sticky="W", pady=4)
+    samples_entry = ttk.Entry(frame, width=30, font=("Segoe UI", 10))
+    samples_entry.insert(0, "1e6")
+    samples_entry.grid(row=row, column=1, sticky="EW", pady=4, padx=(10, 0))
+    frame.columnconfigure(1, weight=1)
+
+    output = ScrolledText(frame, height=10, wrap=tk.WORD, font=("Consolas", 9))
+    output.grid(row=row + 2, column=0, columnspan=2, sticky="NSEW", pady=(10, 0))
+    frame.rowconfigure(row + 2, weight=1)
+
+    def run():
+        try:
+            distributions = {name: slip_montecarlo.parse_distribution(entry.get())
+                             for name, entry in spec_entries.items()}
+            samples = int(float(samples_entry.get()))
+        except Exception as e:
+            messagebox.showerror("Monte Carlo", f"Monte Carlo error: {str(e)}", parent=mc_window)
             return
-            
-        # Prepare export content
-        export_content = (
-            f"{APP_NAME} - Results Export\n"
-            f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"Version: {VERSION}\n"
-            f"Author: {AUTHOR} ({EMAIL})\n"
-            f"{'=' * 50}\n\n"
-        )
-        
-        # Add input parameters - use ASCII-compatible alternatives for special characters
-        export_content += "INPUT PARAMETERS:\n"
-        export_content += f"Gap Height: {gap_entry.get()} nm\n"
-        export_content += f"Sliding Speed: {speed_entry.get()} m/s\n"
-        export_content += f"Water Viscosity: {viscosity_entry.get()} Pa·s\n"
-        export_content += f"Interfacial Friction: {friction_entry.get()} Pa·s/m\n"
-        export_content += f"Critical Shear Rate: {crit_shear_entry.get()} 1/s\n"
-        export_content += f"Exponent (m): {exp_entry.get()}\n\n"
-        
-        # Add calculation results (plain text without formatting)
-        export_content += "CALCULATION RESULTS:\n"
-        # Get text without tags
-        result_text = results_text.get(1.0, tk.END)
-        export_content += result_text
-        
-        # Write to file with explicit UTF-8 encoding
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(export_content)
-            
-        messagebox.showinfo("Export Complete", f"Results exported successfully to:\n{filename}")
-        
-    except Exception as e:
-        messagebox.showerror("Export Error", f"Error exporting results: {str(e)}")
-        # Add fallback export with simplified ASCII if encoding was the issue
-        if 'codec' in str(e).lower() or 'encoding' in str(e).lower():
-            try:
-                # Ask user if they want to try with simplified ASCII instead
-                if messagebox.askyesno("Encoding Error", 
-                                        "There was an encoding error. Would you like to try exporting with simplified characters?"):
-                    # Replace Unicode characters with ASCII alternatives
-                    simplified_content = export_content.replace("μ", "u")
-                    simplified_content = simplified_content.replace("λ", "lambda")
-                    simplified_content = simplified_content.replace("γ", "gamma")
-                    simplified_content = simplified_content.replace("₀", "0")
-                    simplified_content = simplified_content.replace("ₑff", "eff")
-                    simplified_content = simplified_content.replace("·", ".")
-                    
-                    # Write with simplified content
-                    with open(filename, 'w', encoding='ascii', errors='replace') as f:
-                        f.write(simplified_content)
-                    
-                    messagebox.showinfo("Export Complete", 
-                                        f"Results exported with simplified characters to:\n{filename}")
-            except Exception as ex:
-                messagebox.showerror("Export Error", f"Could not export with simplified characters: {str(ex)}")
+        submit_analysis(
+            "Monte Carlo", "Running Monte Carlo...",
+            lambda job: cached_call(slip_montecarlo.run_monte_carlo, distributions, samples,
+                                    progress=lambda n: job.progress(n, samples)),
+            show_summary, show_error, parent=mc_window)
+
+    def show_summary(outcome):
+        summary, cached = outcome
+        if not output.winfo_exists():
+            return
+        output.delete(1.0, tk.END)
+        output.insert(tk.END, slip_montecarlo.format_report(summary.report()))
+        finished_status("Monte Carlo run", cached)
+
+    def show_error(e):
+        messagebox.showerror("Monte Carlo", f"Monte Carlo error: {str(e)}",
+                             parent=mc_window if mc_window.winfo_exists() else root)
+        status_var.set("Error occurred during Monte Carlo analysis")
+
+    ttk.Button(frame, text="Run", command=run, style="Accent.TButton").grid(row=row + 1, column=0, columnspan=2, pady=(10, 0))
+
+def show_fit():
+    """Fit dialog: fit λ, γc and m to measured slip lengths and load them into the inputs"""
+    try:
+        import slip_fit
+    except ImportError:
+        messagebox.showerror("Fit Slip-Length Data", "Fitting requires NumPy (pip install numpy).")
+        return
+
+    fit_window = tk.Toplevel(root)
+    fit_window.title("Fit Slip-Length Data")
+    fit_window.geometry("760x560")
+    fit_window.transient(root)
+
+    frame = ttk.Frame(fit_window, padding="20")
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    ttk.Label(frame, text="Measured Slip Lengths", style="Subheader.TLabel").grid(row=0, column=0, columnspan=3, sticky="W")
+    ttk.Label(frame,
+              text="CSV/Parquet table with columns shear_rate (1/s), b_eff (m) and optionally a numeric dataset id",
+              foreground=COLORS["text_secondary"], font=("Segoe UI", 9)).grid(row=1, column=0, columnspan=3, sticky="W", pady=(0, 10))
+
+    ttk.Label(frame, text="Data file:").grid(row=2, column=0, sticky="W", pady=4)
+    path_entry = ttk.Entry(frame, width=50, font=("Segoe UI", 10))
+    path_entry.grid(row=2, column=1, sticky="EW", pady=4, padx=(10, 5))
+
+    def browse():
+        path = filedialog.askopenfilename(
+            parent=fit_window, title="Open Slip-Length Data",
+            filetypes=[("Tables", "*.csv *.parquet *.store"), ("All files", "*.*")])
+        if path:
+            path_entry.delete(0, tk.END)
+            path_entry.insert(0, path)
+
+    ttk.Button(frame, text="Browse...", command=browse).grid(row=2, column=2, pady=4)
+    ttk.Label(frame, text="Bootstrap replicates:").grid(row=3, column=0, sticky="W", pady=4)
+    bootstrap_entry = ttk.Entry(frame, width=50, font=("Segoe UI", 10))
+    bootstrap_entry.insert(0, "200")
+    bootstrap_entry.grid(row=3, column=1, sticky="EW", pady=4, padx=(10, 5))
+    frame.columnconfigure(1, weight=1)
+
+    output = ScrolledText(frame, height=12, wrap=tk.NONE, font=("Consolas", 9))
+    output.grid(row=5, column=0, columnspan=3, sticky="NSEW", pady=(10, 0))
+    frame.rowconfigure(5, weight=1)
+
+    controls = ttk.Frame(frame)
+    controls.grid(row=6, column=0, columnspan=3, sticky="EW", pady=(10, 0))
+    ttk.Label(controls, text="Dataset:").pack(side=tk.LEFT)
+    dataset_var = tk.StringVar()
+    dataset_box = ttk.Combobox(controls, textvariable=dataset_var, state="readonly", width=12)
+    dataset_box.pack(side=tk.LEFT, padx=(5, 10))
+    fitted = {}
+
+    def run():
+        try:
+            mu = float(input_entries["mu"].get())
+            bootstrap = int(float(bootstrap_entry.get()))
+            dataset, shear_rate, b_eff = slip_fit.read_datasets(path_entry.get())
+        except Exception as e:
+            messagebox.showerror("Fit Slip-Length Data", f"Fit error: {str(e)}", parent=fit_window)
+            return
+        submit_analysis(
+            "Fit Slip-Length Data", "Fitting slip-length data...",
+            lambda job: cached_call(slip_fit.fit_datasets, shear_rate, b_eff, dataset, mu=mu, bootstrap=bootstrap,
+                                    progress=lambda n: job.progress(n, bootstrap)),
+            show_fits, show_error, parent=fit_window)
+
+    def show_fits(outcome):
+        fits, cached = outcome
+        if not output.winfo_exists():
+            return
+        output.delete(1.0, tk.END)
+        output.insert(tk.END, slip_fit.format_fits(fits, limit=200))
+        fitted.clear()
+        fitted.update({f"{fit['dataset']:g}": fit for fit in fits})
+        dataset_box["values"] = list(fitted)
+        if fitted:
+            dataset_var.set(next(iter(fitted)))
+        finished_status("fit", cached)
+
+    def show_error(e):
+        messagebox.showerror("Fit Slip-Length Data", f"Fit error: {str(e)}",
+                             parent=fit_window if fit_window.winfo_exists() else root)
+        status_var.set("Error occurred during fitting")
+
+    def use_fit():
+        fit = fitted.get(dataset_var.get())
+        if fit is None:
+            return
+        # μ stays as entered; λ was derived from it. Live recompute does the rest
+        for name in ("lambda_friction", "gamma_crit", "exponent"):
+            input_entries[name].delete(0, tk.END)
+            input_entries[name].insert(0, f"{fit[name]:.6g}")
+
+    ttk.Button(controls, text="Use Fitted Values", command=use_fit).pack(side=tk.LEFT)
+    ttk.Button(frame, text="Fit", command=run, style="Accent.TButton").grid(row=4, column=0, columnspan=3, pady=(10, 0))
+
+def show_green_kubo():
+    """Green–Kubo dialog: λ from an MD wall-force trajectory, loaded into the inputs"""
+    try:
+        import slip_greenkubo
+    except ImportError:
+        messagebox.showerror("Green–Kubo Friction", "Green–Kubo analysis requires NumPy (pip install numpy).")
+        return
+
+    gk_window = tk.Toplevel(root)
+    gk_window.title("Green–Kubo Friction")
+    gk_window.geometry("640x560")
+    gk_window.transient(root)
+
+    frame = ttk.Frame(gk_window, padding="20")
+    frame.pack(fill=tk.BOTH, expand=True)
+
+    ttk.Label(frame, text="Wall-Force Trajectory", style="Subheader.TLabel").grid(row=0, column=0, columnspan=3, sticky="W")
+    ttk.Label(frame,
+              text="Text (0-based column indices), .npy or raw binary (set fields), or CSV/Parquet (column names)",
+              foreground=COLORS["text_secondary"], font=("Segoe UI", 9)).grid(row=1, column=0, columnspan=3, sticky="W", pady=(0, 10))
+
+    fields = [("path", "Trajectory file:", ""),
+              ("columns", "Force columns:", "1,2"),
+              ("timestep", "Time step (s):", "1e-15"),
+              ("area", "Wall area (m²):", "1e-17"),
+              ("temperature", "Temperature (K):", "300"),
+              ("force_scale", "Force scale (N per unit):", "1"),
+              ("max_lag", "Max lag (samples):", "2000"),
+              ("fields", "Binary fields per sample:", "")]
+    entries = {}
+    for i, (name, label, value) in enumerate(fields):
+        ttk.Label(frame, text=label).grid(row=i + 2, column=0, sticky="W", pady=4)
+        entry = ttk.Entry(frame, width=40, font=("Segoe UI", 10))
+        entry.insert(0, value)
+        entry.grid(row=i + 2, column=1, sticky="EW", pady=4, padx=(10, 5))
+        entries[name] = entry
+    frame.columnconfigure(1, weight=1)
+
+    def browse():
+        path = filedialog.askopenfilename(parent=gk_window, title="Open Force Trajectory")
+        if path:
+            entries["path"].delete(0, tk.END)
+            entries["path"].insert(0, path)
+
+    ttk.Button(frame, text="Browse...", command=browse).grid(row=2, column=2, pady=4)
+
+    row = len(fields) + 2
+    output = ScrolledText(frame, height=8, wrap=tk.WORD, font=("Consolas", 9))
+    output.grid(row=row + 1, column=0, columnspan=3, sticky="NSEW", pady=(10, 0))
+    frame.rowconfigure(row + 1, weight=1)
+    estimate = {}
+
+    def run():
+        try:
+            path = entries["path"].get()
+            values = {name: float(entries[name].get()) for name in ("timestep", "area", "temperature", "force_scale")}
+            max_lag = int(float(entries["max_lag"].get()))
+            binary_fields = int(entries["fields"].get()) if entries["fields"].get().strip() else None
+            columns = entries["columns"].get()
+            size = os.path.getsize(path)
+        except Exception as e:
+            messagebox.showerror("Green–Kubo Friction", f"Green–Kubo error: {str(e)}", parent=gk_window)
+            return
+
+        def correlate(job):
+            # Two passes over the file: the mean force first, so λ does not depend on the chunk size
+            mean = slip_greenkubo.mean_force(slip_greenkubo.iter_forces(path, columns, fields=binary_fields),
+                                             progress=lambda n: job.progress(n))
+            return slip_greenkubo.run_green_kubo(slip_greenkubo.iter_forces(path, columns, fields=binary_fields),
+                                                 max_lag=max_lag, mean=mean, progress=lambda n: job.progress(n),
+                                                 **values)
+
+        submit_analysis(
+            "Green–Kubo Friction", f"Correlating wall forces ({size / 1e6:,.0f} MB)...",
+            correlate, show_estimate, show_error, parent=gk_window)
+
+    def show_estimate(result):
+        if not output.winfo_exists():
+            return
+        estimate.update(result)
+        output.delete(1.0, tk.END)
+        output.insert(tk.END, slip_greenkubo.format_result(result))
+        status_var.set("Ready - Last Green–Kubo run: " + datetime.datetime.now().strftime("%H:%M:%S"))
+
+    def show_error(e):
+        messagebox.showerror("Green–Kubo Friction", f"Green–Kubo error: {str(e)}",
+                             parent=gk_window if gk_window.winfo_exists() else root)
+        status_var.set("Error occurred during Green–Kubo analysis")
+
+    def use_estimate():
+        if "lambda_friction" in estimate:
+            input_entries["lambda_friction"].delete(0, tk.END)
+            input_entries["lambda_friction"].insert(0, f"{estimate['lambda_friction']:.6g}")
+
+    buttons = ttk.Frame(frame)
+    buttons.grid(row=row, column=0, columnspan=3, pady=(10, 0))
+    ttk.Button(buttons, text="Run", command=run, style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+    ttk.Button(buttons, text="Use λ", command=use_estimate).pack(side=tk.LEFT, padx=5)
+
+def open_batch():
+    """Evaluate a CSV/Parquet/store table of inputs and show the results in a table"""
+    try:
+        import slip_table
+    except ImportError:
+        messagebox.showerror("Batch Results", "Batch results require NumPy (pip install numpy).")
+        return
+    path = filedialog.askopenfilename(
+        title="Open Batch Inputs",
+        filetypes=[("Tables", "*.csv *.parquet *.store"), ("All files", "*.*")])
+    if not path:
+        return
+    try:
+        # Columns missing from the file take the values of the Entry fields
+        defaults = read_inputs()
+    except ValueError:
+        defaults = None
+
+    def show_error(e):
+        messagebox.showerror("Batch Results", f"Could not evaluate batch: {str(e)}")
+        status_var.set("Error occurred while evaluating batch")
+
+    submit_analysis(
+        "Batch Results", f"Evaluating {os.path.basename(path)}...",
+        lambda job: slip_table.ResultTable.from_file(path, defaults, progress=lambda n: job.progress(n)),
+        lambda table: show_batch_results(table, os.path.basename(path)), show_error)
+
+def show_batch_results(table, name):
+    """Batch Results window: a virtualized table of every evaluated row"""
+    import slip_table
+
+    def load_row(row):
+        # Load a row's inputs into the main window; live recompute does the rest
+        for input_name, entry in input_entries.items():
+            entry.delete(0, tk.END)
+            entry.insert(0, f"{row[input_name]:g}")
+
+    batch_window = tk.Toplevel(root)
+    batch_window.title(f"Batch Results - {name}")
+    batch_window.geometry("1100x600")
+    frame = ttk.Frame(batch_window, padding="10")
+    frame.pack(fill=tk.BOTH, expand=True)
+    header = ttk.Frame(frame)
+    header.pack(fill=tk.X, pady=(0, 5))
+    ttk.Label(header, text="Click a heading to sort, double-click a row to load its inputs. "
+                           "Filter example: slip == 1 and gap_nm < 50",
+              foreground=COLORS["text_secondary"], font=("Segoe UI", 9)).pack(side=tk.LEFT)
+    # Exports the rows in view, in their current order
+    ttk.Button(header, text="Export...",
+               command=lambda: export_data(table.view_columns(), len(table), ".csv")).pack(side=tk.RIGHT)
+    view = slip_table.VirtualTable(frame, table, on_activate=load_row)
+    view.tree.tag_configure("slip", foreground=COLORS["error"])
+    view.tree.tag_configure("noslip", foreground=COLORS["success"])
+    view.frame.pack(fill=tk.BOTH, expand=True)
+    status_var.set(f"Ready - {table.rows:,} batch rows evaluated")
 
 def create_header_section(parent, title, **kwargs):
     """Create a borderless section with a prominent title"""
@@ -442,12 +872,24 @@ def create_header_section(parent, title, **kwargs):
 # Store tooltips data
 tooltip_data = {}
 
+# Pending live recalculation (after id)
+live_after_id = None
+# SlipResult of the last calculation, for export
+last_result = None
+last_texts = {}
+
 # Create the main window
 root = tk.Tk()
 root.title(f"{APP_NAME} v{VERSION}")
-root.geometry("900x750")  # Set initial window size
+root.geometry("1300x750")  # Set initial window size
 root.minsize(800, 650)    # Set minimum window size
 
+# Background workers: one for the main calculation, one for longer analyses and one for exports
+runner = BackgroundRunner(root, on_busy=update_busy)
+analysis_runner = BackgroundRunner(root, on_busy=update_busy)
+analysis_title = None
+export_runner = BackgroundRunner(root, on_busy=update_busy)
+
 # Set the application icon (if available)
 if os.path.exists("icon.ico"):
     root.iconbitmap("icon.ico")
@@ -505,10 +947,20 @@ root.config(menu=menubar)
 # File menu
 file_menu = tk.Menu(menubar, tearoff=0)
 menubar.add_cascade(label="File", menu=file_menu)
+file_menu.add_command(label="Open Batch...", command=open_batch)
 file_menu.add_command(label="Export Results", command=export_results)
 file_menu.add_separator()
 file_menu.add_command(label="Exit", command=root.quit)
 
+# Analysis menu
+analysis_menu = tk.Menu(menubar, tearoff=0)
+menubar.add_cascade(label="Analysis", menu=analysis_menu)
+analysis_menu.add_command(label="Monte Carlo Uncertainty...", command=show_monte_carlo)
+analysis_menu.add_command(label="Fit Slip-Length Data...", command=show_fit)
+analysis_menu.add_command(label="Green–Kubo Friction...", command=show_green_kubo)
+analysis_menu.add_separator()
+analysis_menu.add_command(label="Cache Statistics...", command=show_cache_stats)
+
 # Help menu
 help_menu = tk.Menu(menubar, tearoff=0)
 menubar.add_cascade(label="Help", menu=help_menu)
@@ -578,6 +1030,17 @@ exp_entry.grid(row=row, column=1, sticky="EW", pady=8, padx=(10, 0))
 create_tooltip(exp_entry, "Controls how rapidly slip increases with shear rate")
 row += 1
 
+# Entry widget of each model input, keyed like slip_model.INPUT_NAMES
+input_entries = dict(zip(slip_model.INPUT_NAMES,
+                         (gap_entry, speed_entry, viscosity_entry, friction_entry, crit_shear_entry, exp_entry)))
+
+# Recalculate live as the inputs change
+for entry in input_entries.values():
+    entry_var = tk.StringVar(value=entry.get())
+    entry.config(textvariable=entry_var)
+    entry_var.trace_add("write", schedule_live_calculation)
+    entry.var = entry_var  # keep a reference so the variable and its trace stay alive
+
 # Configure the grid to expand properly
 for i in range(2):
     input_params_frame.columnconfigure(i, weight=1)
@@ -639,6 +1102,23 @@ results_text.tag_configure("cfd_suggestion", foreground=COLORS["text_secondary"]
 results_text.insert(tk.END, "Enter parameters and click 'Calculate' to see results.", "heading")
 results_text.config(state=tk.DISABLED)
 
+# Regime map frame (far right)
+map_frame = ttk.Frame(main_paned, padding=15)
+main_paned.add(map_frame, weight=2)
+
+map_section, map_content = create_header_section(map_frame, "Regime Map")
+map_section.pack(fill=tk.BOTH, expand=True)
+
+try:
+    import slip_regime_map
+except ImportError:
+    regime_map = None
+    ttk.Label(map_content, text="The regime map requires NumPy (pip install numpy).",
+              foreground=COLORS["text_secondary"]).pack(pady=20)
+else:
+    regime_map = slip_regime_map.RegimeMap(map_content, background=COLORS["card"], marker=COLORS["primary_dark"])
+    regime_map.frame.pack(fill=tk.BOTH, expand=True)
+
 # Status bar with modern styling
 status_frame = ttk.Frame(main_container)
 status_frame.pack(fill=tk.X, side=tk.BOTTOM, pady=(15, 0))
@@ -648,6 +1128,10 @@ status_var.set("Ready")
 status_bar = ttk.Label(status_frame, textvariable=status_var, relief=tk.GROOVE, anchor=tk.W, padding=(5, 3))
 status_bar.pack(fill=tk.X, side=tk.LEFT, expand=True)
 
+# Progress bar and Cancel button, shown while a background job runs
+progress_bar = ttk.Progressbar(status_frame, orient=tk.HORIZONTAL, length=150)
+cancel_button = ttk.Button(status_frame, text="Cancel", command=cancel_job, width=8)
+
 # Version and license information
 license_label = ttk.Label(
     status_frame, 
@@ -658,11 +1142,12 @@ license_label = ttk.Label(
 )
 license_label.pack(side=tk.RIGHT, padx=5)
 
-# Set initial sash position (40% for input, 60% for results)
+# Set initial sash positions (28% for input, 34% for results, 38% for the regime map)
 def set_sash_position():
     width = main_paned.winfo_width()
     if width > 1:  # Only set if window has been drawn
-        main_paned.sashpos(0, int(width * 0.4))
+        main_paned.sashpos(0, int(width * 0.28))
+        main_paned.sashpos(1, int(width * 0.62))
         
 # Schedule the sash position update after the window is drawn
 root.after(100, set_sash_position)
@@ -0,0 +1,223 @@
+"""Vectorized batch evaluation of the slip/no-slip model.
+
+evaluate_batch() runs the same calculation chain as slip_model.evaluate() over
+NumPy arrays, or over scalars broadcast against arrays, and writes the results
+into a structured array. The work is done in fixed-size chunks with a handful
+of reusable scratch buffers. Peak memory therefore stays close to the size of
+the output, even for 10⁷–10⁸ input tuples.
+"""
+
+import numpy as np
+
+import slip_model
+
+# Slip decision codes stored in the "slip" field
+NO_SLIP = 0
+SLIP = 1
+DECISION_NAMES = {NO_SLIP: "no-slip", SLIP: "slip"}
+
+RESULT_FIELDS = ("shear_rate", "shear_stress", "b0", "b_eff", "ratio")
+
+RESULT_DTYPE = np.dtype([(name, np.float64) for name in RESULT_FIELDS] + [("slip", np.bool_)])
+
+# Number of elements evaluated per pass through the scratch buffers
+CHUNK_SIZE = 1 << 16
+
+
+def _as_input(value):
+    """Return an input as a float64 array without copying when possible"""
+    return np.asarray(value, dtype=np.float64)
+
+
+def _flat_slice(array, shape, start, stop):
+    """Return elements start:stop of an input broadcast to shape, flattened"""
+    if array.ndim == 0:
+        return array
+    if array.shape == shape and array.flags.c_contiguous:
+        return array.reshape(-1)[start:stop]
+    # .flat only materializes the requested elements of the broadcast view
+    return np.broadcast_to(array, shape).flat[start:stop]
+
+
+def iter_chunks(inputs, shape, chunk_size=CHUNK_SIZE):
+    """Yield (start, stop, sliced inputs) for flat chunks of arrays broadcast to shape"""
+    size = int(np.prod(shape, dtype=np.int64))
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        yield start, stop, [_flat_slice(a, shape, start, stop) for a in inputs]
+
+
+def broadcast_shape(*values):
+    """Shape of the result when the given inputs are broadcast together"""
+    return np.broadcast_shapes(*(np.shape(v) for v in values))
+
+
+def decide(ratio):
+    """Vectorized slip decision: True where bₑff/h ≥ 0.01 (NaN counts as slip, as in the GUI)"""
+    return ~(np.asarray(ratio) < slip_model.SLIP_THRESHOLD)
+
+
+def _compress(value, index):
+    """Select elements of a flat array; scalars pass through"""
+    return value if np.ndim(value) == 0 else value[index]
+
+
+def solve_shear_rate(sliding_speed, gap_m, b0, gamma_crit, exponent, out=None, rtol=1e-12, max_iter=100):
+    """Vectorized slip-corrected Couette shear rate: γ = U / (h + 2 bₑff(γ)) per element.
+
+    The explicit fixed-point iteration diverges once slip is strong, so each
+    element takes Newton steps on F(γ) = γ (h + 2 bₑff(γ)) − U instead. For
+    m > -1, F is increasing and has a single root, which starts bracketed by
+    [U / (h + 2 bₑff(U/h)), min(U / (h + 2 b₀), (U γc^m / 2b₀)^(1/(m+1)))] for
+    m > 0 and by [min(U / 2(h + 2 b₀), (U γc^m / 4b₀)^(1/(m+1))),
+    min(U / (h + 2 b₀), U / (h + 2 bₑff(U/h)))] otherwise. Each step moves the
+    bracket end on the same side of the root as γ, and a Newton step that
+    leaves the bracket bisects it instead. From the upper end, Newton steps
+    approach the root from above when F is convex (m > 0); when F is concave
+    (m < 0), the first lands below the root and the rest approach it from
+    below. An element has converged once its step is small enough for the
+    next, quadratically convergent, step to be below rtol.
+
+    For m ≤ -1, F is not monotone and has no root or two of them, so those
+    elements are NaN, like elements that have not converged after max_iter
+    steps. For m near -1 the root can lie below the smallest float and is
+    then zero. Converged elements (and those with a NaN bracket) take no
+    further part in the stopping test, and the arrays are compressed once
+    most elements have converged.
+    """
+    inputs = [_as_input(v) for v in (sliding_speed, gap_m, b0, gamma_crit, exponent)]
+    shape = np.broadcast_shapes(*(a.shape for a in inputs))
+    # Scalars stay scalars; arrays are flattened so they can be compressed
+    U, h, b, gc, m = (a if a.ndim == 0 else np.broadcast_to(a, shape).reshape(-1) for a in inputs)
+    if out is None:
+        out = np.empty(shape)
+    flat = out.reshape(-1)
+    speed = np.abs(U)
+    two_b = 2 * b
+    linear = h + two_b
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # First fixed-point iterate; it bounds the root from below for m > 0 and from above for m < 0
+        first = speed / (h + two_b * (1 + (speed / h / gc)**m))
+        shearing = m > 0
+        # For m > 0: root of the power-law term 2 b₀ γ^(m+1) / γc^m = U alone, which bounds the root
+        # from above. For m ≤ 0 both terms of F are at most U at the root, and one of them is at least U/2.
+        power_root = (speed * gc**m / np.where(shearing, two_b, 2 * two_b))**(1 / (m + 1))
+        lo = np.where(shearing, first, np.fmin(0.5 * speed / linear, power_root))
+        hi = np.fmin(speed / linear, np.where(shearing, power_root, first))
+        defined = m > -1
+        lo = np.where(defined, np.broadcast_to(lo, flat.shape), np.nan)
+        hi = np.where(defined, np.broadcast_to(hi, flat.shape), np.nan)
+        rate = hi.copy()
+        # The error after a step is about max(m, 1) × (relative step)², so stop once that is below rtol
+        tol = np.sqrt(rtol / np.maximum(m, 1))
+        index = None
+        running = np.zeros(flat.shape, dtype=bool)
+        for _ in range(max_iter):
+            # F = γ (h + 2 b₀ + 2 b₀ q) − U and F' = h + 2 b₀ + 2 b₀ (m + 1) q, q = (γ/γc)^m
+            q = np.divide(rate, gc)
+            np.power(q, m, out=q)
+            np.multiply(q, two_b, out=q)
+            residual = np.add(linear, q)
+            residual *= rate
+            residual -= speed
+            np.copyto(hi, rate, where=residual > 0)
+            np.copyto(lo, rate, where=residual < 0)
+            q *= m + 1
+            q += linear
+            step = np.divide(residual, q, out=residual)
+            np.subtract(rate, step, out=step)
+            # Bisect where the Newton step leaves the bracket (or is NaN at a point bracket), geometrically
+            # since the bracket may span hundreds of decades for m near -1; a lower end of zero (an
+            # underflowed bound) is approached in steps of 2^-64
+            outside = ~((step >= lo) & (step <= hi))
+            if outside.any():
+                a, z = lo[outside], hi[outside]
+                step[outside] = np.where(a > 0, np.sqrt(a) * np.sqrt(z), z * 2.0**-64)
+            # NaN (invalid input) counts as converged
+            running = np.abs(step - rate) > tol * step
+            rate = step
+            if not running.any():
+                break
+            if index is None and 4 * np.count_nonzero(running) <= running.size:
+                # Finish the stragglers on compressed copies
+                flat[...] = rate
+                index = np.flatnonzero(running)
+                speed, two_b, linear, gc, m, tol = (_compress(a, index)
+                                                    for a in (speed, two_b, linear, gc, m, tol))
+                lo, hi, rate, running = lo[index], hi[index], rate[index], running[index]
+        rate[running] = np.nan
+        if index is None:
+            flat[...] = rate
+        else:
+            flat[index] = rate
+    np.copysign(out, U, out=out)
+    return out
+
+
+def evaluate_batch(gap_nm, sliding_speed, mu, lambda_friction, gamma_crit, exponent,
+                   out=None, chunk_size=CHUNK_SIZE, self_consistent=False):
+    """Evaluate the slip model for broadcastable arrays of inputs.
+
+    Returns a structured array of RESULT_DTYPE with the broadcast shape of the
+    inputs. Pass a preallocated array as out to reuse memory between calls.
+    With self_consistent, γ is the slip-corrected shear rate from
+    solve_shear_rate() instead of the nominal U / h.
+    """
+    inputs = [_as_input(v) for v in (gap_nm, sliding_speed, mu, lambda_friction, gamma_crit, exponent)]
+    shape = np.broadcast_shapes(*(a.shape for a in inputs))
+    if out is None:
+        out = np.empty(shape, dtype=RESULT_DTYPE)
+    elif out.shape != shape or out.dtype != RESULT_DTYPE:
+        raise ValueError(f"out must have shape {shape} and dtype RESULT_DTYPE")
+    elif not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+
+    flat = out.reshape(-1)
+    size = flat.shape[0]
+    if size == 0:
+        return out
+    n = min(chunk_size, size)
+
+    # Scratch buffers reused for every chunk
+    gap_m = np.empty(n)
+    rate = np.empty(n)
+    work = np.empty(n)
+    b0 = np.empty(n)
+    below = np.empty(n, dtype=np.bool_)
+
+    for start, stop, (h, U, visc, lam, gc, m) in iter_chunks(inputs, shape, n):
+        k = stop - start
+        g, r, w, b, s = gap_m[:k], rate[:k], work[:k], b0[:k], below[:k]
+        chunk = flat[start:stop]
+
+        # b₀ = μ / λ
+        np.divide(visc, lam, out=b)
+        chunk["b0"] = b
+
+        # h (m) from nm, then γ = U / h, or U / (h + 2 bₑff) when self-consistent
+        np.multiply(h, 1e-9, out=g)
+        if self_consistent:
+            solve_shear_rate(U, g, b, gc, m, out=r)
+        else:
+            np.divide(U, g, out=r)
+        chunk["shear_rate"] = r
+
+        # τ = μ × γ
+        np.multiply(visc, r, out=w)
+        chunk["shear_stress"] = w
+
+        # bₑff = b₀ [1 + (γ / γ_c)^m]
+        np.divide(r, gc, out=w)
+        np.power(w, m, out=w)
+        np.add(1, w, out=w)
+        np.multiply(b, w, out=w)
+        chunk["b_eff"] = w
+
+        # bₑff / h and the decision
+        np.divide(w, g, out=w)
+        chunk["ratio"] = w
+        np.less(w, slip_model.SLIP_THRESHOLD, out=s)
+        np.logical_not(s, out=s)
+        chunk["slip"] = s
+
+    return out
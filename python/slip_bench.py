@@ -0,0 +1,309 @@
+"""Benchmark suite with a machine-readable history and regression gates.
+
+Each benchmark times one hot path on synthetic inputs:
+
+    scalar_evaluate        slip_model.evaluate(), the GUI's calculate()
+    batch_1k ... batch_1m  slip_batch.evaluate_batch() at several sizes
+    batch_self_consistent  the same with the slip-corrected shear rate
+    sweep_1m               slip_sweep.run_sweep() of a 1000 x 1000 grid into a .npy file
+    ingest_csv             streaming a CSV table through the model, as the batch command does
+    ingest_reports         slip_ingest.ingest() of exported text reports
+    export_<format>        slip_export.export() of a batch to each table format
+
+Inputs are written to a temporary directory before timing. The best of
+repeat runs gives the throughput. One more run under tracemalloc gives the
+peak of memory allocated by Python and NumPy. Exports whose optional
+package (pyarrow, h5py) is missing are skipped.
+
+run_suite() returns a record that append_history() adds to a JSON Lines
+file. compare() checks a record against the median of the last few
+records from the same machine and mode. A benchmark regresses when its
+throughput falls, or its peak memory grows, by more than a threshold.
+"""
+
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+DEFAULT_HISTORY = "bench_history.jsonl"
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MEMORY_THRESHOLD = 0.25
+# Earlier records whose median is the baseline
+DEFAULT_WINDOW = 5
+# Peak memory changes below this many MB are never regressions
+MEMORY_SLACK_MB = 1.0
+
+# Quick mode divides the work of every benchmark by this factor
+QUICK_FACTOR = 10
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """Register a benchmark: a function(scale, workdir) returning (run, items, unit)"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def _count(n, scale):
+    return max(1, int(n * scale))
+
+
+def _random_inputs(n, seed=0):
+    """Inputs spread over the ranges of the regime map"""
+    rng = np.random.default_rng(seed)
+    return [10**rng.uniform(-1, 4, n), 10**rng.uniform(-4, 3, n), 10**rng.uniform(-5, 0, n),
+            10**rng.uniform(4, 10, n), 10**rng.uniform(4, 10, n), rng.uniform(0, 5, n)]
+
+
+def _result_columns(n):
+    inputs = _random_inputs(n)
+    result = slip_batch.evaluate_batch(*inputs)
+    columns = dict(zip(slip_model.INPUT_NAMES, inputs))
+    columns.update({name: result[name] for name in slip_batch.RESULT_DTYPE.names})
+    return columns
+
+
+@benchmark("scalar_evaluate")
+def _scalar_evaluate(scale, workdir):
+    rows = list(zip(*[a.tolist() for a in _random_inputs(_count(20000, scale))]))
+
+    def run():
+        for row in rows:
+            slip_model.evaluate(*row)
+    return run, len(rows), "evals"
+
+
+def _batch(rows, calls, self_consistent=False):
+    # The batch size is what is measured, so scale only changes the number of calls
+    def setup(scale, workdir):
+        inputs = _random_inputs(rows)
+        out = np.empty(rows, dtype=slip_batch.RESULT_DTYPE)
+        repeat = _count(calls, scale)
+
+        def run():
+            with np.errstate(all="ignore"):
+                for _ in range(repeat):
+                    slip_batch.evaluate_batch(*inputs, out=out, self_consistent=self_consistent)
+        return run, rows * repeat, "rows"
+    return setup
+
+
+benchmark("batch_1k")(_batch(1000, 500))
+benchmark("batch_100k")(_batch(100000, 20))
+benchmark("batch_1m")(_batch(1000000, 3))
+benchmark("batch_self_consistent")(_batch(100000, 5, self_consistent=True))
+
+
+@benchmark("sweep_1m")
+def _sweep(scale, workdir):
+    import slip_sweep
+
+    n = _count(1000, scale**0.5)
+    axes = slip_sweep.make_axes(gap_nm=slip_sweep.log_axis(0.1, 1e4, n),
+                                sliding_speed=slip_sweep.log_axis(1e-4, 1e3, n))
+    path = os.path.join(workdir, "sweep.npy")
+
+    def run():
+        slip_sweep.run_sweep(axes, path, workers=1)
+    return run, n * n, "rows"
+
+
+@benchmark("ingest_csv")
+def _ingest_csv(scale, workdir):
+    import slip_io
+
+    n = _count(500000, scale)
+    path = os.path.join(workdir, "inputs.csv")
+    with slip_io.open_table_writer(path, slip_model.INPUT_NAMES) as writer:
+        writer.write(dict(zip(slip_model.INPUT_NAMES, _random_inputs(n))))
+
+    def run():
+        with np.errstate(all="ignore"):
+            for chunk in slip_io.iter_table_chunks(path, slip_io.DEFAULT_CHUNK_ROWS, slip_model.INPUT_NAMES):
+                slip_batch.evaluate_batch(*[chunk[name] for name in slip_model.INPUT_NAMES])
+    return run, n, "rows"
+
+
+@benchmark("ingest_reports")
+def _ingest_reports(scale, workdir):
+    import slip_export
+    import slip_ingest
+
+    n = _count(2000, scale)
+    folder = os.path.join(workdir, "reports")
+    os.makedirs(folder, exist_ok=True)
+    generated = datetime.datetime(2025, 3, 17, 12, 0, 0)
+    for i, row in enumerate(zip(*[a.tolist() for a in _random_inputs(n)])):
+        result = slip_model.evaluate(*row)
+        encoding = "ascii" if i % 4 == 0 else "utf-8"
+        slip_export.write_report(os.path.join(folder, f"{i}.txt"), result, encoding=encoding, generated=generated)
+    archive = os.path.join(workdir, "reports.store")
+
+    def run():
+        shutil.rmtree(archive, ignore_errors=True)
+        slip_ingest.ingest(folder, archive, workers=1)
+    return run, n, "files"
+
+
+def _export(extension, requires=None):
+    def setup(scale, workdir):
+        if requires is not None:
+            try:
+                __import__(requires)
+            except ImportError:
+                return None
+        import slip_export
+
+        n = _count(200000, scale)
+        columns = _result_columns(n)
+        path = os.path.join(workdir, "export" + extension)
+
+        def run():
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            slip_export.export(path, columns)
+        return run, n, "rows"
+    return setup
+
+
+benchmark("export_csv")(_export(".csv"))
+benchmark("export_jsonl")(_export(".jsonl"))
+benchmark("export_parquet")(_export(".parquet", "pyarrow"))
+benchmark("export_arrow")(_export(".arrow", "pyarrow"))
+benchmark("export_h5")(_export(".h5", "h5py"))
+benchmark("export_store")(_export(".store"))
+
+
+def measure(run, items, repeat=DEFAULT_REPEAT):
+    """Best time of repeat runs, and the traced peak memory of one more run"""
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    best = min(times)
+    return {"seconds": best, "items": items, "rate": items / best if best > 0 else float("inf"),
+            "peak_mb": peak / 1e6}
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_suite(patterns=None, quick=False, repeat=DEFAULT_REPEAT, progress=None):
+    """Run the benchmarks whose names match any of patterns (all by default); returns a history record.
+
+    progress(name, result) is called after each benchmark (result None if skipped).
+    """
+    scale = 1.0 / QUICK_FACTOR if quick else 1.0
+    results = OrderedDict()
+    with tempfile.TemporaryDirectory(prefix="slip_bench_") as workdir:
+        for name, setup in BENCHMARKS.items():
+            if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+                continue
+            folder = os.path.join(workdir, name)
+            os.makedirs(folder)
+            prepared = setup(scale, folder)
+            if prepared is None:
+                result = None
+            else:
+                run, items, unit = prepared
+                result = measure(run, items, repeat)
+                result["unit"] = unit
+                results[name] = result
+            if progress is not None:
+                progress(name, result)
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "version": slip_model.VERSION,
+        "machine": f"{platform.node()} {platform.machine()} {os.cpu_count()} cpu",
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "quick": quick,
+        "results": results,
+    }
+
+
+def read_history(path):
+    """Records of a history file (missing file: none)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def compare(record, history, threshold=DEFAULT_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD,
+            window=DEFAULT_WINDOW):
+    """Compare a record with the median of the last window comparable records.
+
+    Returns one dict per benchmark with a baseline: name, rate and peak_mb
+    baselines, their relative changes and a "regressed" list naming the
+    metrics beyond their threshold.
+    """
+    comparable = [r for r in history if r.get("machine") == record["machine"] and r.get("quick") == record["quick"]]
+    rows = []
+    for name, result in record["results"].items():
+        earlier = [r["results"][name] for r in comparable if name in r.get("results", {})][-window:]
+        if not earlier:
+            continue
+        rate = statistics.median(e["rate"] for e in earlier)
+        peak = statistics.median(e["peak_mb"] for e in earlier)
+        regressed = []
+        if result["rate"] < rate * (1 - threshold):
+            regressed.append("rate")
+        if result["peak_mb"] > peak * (1 + memory_threshold) + MEMORY_SLACK_MB:
+            regressed.append("peak_mb")
+        rows.append({"name": name, "baseline_rate": rate, "rate_change": result["rate"] / rate - 1,
+                     "baseline_peak_mb": peak, "peak_change": result["peak_mb"] / peak - 1 if peak else 0.0,
+                     "regressed": regressed})
+    return rows
+
+
+def format_report(record, comparison=()):
+    """Table of a record's results, with changes against the baseline where there is one"""
+    changes = {row["name"]: row for row in comparison}
+    lines = [f"{'benchmark':<24}{'throughput':>20}{'peak MB':>10}{'vs baseline':>24}"]
+    for name, result in record["results"].items():
+        rate = f"{result['rate']:,.0f} {result['unit']}/s"
+        line = f"{name:<24}{rate:>20}{result['peak_mb']:>10.1f}"
+        row = changes.get(name)
+        if row is not None:
+            flag = "  REGRESSED" if row["regressed"] else ""
+            line += f"{row['rate_change']:>+13.1%} {row['peak_change']:>+9.1%}{flag}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,100 @@
+"""Regime-boundary solver: where does bₑff/h reach the slip threshold?
+
+The GUI decides slip when bₑff/h ≥ 0.01 with bₑff = b₀ [1 + (U / (h γ_c))^m]
+and b₀ = μ / λ. This module inverts that criterion for whole arrays of
+inputs instead of sweeping one of them:
+
+* critical_speed() gives the sliding speed U* at which slip becomes
+  necessary for a given gap. The criterion can be solved for U in closed form:
+  U* = h γ_c (0.01 h / b₀ - 1)^(1/m).
+* critical_gap() gives the gap h* below which slip is necessary for a given
+  speed. There is no closed form, so each element is solved with a
+  safeguarded Newton iteration on log h inside a guaranteed bracket.
+
+Gaps are in nm, as in the GUI. Both solvers assume m ≥ 0, where bₑff/h
+rises with U and falls with h. Negative exponents return NaN.
+"""
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+# Convergence tolerance on log h and iteration cap for critical_gap()
+LOG_GAP_TOL = 1e-13
+MAX_ITER = 100
+
+
+def _prepare(values):
+    inputs = [np.asarray(v, dtype=np.float64) for v in values]
+    shape = np.broadcast_shapes(*(a.shape for a in inputs))
+    out = np.empty(shape)
+    return inputs, shape, out.reshape(-1), out
+
+
+def critical_speed(gap_nm, mu, lambda_friction, gamma_crit, exponent,
+                   threshold=slip_model.SLIP_THRESHOLD, chunk_size=slip_batch.CHUNK_SIZE):
+    """Sliding speed (m/s) at which bₑff/h reaches the threshold.
+
+    Slip is recommended for U ≥ U*. U* is 0 where slip is recommended even at
+    rest, and inf where it is never recommended (m = 0 with 2 b₀/h < 0.01).
+    """
+    inputs, shape, flat, out = _prepare((gap_nm, mu, lambda_friction, gamma_crit, exponent))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for start, stop, (h_nm, visc, lam, gc, m) in slip_batch.iter_chunks(inputs, shape, chunk_size):
+            h = h_nm * 1e-9
+            # (U* / (h γ_c))^m = threshold h / b₀ - 1
+            q = threshold * h / (visc / lam) - 1
+            m = np.broadcast_to(m, q.shape)
+            speed = h * gc * q**(1 / m)
+            speed = np.where(q <= 0, 0.0, speed)
+            speed = np.where(m == 0, np.where(q <= 1, 0.0, np.inf), speed)
+            flat[start:stop] = np.where(m < 0, np.nan, speed)
+    return out
+
+
+def critical_gap(sliding_speed, mu, lambda_friction, gamma_crit, exponent,
+                 threshold=slip_model.SLIP_THRESHOLD, chunk_size=slip_batch.CHUNK_SIZE):
+    """Gap height (nm) at which bₑff/h reaches the threshold.
+
+    Slip is recommended for h ≤ h*. Each element is solved independently with
+    Newton steps on x = log h, falling back to bisection whenever a step
+    leaves the current bracket; converged elements are masked out.
+    """
+    inputs, shape, flat, out = _prepare((sliding_speed, mu, lambda_friction, gamma_crit, exponent))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for start, stop, (U, visc, lam, gc, m) in slip_batch.iter_chunks(inputs, shape, chunk_size):
+            n = stop - start
+            b0 = np.broadcast_to(visc / lam, (n,))
+            c = np.broadcast_to(U / gc, (n,))
+            m = np.broadcast_to(m, (n,))
+            log_b0 = np.log(b0) - np.log(threshold)
+
+            # F(x) = log(b₀/θ) + log(1 + (c e^-x)^m) - x decreases strictly in x.
+            # F(lo) ≥ 0 at h = b₀/θ; F(hi) ≤ 0 once each term of bₑff/h is ≤ θ/2.
+            lo = log_b0.copy()
+            hi = np.fmax(np.log(2.0) + log_b0,
+                         (np.log(2.0) + log_b0 + m * np.log(c)) / (1 + m))
+            x = lo.copy()
+            active = np.flatnonzero(np.isfinite(lo) & np.isfinite(hi) & (m >= 0))
+            for _ in range(MAX_ITER):
+                if active.size == 0:
+                    break
+                xa, ca, ma = x[active], c[active], m[active]
+                t = (ca * np.exp(-xa))**ma
+                f = log_b0[active] + np.log1p(t) - xa
+                df = -ma * t / (1 + t) - 1
+                # Keep the root bracketed
+                lo_a = np.where(f > 0, xa, lo[active])
+                hi_a = np.where(f <= 0, xa, hi[active])
+                step = xa - f / df
+                bad = ~((step >= lo_a) & (step <= hi_a))
+                step[bad] = 0.5 * (lo_a[bad] + hi_a[bad])
+                done = (np.abs(step - xa) <= LOG_GAP_TOL * np.maximum(1.0, np.abs(xa))) | (f == 0)
+                x[active], lo[active], hi[active] = step, lo_a, hi_a
+                active = active[~done]
+
+            gap = np.exp(x) * 1e9
+            gap[~(m >= 0) | ~np.isfinite(x)] = np.nan
+            flat[start:stop] = gap
+    return out
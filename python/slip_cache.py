@@ -0,0 +1,384 @@
+"""Persistent memoization of expensive analyses (Monte Carlo, Sobol, fits).
+
+Cache.call(func, *args, **kwargs) returns func's result for the same inputs
+without running it again. The key is a SHA-256 hash of:
+
+* func's module and name;
+* its arguments, bound to parameter names with defaults filled in, so that
+  passing a default explicitly or leaving it out gives the same key;
+* the code version: slip_model.VERSION and the source of every slip_*.py
+  module, so editing the model or an analysis invalidates old entries.
+
+Arguments are normalized before hashing. Numbers hash by value, so 2, 2.0
+and np.float64(2) are the same input. Arrays hash by dtype, shape and
+bytes, and other objects (e.g. Monte Carlo distributions) by class and
+attributes. Arguments in IGNORED_ARGUMENTS (progress callbacks, worker
+counts) do not affect results and are left out.
+
+Results are kept in two tiers. A small in-memory LRU holds pickled results
+of this process. A directory of pickle files holds results across sessions
+and is trimmed to max_bytes, oldest access first. Hits refresh the file's
+modification time, which serves as its access time. Writes go through a
+temporary file and a rename, so concurrent processes can share a cache.
+Entries are pickles: only use a cache directory that you trust.
+
+get_cache() returns the shared cache of the GUI and CLI. Its directory is
+$SLIP_CACHE_DIR (default: the user cache directory), its size limit
+$SLIP_CACHE_SIZE in MB, and SLIP_CACHE=off disables it. Hit and miss counts
+and the compute time saved are kept per session (stats()) and in total in
+the cache directory (totals()).
+"""
+
+import atexit
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import slip_model
+
+DEFAULT_MAX_BYTES = 1 << 30
+DEFAULT_MEMORY_BYTES = 64 << 20
+STATS_NAME = "stats.json"
+
+# Arguments that do not change results
+IGNORED_ARGUMENTS = ("progress", "workers")
+
+# Counters of stats() and totals()
+COUNTERS = ("memory_hits", "disk_hits", "misses", "writes", "evictions", "seconds_saved")
+
+_code_version = None
+
+
+def code_version():
+    """Hash of slip_model.VERSION and the source of every slip_*.py module next to this one"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256(slip_model.VERSION.encode())
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "slip_*.py"))):
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def _update(digest, value):
+    """Feed a normalized form of value into digest"""
+    if value is None or isinstance(value, (bool, np.bool_)):
+        digest.update(f"{type(value).__name__}:{value};".encode())
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        if isinstance(value, (int, np.integer)) and abs(int(value)) >= 1 << 53:
+            digest.update(f"int:{int(value)};".encode())
+        else:
+            digest.update(f"num:{float(value)!r};".encode())
+    elif isinstance(value, str):
+        digest.update(f"str:{len(value)}:".encode() + value.encode())
+    elif isinstance(value, bytes):
+        digest.update(f"bytes:{len(value)}:".encode() + value)
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"array:{value.dtype.descr if value.dtype.names else value.dtype.str}:{value.shape};".encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"seq:{len(value)}[".encode())
+        for item in value:
+            _update(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, dict):
+        digest.update(f"dict:{len(value)}{{".encode())
+        for k in sorted(value, key=repr):
+            _update(digest, k)
+            _update(digest, value[k])
+        digest.update(b"}")
+    elif isinstance(value, (set, frozenset)):
+        _update(digest, sorted(value, key=repr))
+    elif hasattr(value, "__dict__"):
+        cls = type(value)
+        digest.update(f"object:{cls.__module__}.{cls.__qualname__}".encode())
+        _update(digest, vars(value))
+    else:
+        raise TypeError(f"cannot build a cache key from {type(value).__name__}")
+
+
+def make_key(func, *args, **kwargs):
+    """Cache key (hex digest) of a call of func"""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name not in IGNORED_ARGUMENTS}
+    digest = hashlib.sha256()
+    _update(digest, [code_version(), func.__module__, func.__qualname__, arguments])
+    return digest.hexdigest()
+
+
+class Cache:
+    """Two-tier (memory and disk) LRU cache of analysis results.
+
+    path None keeps results in memory only; enabled=False makes call() a
+    plain function call.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, memory_bytes=DEFAULT_MEMORY_BYTES, enabled=True):
+        self.path = None if path is None else str(path)
+        self.max_bytes = int(max_bytes)
+        self.memory_bytes = int(memory_bytes)
+        self.enabled = enabled
+        self._memory = OrderedDict()    # key -> pickled (seconds, result)
+        self._memory_size = 0
+        self._disk_size = None          # measured on the first write
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        self._flushed = dict.fromkeys(COUNTERS, 0)
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    # Entries
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + ".pkl")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes // 4:
+            return
+        with self._lock:
+            if key not in self._memory:
+                self._memory_size += len(data)
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while self._memory_size > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+
+    def _load(self, key):
+        """Pickled entry of key from memory or disk, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return data
+        if self.path is None:
+            return None
+        target = self._file(key)
+        try:
+            with open(target, "rb") as f:
+                data = f.read()
+            os.utime(target)
+        except OSError:
+            return None
+        self._count("disk_hits")
+        self._remember(key, data)
+        return data
+
+    def _store(self, key, data):
+        self._remember(key, data)
+        self._count("writes")
+        if self.path is None:
+            return
+        target = self._file(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, target)
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+        if self._disk_size is None or self._disk_size > self.max_bytes:
+            self.trim()
+
+    def _entries(self):
+        """(mtime, size, path) of every entry file on disk"""
+        entries = []
+        for path in glob.glob(os.path.join(self.path, "??", "*.pkl")):
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def trim(self, max_bytes=None):
+        """Evict the least recently used disk entries until the cache holds at most 90 % of max_bytes"""
+        if self.path is None:
+            return
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        size = sum(e[1] for e in entries)
+        if size > max_bytes:
+            for _, entry_size, path in sorted(entries):
+                if size <= 0.9 * max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                self._count("evictions")
+        with self._lock:
+            self._disk_size = size
+
+    # Public interface
+
+    def get(self, key):
+        """(True, result) for a cached key, else (False, None)"""
+        data = self._load(key)
+        if data is not None:
+            try:
+                seconds, result = pickle.loads(data)
+            except Exception:
+                # Entry of an older layout or a damaged file: treat as a miss
+                self.discard(key)
+            else:
+                self._count("seconds_saved", seconds)
+                return True, result
+        self._count("misses")
+        return False, None
+
+    def put(self, key, result, seconds=0.0):
+        """Store result under key; seconds is the compute time it saves on each hit"""
+        self._store(key, pickle.dumps((seconds, result), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def discard(self, key):
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_size -= len(data)
+        if self.path is not None:
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+
+    def call(self, func, *args, **kwargs):
+        """func(*args, **kwargs), from the cache if it was computed before"""
+        self._local.hit = False
+        if not self.enabled:
+            return func(*args, **kwargs)
+        key = make_key(func, *args, **kwargs)
+        hit, result = self.get(key)
+        if hit:
+            self._local.hit = True
+            return result
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.put(key, result, time.perf_counter() - start)
+        return result
+
+    @property
+    def last_hit(self):
+        """True if this thread's last call() was answered from the cache"""
+        return getattr(self._local, "hit", False)
+
+    def clear(self):
+        """Delete every entry (statistics are kept)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if self.path is not None:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_size = 0
+
+    # Statistics
+
+    def stats(self):
+        """Counters of this session plus the current memory and disk usage"""
+        with self._lock:
+            out = dict(self._counts)
+            out["memory_entries"], out["memory_bytes"] = len(self._memory), self._memory_size
+        if self.path is not None:
+            entries = self._entries()
+            out["disk_entries"], out["disk_bytes"] = len(entries), sum(e[1] for e in entries)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = (out["memory_hits"] + out["disk_hits"]) / lookups if lookups else float("nan")
+        return out
+
+    def totals(self):
+        """Counters of all sessions that used this cache directory"""
+        self.flush_stats()
+        totals = dict.fromkeys(COUNTERS, 0)
+        if self.path is not None:
+            try:
+                with open(os.path.join(self.path, STATS_NAME), encoding="utf-8") as f:
+                    totals.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        else:
+            totals.update(self._counts)
+        return totals
+
+    def flush_stats(self):
+        """Add this session's new counts to the totals in the cache directory"""
+        if self.path is None:
+            return
+        with self._lock:
+            delta = {name: self._counts[name] - self._flushed[name] for name in COUNTERS}
+            self._flushed = dict(self._counts)
+        if not any(delta.values()):
+            return
+        target = os.path.join(self.path, STATS_NAME)
+        totals = dict.fromkeys(COUNTERS, 0)
+        try:
+            with open(target, encoding="utf-8") as f:
+                totals.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        for name, value in delta.items():
+            totals[name] += value
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(totals, f, indent=1)
+        os.replace(temporary, target)
+
+
+def format_stats(stats, totals=None):
+    """Human-readable text of stats() and optionally totals()"""
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    lines = [f"Session: {lookups:,} lookup(s), {stats['memory_hits']:,} memory hit(s), "
+             f"{stats['disk_hits']:,} disk hit(s), {stats['misses']:,} miss(es), "
+             f"{stats['seconds_saved']:.1f} s saved"]
+    if totals is not None:
+        total = totals["memory_hits"] + totals["disk_hits"]
+        lines.append(f"All sessions: {total:,} hit(s), {totals['misses']:,} miss(es), "
+                     f"{totals['evictions']:,} eviction(s), {totals['seconds_saved']:.1f} s saved")
+    lines.append(f"Memory: {stats['memory_entries']:,} entries, {stats['memory_bytes'] / 1e6:.1f} MB")
+    if "disk_entries" in stats:
+        lines.append(f"Disk: {stats['disk_entries']:,} entries, {stats['disk_bytes'] / 1e6:.1f} MB")
+    return "\n".join(lines)
+
+
+def default_path():
+    """$SLIP_CACHE_DIR, or slip-noslip in the user cache directory"""
+    if os.environ.get("SLIP_CACHE_DIR"):
+        return os.environ["SLIP_CACHE_DIR"]
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    return os.path.join(base or os.path.join(os.path.expanduser("~"), ".cache"), "slip-noslip")
+
+
+_cache = None
+
+
+def get_cache():
+    """The shared cache of the GUI and CLI, configured from the environment"""
+    global _cache
+    if _cache is None:
+        enabled = os.environ.get("SLIP_CACHE", "on").lower() not in ("0", "off", "no", "false")
+        size = float(os.environ.get("SLIP_CACHE_SIZE", DEFAULT_MAX_BYTES / (1 << 20)))
+        _cache = Cache(default_path() if enabled else None, max_bytes=size * (1 << 20), enabled=enabled)
+        atexit.register(_cache.flush_stats)
+    return _cache
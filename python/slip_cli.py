@@ -0,0 +1,963 @@
+"""Command-line entry point for the headless Slip/No-Slip Estimator tools.
+
+Usage:
+    python slip_cli.py batch INPUT OUTPUT [options]
+    python slip_cli.py boundary {speed,gap} [--input INPUT OUTPUT] [options]
+    python slip_cli.py sweep OUTPUT.npy --axis NAME=LO:HI:N [...] [options]
+    python slip_cli.py mc --dist NAME=SPEC [...] [options]
+    python slip_cli.py sobol [--range NAME=LO:HI[:lin] ...] [options]
+    python slip_cli.py openfoam CASE --patch NAME (--speed-field U | --shear-rate-field F) [options]
+    python slip_cli.py vtk INPUT OUTPUT [--gap-array NAME] [--speed-array NAME] [options]
+    python slip_cli.py transient INPUT [--intervals OUTPUT] [--samples OUTPUT] [options]
+    python slip_cli.py fieldmap GAP_MAP [--speed-map MAP] [--ratio-map OUT] [--decision-map OUT] [options]
+    python slip_cli.py fit INPUT [--output OUTPUT] [--bootstrap N] [options]
+    python slip_cli.py greenkubo TRAJECTORY --timestep DT --area A [--columns LIST] [options]
+    python slip_cli.py ingest ARCHIVE DIR [DIR ...] [--workers N] [options]
+    python slip_cli.py query ARCHIVE FILTER [--output OUTPUT] [--count] [options]
+    python slip_cli.py cache {stats,clear} [--json]
+    python slip_cli.py serve [--host HOST] [--port PORT] [options]
+    python slip_cli.py bench [--quick] [--only NAME ...] [--history FILE] [options]
+
+Run "python slip_cli.py COMMAND --help" for the options of each command.
+"""
+
+import argparse
+import fnmatch
+import json
+import sys
+import time
+
+import slip_model
+
+# Command-line option for each model input
+INPUT_OPTIONS = {
+    "gap_nm": "--gap-nm",
+    "sliding_speed": "--sliding-speed",
+    "mu": "--mu",
+    "lambda_friction": "--lambda-friction",
+    "gamma_crit": "--gamma-crit",
+    "exponent": "--exponent",
+}
+
+
+def add_input_options(parser, names=slip_model.INPUT_NAMES, help_suffix=""):
+    """Add one float option per model input, defaulting to the GUI defaults"""
+    for name in names:
+        parser.add_argument(INPUT_OPTIONS[name], dest=name, type=float, default=slip_model.DEFAULTS[name],
+                            help=f"{slip_model.INPUT_LABELS[name]}{help_suffix} "
+                                 f"(default: {slip_model.DEFAULTS[name]:g})")
+
+
+class Throughput:
+    """Rows-per-second reporter that prints progress to stderr"""
+
+    def __init__(self, label, quiet=False, interval=5.0, unit="rows"):
+        self.label = label
+        self.unit = unit
+        self.quiet = quiet
+        self.interval = interval
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._last = self.start
+
+    def update(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if not self.quiet and now - self._last >= self.interval:
+            self._last = now
+            print(f"{self.label}: {self.rows:,} {self.unit}, {self.rate():,.0f} {self.unit}/s", file=sys.stderr)
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.rows / elapsed if elapsed > 0 else float("inf")
+
+    def finish(self):
+        if not self.quiet:
+            elapsed = time.perf_counter() - self.start
+            print(f"{self.label}: {self.rows:,} {self.unit} in {elapsed:.2f} s ({self.rate():,.0f} {self.unit}/s)",
+                  file=sys.stderr)
+
+
+def add_viscosity_options(parser):
+    """Add the options selecting a temperature/pressure-dependent viscosity law"""
+    parser.add_argument("--viscosity", metavar="LAW",
+                        help="viscosity law replacing --mu: vft:A:B:C, arrhenius:MU_REF:E[:T_REF], "
+                             "table:FILE.csv (columns temperature, mu[, pressure]) or water")
+    parser.add_argument("--pressure-law", metavar="LAW",
+                        help="pressure dependence on top of the viscosity law: barus:ALPHA or roelands:Z[:P0]")
+    parser.add_argument("--temperature", type=float, default=293.15,
+                        help="temperature in K where no temperature data is given (default: %(default)s)")
+    parser.add_argument("--pressure", type=float, default=1e5,
+                        help="pressure in Pa where no pressure data is given (default: %(default)s)")
+
+
+def add_shear_rate_option(parser):
+    """Add the option selecting the slip-corrected shear rate"""
+    parser.add_argument("--self-consistent", action="store_true",
+                        help="use the slip-corrected shear rate U/(h + 2 b_eff) instead of U/h")
+
+
+def add_cache_option(parser):
+    """Add the option bypassing the analysis cache"""
+    parser.add_argument("--no-cache", action="store_true",
+                        help="recompute instead of reusing a cached result of the same inputs")
+
+
+def run_cached(args, throughput, func, *func_args, **func_kwargs):
+    """Call func through the analysis cache (slip_cache), then finish the throughput report"""
+    import slip_cache
+
+    if args.no_cache:
+        result = func(*func_args, **func_kwargs)
+    else:
+        cache = slip_cache.get_cache()
+        result = cache.call(func, *func_args, **func_kwargs)
+        if cache.last_hit:
+            if not throughput.quiet:
+                print(f"{throughput.label}: cached result", file=sys.stderr)
+            return result
+    throughput.finish()
+    return result
+
+
+def viscosity_law(args):
+    """The viscosity law selected by add_viscosity_options(), or None for the constant --mu"""
+    if not args.viscosity and not args.pressure_law:
+        return None
+    import slip_viscosity
+
+    base = slip_viscosity.parse_law(args.viscosity, args.mu)
+    return slip_viscosity.parse_pressure_law(args.pressure_law, base)
+
+
+def cmd_batch(args):
+    """Stream an input table through the model and write the results incrementally"""
+    import numpy as np
+    import slip_batch
+    import slip_io
+
+    try:
+        law = viscosity_law(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    in_columns = list(slip_model.INPUT_NAMES)
+    if law is not None:
+        import slip_viscosity
+
+        in_columns += ["temperature", "pressure"]
+        mu = np.empty(args.chunk_rows)
+    out_columns = in_columns + list(slip_batch.RESULT_DTYPE.names)
+    buffer = np.empty(args.chunk_rows, dtype=slip_batch.RESULT_DTYPE)
+    progress = Throughput("batch", quiet=args.quiet)
+
+    with slip_io.open_table_writer(args.output, out_columns) as writer:
+        for chunk in slip_io.iter_table_chunks(args.input, args.chunk_rows, in_columns, skip_missing=True):
+            n = len(next(iter(chunk.values())))
+            values = {name: chunk[name] if name in chunk else getattr(args, name) for name in in_columns}
+            inputs = [values[name] for name in slip_model.INPUT_NAMES]
+            if law is None:
+                result = slip_batch.evaluate_batch(*inputs, out=buffer[:n], self_consistent=args.self_consistent)
+            else:
+                # μ(T, p) replaces the mu column
+                result = slip_viscosity.evaluate_batch(
+                    values["gap_nm"], values["sliding_speed"], values["temperature"], values["pressure"], law,
+                    values["lambda_friction"], values["gamma_crit"], values["exponent"],
+                    out=buffer[:n], mu_out=mu[:n], self_consistent=args.self_consistent)
+                values["mu"] = mu[:n]
+            columns = {name: np.broadcast_to(value, (n,)) for name, value in values.items()}
+            columns.update({name: result[name] for name in slip_batch.RESULT_DTYPE.names})
+            writer.write(columns)
+            progress.update(n)
+
+    progress.finish()
+    return 0
+
+
+# Input that each boundary solve replaces, and the name of its output column
+BOUNDARY_SOLVES = {
+    "speed": ("sliding_speed", "critical_speed"),
+    "gap": ("gap_nm", "critical_gap_nm"),
+}
+
+
+def cmd_boundary(args):
+    """Solve for the critical sliding speed or gap at which slip becomes necessary"""
+    import slip_boundary
+
+    solved, column = BOUNDARY_SOLVES[args.solve]
+    names = [name for name in slip_model.INPUT_NAMES if name != solved]
+    solver = slip_boundary.critical_speed if args.solve == "speed" else slip_boundary.critical_gap
+
+    if args.input is None:
+        value = float(solver(*[getattr(args, name) for name in names]))
+        unit = "m/s" if args.solve == "speed" else "nm"
+        relation = ">=" if args.solve == "speed" else "<="
+        print(f"{column} = {value:.6e} {unit} (slip recommended for {solved} {relation} {column})")
+        return 0
+
+    import numpy as np
+    import slip_io
+
+    input_path, output_path = args.input
+    progress = Throughput("boundary", quiet=args.quiet)
+    with slip_io.open_table_writer(output_path, names + [column]) as writer:
+        for chunk in slip_io.iter_table_chunks(input_path, args.chunk_rows, names, skip_missing=True):
+            n = len(next(iter(chunk.values())))
+            inputs = [chunk[name] if name in chunk else getattr(args, name) for name in names]
+            columns = {name: np.broadcast_to(value, (n,)) for name, value in zip(names, inputs)}
+            columns[column] = solver(*inputs)
+            writer.write(columns)
+            progress.update(n)
+
+    progress.finish()
+    return 0
+
+
+def cmd_sweep(args):
+    """Evaluate a Cartesian grid of inputs across a process pool into a .npy file"""
+    import slip_sweep
+
+    axes = dict(slip_sweep.parse_axis(spec) for spec in args.axis)
+    for name in slip_model.INPUT_NAMES:
+        axes.setdefault(name, getattr(args, name))
+    axes = slip_sweep.make_axes(**axes)
+    shape = slip_sweep.grid_shape(axes)
+
+    progress = Throughput("sweep", quiet=args.quiet)
+    try:
+        stats = slip_sweep.run_sweep(axes, args.output, workers=args.workers, task_rows=args.task_rows,
+                                     progress=progress.update, resume=args.resume)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    if not args.quiet:
+        skipped = stats["rows"] - stats["computed"]
+        print(f"grid {' x '.join(map(str, shape))} written to {args.output}"
+              + (f" ({skipped:,} rows already done)" if skipped else ""), file=sys.stderr)
+        for worker, ws in sorted(stats["workers"].items()):
+            rate = ws["rows"] / ws["seconds"] if ws["seconds"] > 0 else 0.0
+            print(f"  worker {worker}: {ws['rows']:,} rows in {ws['tasks']} tasks "
+                  f"({ws['steals']} stolen), {rate:,.0f} rows/s", file=sys.stderr)
+    return 0
+
+
+def cmd_mc(args):
+    """Propagate input distributions through the model by Monte Carlo"""
+    import slip_montecarlo
+
+    distributions = {name: slip_montecarlo.Fixed(getattr(args, name)) for name in slip_model.INPUT_NAMES}
+    for spec in args.dist:
+        name, _, dist = spec.partition("=")
+        name = name.strip().replace("-", "_")
+        if name not in slip_model.INPUT_NAMES:
+            print(f"error: unknown input '{name}'", file=sys.stderr)
+            return 2
+        distributions[name] = slip_montecarlo.parse_distribution(dist)
+    quantiles = [float(q) for q in args.quantiles.split(",")]
+
+    progress = Throughput("mc", quiet=args.quiet, unit="samples")
+    summary = run_cached(args, progress, slip_montecarlo.run_monte_carlo, distributions, args.samples,
+                         seed=args.seed, block_size=args.block, workers=args.workers, progress=progress.update)
+    report = summary.report(quantiles)
+    report["distributions"] = {name: repr(dist) for name, dist in distributions.items()}
+    print(json.dumps(report, indent=2) if args.json else slip_montecarlo.format_report(report))
+    return 0
+
+
+def cmd_sobol(args):
+    """Estimate first-order and total Sobol indices of the slip ratio"""
+    import slip_sensitivity
+
+    center = {name: getattr(args, name) for name in slip_model.INPUT_NAMES}
+    ranges = {}
+    if not args.range:
+        ranges = slip_sensitivity.default_ranges(center, args.decades)
+    for spec in args.range:
+        name, bounds = slip_sensitivity.parse_range(spec)
+        ranges[name] = bounds
+
+    progress = Throughput("sobol", quiet=args.quiet, unit="samples")
+    result = run_cached(args, progress, slip_sensitivity.run_sobol, ranges, args.samples, fixed=center,
+                        output=args.output, seed=args.seed, workers=args.workers, progress=progress.update)
+    print(json.dumps(result, indent=2) if args.json else slip_sensitivity.format_result(result))
+    return 0
+
+
+def cmd_openfoam(args):
+    """Write per-face Navier slip lengths for the wall patches of an OpenFOAM case"""
+    import slip_openfoam
+
+    progress = Throughput("openfoam", quiet=args.quiet, unit="faces")
+    binary = {"ascii": False, "binary": True}.get(args.format)
+    try:
+        paths = slip_openfoam.write_slip_fields(
+            args.case, args.patch, args.mu, args.lambda_friction, args.gamma_crit, args.exponent,
+            time=args.time, region=args.region, speed_field=args.speed_field,
+            shear_rate_field=args.shear_rate_field, shear_rate_scale=args.shear_rate_scale,
+            gap_field=args.gap_field, gap_nm=args.gap_nm, output_field=args.output_field,
+            ratio_field=args.ratio_field, binary=binary, chunk=args.chunk, progress=progress.update)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    if not args.quiet:
+        for path in paths:
+            print(f"wrote {path}", file=sys.stderr)
+    return 0
+
+
+def cmd_vtk(args):
+    """Evaluate the slip model on the cells of a VTK surface and add the results as cell arrays"""
+    import slip_vtk
+
+    progress = Throughput("vtk", quiet=args.quiet, unit="cells")
+    try:
+        slip_vtk.map_slip(args.input, args.output, args.mu, args.lambda_friction, args.gamma_crit, args.exponent,
+                          gap_array=args.gap_array, gap_nm=args.gap_nm, speed_array=args.speed_array,
+                          sliding_speed=args.sliding_speed, prefix=args.prefix, chunk=args.chunk,
+                          progress=progress.update)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    return 0
+
+
+def cmd_transient(args):
+    """Stream a U(t)/h(t) log through the model and write the intervals between regime flips"""
+    import numpy as np
+    import slip_io
+    import slip_transient
+
+    try:
+        detector = slip_transient.FlipDetector(args.hysteresis, args.min_dwell)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    series = slip_transient.iter_series(args.input, args.speed_column, args.time_column, args.gap_column,
+                                        args.sample_rate, args.chunk_rows)
+    samples = None
+    if args.samples is not None:
+        samples = slip_io.open_table_writer(args.samples, slip_transient.SAMPLE_COLUMNS)
+
+    def write_samples(time, speed, gap, results):
+        samples.write({"time": time, "sliding_speed": speed, "gap_nm": np.broadcast_to(gap, time.shape),
+                       "b_eff": results["b_eff"], "ratio": results["ratio"], "slip": results["slip"]})
+
+    progress = Throughput("transient", quiet=args.quiet, unit="samples")
+    pending = []
+    flips = 0
+    slip_time = total_time = 0.0
+
+    def flush(n=0):
+        # Intervals are written once per chunk; on stdout they are meant to be followed online
+        if pending:
+            columns = {name: [getattr(interval, name) for interval in pending]
+                       for name in ("start", "end", "slip", "samples")}
+            columns["duration"] = [interval.end - interval.start for interval in pending]
+            writer.write(columns)
+            pending.clear()
+            if args.intervals == "-":
+                sys.stdout.flush()
+        progress.update(n)
+
+    try:
+        with slip_io.open_table_writer(args.intervals, slip_transient.INTERVAL_COLUMNS) as writer:
+            for interval in slip_transient.run_transient(
+                    series, args.mu, args.lambda_friction, args.gamma_crit, args.exponent, gap_nm=args.gap_nm,
+                    detector=detector, on_samples=write_samples if samples is not None else None,
+                    progress=flush):
+                pending.append(interval)
+                flips += 1
+                total_time += interval.end - interval.start
+                slip_time += interval.end - interval.start if interval.slip else 0.0
+            flush()
+    except (KeyError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if samples is not None:
+            samples.close()
+    progress.finish()
+    if not args.quiet and flips:
+        print(f"{flips - 1:,} regime flips; slip for {slip_time:.6g} of {total_time:.6g} time units "
+              f"({100 * slip_time / total_time if total_time > 0 else 0:.1f}%)", file=sys.stderr)
+    return 0
+
+
+def cmd_fieldmap(args):
+    """Evaluate the model over a film-thickness map, tile by tile, and report regime areas"""
+    import slip_fieldmap
+
+    raw = {}
+    if args.raw_shape is not None:
+        raw = {"shape": [int(v) for v in args.raw_shape.split(",")], "dtype": args.raw_dtype,
+               "offset": args.raw_offset}
+    progress = Throughput("fieldmap", quiet=args.quiet, unit="pixels")
+    try:
+        gap = slip_fieldmap.open_map(args.gap_map, **raw)
+        speed = args.sliding_speed
+        if args.speed_map is not None:
+            speed = slip_fieldmap.open_map(args.speed_map, **raw)
+        temperature, pressure = args.temperature, args.pressure
+        if args.temperature_map is not None:
+            temperature = slip_fieldmap.open_map(args.temperature_map, **raw)
+        if args.pressure_map is not None:
+            pressure = slip_fieldmap.open_map(args.pressure_map, **raw)
+        summary = slip_fieldmap.process_map(
+            gap, speed, args.mu, args.lambda_friction, args.gamma_crit, args.exponent,
+            gap_scale=args.gap_scale, gap_offset=args.gap_offset, speed_scale=args.speed_scale,
+            nodata=args.nodata, ratio_output=args.ratio_map, decision_output=args.decision_map,
+            pixel_size=args.pixel_size, viscosity=viscosity_law(args), temperature=temperature,
+            pressure=pressure, self_consistent=args.self_consistent, tile=args.tile, progress=progress.update)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    print(json.dumps(summary, indent=2) if args.json else slip_fieldmap.format_summary(summary))
+    return 0
+
+
+def cmd_fit(args):
+    """Fit b0 (lambda), gamma_c and m to measured slip length versus shear rate"""
+    import slip_fit
+    import slip_io
+
+    try:
+        dataset, shear_rate, b_eff = slip_fit.read_datasets(args.input, args.shear_rate_column,
+                                                            args.slip_length_column, args.dataset_column)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress = Throughput("fit", quiet=args.quiet or not args.bootstrap, unit="replicates")
+    fits = run_cached(args, progress, slip_fit.fit_datasets, shear_rate, b_eff, dataset, mu=args.mu,
+                      bootstrap=args.bootstrap, confidence=args.confidence, seed=args.seed,
+                      progress=progress.update)
+    if args.output is not None:
+        with slip_io.open_table_writer(args.output, slip_fit.FIT_DTYPE.names) as writer:
+            writer.write({name: fits[name] for name in slip_fit.FIT_DTYPE.names})
+    if args.output != "-":
+        print(slip_fit.format_fits(fits))
+    return 0
+
+
+def cmd_greenkubo(args):
+    """Green-Kubo friction coefficient from a wall-force trajectory, fed into the slip model"""
+    import slip_greenkubo
+    import slip_io
+
+    def chunks():
+        return slip_greenkubo.iter_forces(args.trajectory, args.columns, args.format, args.fields, args.dtype,
+                                          args.offset, args.chunk_rows)
+
+    try:
+        mean = None
+        if not args.keep_mean:
+            # A first pass for the mean makes λ independent of the chunk size
+            progress = Throughput("mean force", quiet=args.quiet, unit="samples")
+            mean = slip_greenkubo.mean_force(chunks(), progress=progress.update)
+            progress.finish()
+        progress = Throughput("greenkubo", quiet=args.quiet, unit="samples")
+        result = slip_greenkubo.run_green_kubo(
+            chunks(), args.timestep, args.area, args.temperature,
+            force_scale=args.force_scale, max_lag=args.max_lag, block=args.block,
+            subtract_mean=not args.keep_mean, mean=mean, progress=progress.update)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    if args.acf is not None:
+        with slip_io.open_table_writer(args.acf, ("time", "acf", "acf_error", "running", "running_error")) as writer:
+            writer.write(result)
+    inputs = {name: getattr(args, name, None) for name in slip_model.INPUT_NAMES}
+    inputs["lambda_friction"] = result["lambda_friction"]
+    model = slip_model.evaluate(**inputs)
+    if args.json:
+        report = {name: result[name] for name in ("lambda_friction", "lambda_error", "plateau_time", "blocks",
+                                                  "samples")}
+        report["model"] = model._asdict()
+        print(json.dumps(report, indent=2))
+    else:
+        print(slip_greenkubo.format_result(result))
+        print(f"Slip length ratio with this λ: {model.ratio:.4e} -> {slip_model.recommendation(model.ratio)}")
+    return 0
+
+
+def cmd_ingest(args):
+    """Parse exported text reports into an indexed archive"""
+    import slip_ingest
+
+    progress = Throughput("ingest", quiet=args.quiet, unit="files")
+    try:
+        summary = slip_ingest.ingest(args.roots, args.archive, pattern=args.pattern, workers=args.workers,
+                                     progress=progress.update)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    progress.finish()
+    for path, error in summary["failed"]:
+        print(f"warning: {path}: {error}", file=sys.stderr)
+    print(f"{summary['added']:,} report(s) added, {summary['skipped']:,} already archived, "
+          f"{len(summary['failed']):,} failed; {summary['rows']:,} rows in {args.archive}")
+    return 1 if summary["failed"] else 0
+
+
+def cmd_query(args):
+    """Select archived results with a filter and print or write them"""
+    import slip_ingest
+    import slip_io
+
+    try:
+        archive = slip_ingest.open_archive(args.archive)
+        start = time.perf_counter()
+        rows = archive.rows(args.filter)
+        elapsed = time.perf_counter() - start
+        columns = args.columns.split(",") if args.columns else list(slip_ingest.ARCHIVE_DTYPE.names)
+        data = archive.store.read(rows, columns)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not args.quiet:
+        print(f"query: {len(rows):,} of {len(archive):,} rows in {elapsed * 1e3:.1f} ms", file=sys.stderr)
+    if args.count:
+        print(len(rows))
+        return 0
+    if args.sources:
+        print("\n".join(archive.sources(archive.store.read(rows, ["source"])["source"])))
+        return 0
+    with slip_io.open_table_writer(args.output, columns) as writer:
+        writer.write({name: data[name] for name in columns})
+    return 0
+
+
+def cmd_cache(args):
+    """Show the statistics of the analysis cache or empty it"""
+    import slip_cache
+
+    cache = slip_cache.get_cache()
+    if args.action == "clear":
+        cache.clear()
+        print(f"cleared {cache.path or 'the in-memory cache'}")
+        return 0
+    stats, totals = cache.stats(), cache.totals()
+    if args.json:
+        print(json.dumps({"path": cache.path, "enabled": cache.enabled, "session": stats, "totals": totals},
+                         indent=2))
+    else:
+        print(f"Cache: {cache.path if cache.enabled else 'disabled'}")
+        print(slip_cache.format_stats(stats, totals))
+    return 0
+
+
+def cmd_serve(args):
+    """Serve the model, batch path and boundary solver over local HTTP"""
+    import slip_server
+
+    def ready(server):
+        print(f"serving on http://{server.host}:{server.port} (Ctrl+C to stop)", file=sys.stderr)
+
+    try:
+        slip_server.serve(args.host, args.port, max_batch=args.max_batch, max_delay=args.max_delay * 1e-3,
+                          ready=ready)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_bench(args):
+    """Run the benchmark suite, record it and compare it with earlier runs"""
+    import slip_bench
+
+    names = args.only or []
+    unknown = [p for p in names if not any(fnmatch.fnmatch(n, p) for n in slip_bench.BENCHMARKS)]
+    if unknown:
+        print(f"error: no benchmark matches {', '.join(unknown)} (choose from {', '.join(slip_bench.BENCHMARKS)})",
+              file=sys.stderr)
+        return 2
+
+    def progress(name, result):
+        if args.quiet:
+            return
+        if result is None:
+            print(f"{name}: skipped (optional package missing)", file=sys.stderr)
+        else:
+            print(f"{name}: {result['rate']:,.0f} {result['unit']}/s, peak {result['peak_mb']:.1f} MB",
+                  file=sys.stderr)
+
+    record = slip_bench.run_suite(names, quick=args.quick, repeat=args.repeat, progress=progress)
+    history = slip_bench.read_history(args.history)
+    comparison = slip_bench.compare(record, history, args.threshold, args.memory_threshold)
+    if not args.no_record:
+        slip_bench.append_history(args.history, record)
+    regressed = [row for row in comparison if row["regressed"]]
+    if args.json:
+        print(json.dumps({"record": record, "comparison": comparison}, indent=2))
+    else:
+        print(slip_bench.format_report(record, comparison))
+    for row in regressed:
+        print(f"regression: {row['name']} ({', '.join(row['regressed'])})", file=sys.stderr)
+    return 1 if regressed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="slip_cli.py", description="Headless Slip/No-Slip Estimator tools")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {slip_model.VERSION}")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+
+    batch = commands.add_parser(
+        "batch", help="evaluate every row of a CSV/Parquet table",
+        description="Stream a CSV or Parquet table of model inputs in fixed-size chunks and write "
+                    "shear rate, shear stress, b0, b_eff, ratio and the slip decision for each row. "
+                    f"Input columns are named {', '.join(slip_model.INPUT_NAMES)}; "
+                    "columns that are absent take the value of the matching option. With --viscosity "
+                    "or --pressure-law, mu is computed from the temperature (K) and pressure (Pa) "
+                    "columns instead.")
+    batch.add_argument("input", help="input table (.csv, .parquet/.pq, .store, or - for CSV on stdin)")
+    batch.add_argument("output", help="output table (.csv, .parquet/.pq, or - for CSV on stdout); "
+                                      "a .store result store is created or appended to")
+    batch.add_argument("--chunk-rows", type=int, default=1 << 17, help="rows per chunk (default: %(default)s)")
+    batch.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(batch, help_suffix=" for a missing column")
+    add_viscosity_options(batch)
+    add_shear_rate_option(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    boundary = commands.add_parser(
+        "boundary", help="solve for the critical sliding speed or gap",
+        description="Invert the criterion b_eff/h = 0.01. 'speed' gives the sliding speed above which "
+                    "slip is recommended (closed form); 'gap' gives the gap height below which slip is "
+                    "recommended (safeguarded Newton solve). Without --input the single case given by "
+                    "the options is solved and printed.")
+    boundary.add_argument("solve", choices=sorted(BOUNDARY_SOLVES), help="quantity to solve for")
+    boundary.add_argument("--input", nargs=2, metavar=("INPUT", "OUTPUT"),
+                          help="stream a CSV/Parquet table of inputs and write the solutions to OUTPUT")
+    boundary.add_argument("--chunk-rows", type=int, default=1 << 17, help="rows per chunk (default: %(default)s)")
+    boundary.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(boundary, help_suffix=" (ignored for the solved quantity)")
+    boundary.set_defaults(func=cmd_boundary)
+
+    sweep = commands.add_parser(
+        "sweep", help="evaluate a Cartesian grid of inputs on all cores",
+        description="Sweep the model over the Cartesian product of the given axes. Shards of the grid "
+                    "are evaluated by a process pool that writes straight into a memory-mapped .npy "
+                    "file (structured, one field per result) with the grid's shape, in the axis order "
+                    f"{', '.join(slip_model.INPUT_NAMES)}. The axis values are saved to OUTPUT.axes.npz. "
+                    "An OUTPUT ending in .store is written as a chunked result store with input "
+                    "columns, see slip_store. Idle workers steal tasks from busy ones, and finished "
+                    "tasks are checkpointed to OUTPUT.manifest.")
+    sweep.add_argument("output", help="output .npy file, or a result store path ending in .store")
+    sweep.add_argument("--axis", action="append", default=[], metavar="NAME=LO:HI:N[:lin]",
+                       help="log-spaced axis (linear with ':lin'), or NAME=VALUE; may be repeated")
+    sweep.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    sweep.add_argument("--task-rows", type=int, default=1 << 20,
+                       help="grid points per scheduled task (default: %(default)s)")
+    sweep.add_argument("--resume", action="store_true",
+                       help="keep an interrupted OUTPUT and compute only the tasks missing from "
+                            "OUTPUT.manifest")
+    sweep.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(sweep, help_suffix=" for inputs without an axis")
+    sweep.set_defaults(func=cmd_sweep)
+
+    mc = commands.add_parser(
+        "mc", help="Monte Carlo uncertainty propagation",
+        description="Sample uncertain inputs in vectorized blocks and report P(slip) and quantiles of "
+                    "b_eff and b_eff/h from streaming accumulators, so memory stays bounded for any "
+                    "number of samples. Distribution specs: VALUE, uniform:LO:HI, loguniform:LO:HI, "
+                    "lognormal:MEDIAN:SIGMA_DECADES, hist:FILE.csv or loghist:FILE.csv "
+                    "(columns lower,upper,weight).")
+    mc.add_argument("--dist", action="append", default=[], metavar="NAME=SPEC",
+                    help="distribution of one input, e.g. lambda_friction=loguniform:1e6:1e8; may be repeated")
+    mc.add_argument("--samples", type=lambda v: int(float(v)), default=10**6,
+                    help="number of samples (default: %(default)s)")
+    mc.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    mc.add_argument("--block", type=int, default=1 << 20, help="samples per block (default: %(default)s)")
+    mc.add_argument("--workers", type=int, default=1, help="worker processes (default: %(default)s)")
+    mc.add_argument("--quantiles", default="0.05,0.25,0.5,0.75,0.95",
+                    help="comma-separated quantiles to report (default: %(default)s)")
+    mc.add_argument("--json", action="store_true", help="print the summary as JSON")
+    mc.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(mc, help_suffix=" for inputs without a distribution")
+    add_cache_option(mc)
+    mc.set_defaults(func=cmd_mc)
+
+    sobol = commands.add_parser(
+        "sobol", help="global sensitivity analysis (Sobol indices)",
+        description="Estimate first-order and total Sobol indices with the Saltelli scheme. Inputs given "
+                    "with --range are varied (log-uniformly unless ':lin' is appended); the others stay "
+                    "at their option values. Without --range every input is varied over +/- --decades "
+                    "around the option values (the exponent by +/-1).")
+    sobol.add_argument("--range", action="append", default=[], metavar="NAME=LO:HI[:lin]",
+                       help="range of one varied input; may be repeated")
+    sobol.add_argument("--decades", type=float, default=1.0,
+                       help="half-width of the default ranges in decades (default: %(default)s)")
+    sobol.add_argument("--output", choices=("log10_ratio", "ratio", "slip"), default="log10_ratio",
+                       help="quantity analysed: log10(b_eff/h), b_eff/h or the slip decision "
+                            "(default: %(default)s)")
+    sobol.add_argument("--samples", type=lambda v: int(float(v)), default=10**6,
+                       help="base samples N; the model runs N (d + 2) times (default: %(default)s)")
+    sobol.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    sobol.add_argument("--workers", type=int, default=1, help="worker processes (default: %(default)s)")
+    sobol.add_argument("--json", action="store_true", help="print the result as JSON")
+    sobol.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(sobol, help_suffix=" (operating point)")
+    add_cache_option(sobol)
+    sobol.set_defaults(func=cmd_sobol)
+
+    openfoam = commands.add_parser(
+        "openfoam", help="per-face slip lengths for OpenFOAM wall patches",
+        description="Read the values of an OpenFOAM field (ASCII or binary, optionally gzipped) on the "
+                    "given wall patches, compute b_eff face by face in chunks and write it as a "
+                    "volScalarField in the same time directory. The shear rate is |U|/h from a velocity "
+                    "field, or is read from a field of its own and multiplied by --shear-rate-scale "
+                    "(e.g. 1/nu for the kinematic wallShearStress). The gap comes from a scalar field "
+                    "in metres or from --gap-nm.")
+    openfoam.add_argument("case", help="OpenFOAM case directory")
+    openfoam.add_argument("--patch", action="append", required=True, help="wall patch name; may be repeated")
+    source = openfoam.add_mutually_exclusive_group(required=True)
+    source.add_argument("--speed-field", metavar="FIELD", help="velocity field giving the sliding speed")
+    source.add_argument("--shear-rate-field", metavar="FIELD", help="field giving the wall shear rate")
+    openfoam.add_argument("--shear-rate-scale", type=float, default=1.0,
+                          help="factor applied to --shear-rate-field values (default: %(default)s)")
+    openfoam.add_argument("--gap-field", metavar="FIELD", help="scalar field with the local gap in metres")
+    openfoam.add_argument("--time", help="time directory (default: latest)")
+    openfoam.add_argument("--region", help="mesh region of a multi-region case")
+    openfoam.add_argument("--output-field", default="slipLength", help="name of the written field "
+                                                                      "(default: %(default)s)")
+    openfoam.add_argument("--ratio-field", metavar="FIELD", help="also write b_eff/h under this name")
+    openfoam.add_argument("--format", choices=("same", "ascii", "binary"), default="same",
+                          help="format of the written fields (default: that of the input field)")
+    openfoam.add_argument("--chunk", type=int, default=1 << 20, help="faces per chunk (default: %(default)s)")
+    openfoam.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(openfoam, help_suffix=" (--gap-nm is used when there is no --gap-field)")
+    openfoam.set_defaults(func=cmd_openfoam)
+
+    vtk = commands.add_parser(
+        "vtk", help="slip mapping on a VTK surface (.vtk, .vtu, .vtp)",
+        description="Evaluate the slip model on every cell of a legacy .vtk or XML .vtu/.vtp surface and write "
+                    "a copy with the cell arrays b_eff, ratio and slip (0/1) added. The gap comes from a cell "
+                    "array in metres or from --gap-nm, the sliding speed from the magnitude of a cell array "
+                    "or from --sliding-speed. Raw binary arrays are memory-mapped, and for legacy binary and "
+                    "raw appended XML files the results are written straight into the output file.")
+    vtk.add_argument("input", help="input surface")
+    vtk.add_argument("output", help="output surface (same format as the input)")
+    vtk.add_argument("--gap-array", metavar="NAME", help="cell array with the local gap in metres")
+    vtk.add_argument("--speed-array", metavar="NAME", help="cell array with the local sliding velocity or speed")
+    vtk.add_argument("--prefix", default="", help="prefix for the names of the added arrays")
+    vtk.add_argument("--chunk", type=int, default=1 << 20, help="cells per chunk (default: %(default)s)")
+    vtk.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(vtk, help_suffix=" (gap and speed are used without the matching array)")
+    vtk.set_defaults(func=cmd_vtk)
+
+    transient = commands.add_parser(
+        "transient", help="regime flips along a sliding-speed time series",
+        description="Stream a CSV/Parquet/store log of sliding speed (and optionally gap, in nm) versus "
+                    "time in fixed-size chunks, evaluate b_eff(t) and b_eff/h(t) and write the intervals "
+                    "of constant regime (start, end, duration, slip 0/1, samples). The slip threshold has "
+                    "a hysteresis band: slip starts at 0.01*(1+H) and ends below 0.01/(1+H). A flip only "
+                    "counts once the new regime has lasted --min-dwell time units, and its interval is "
+                    "written as soon as it is confirmed, so the command can follow a live log on stdin.")
+    transient.add_argument("input", help="input log (.csv, .parquet/.pq, .store, or - for CSV on stdin)")
+    transient.add_argument("--intervals", default="-",
+                           help="output table of regime intervals (default: CSV on stdout)")
+    transient.add_argument("--samples", metavar="OUTPUT",
+                           help="also write time, speed, gap, b_eff, ratio and the raw decision per sample")
+    transient.add_argument("--time-column", default="time", help="time column (default: %(default)s)")
+    transient.add_argument("--speed-column", default="sliding_speed",
+                           help="sliding speed column in m/s (default: %(default)s)")
+    transient.add_argument("--gap-column", help="gap column in nm (default: constant --gap-nm)")
+    transient.add_argument("--sample-rate", type=float,
+                           help="sampling rate in Hz; times are then sample_index / rate and no time column is read")
+    transient.add_argument("--hysteresis", type=float, default=0.0,
+                           help="relative half-width H of the hysteresis band (default: %(default)s)")
+    transient.add_argument("--min-dwell", type=float, default=0.0,
+                           help="minimum duration of a regime, in time units (default: %(default)s)")
+    transient.add_argument("--chunk-rows", type=int, default=1 << 17, help="rows per chunk (default: %(default)s)")
+    transient.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(transient, names=("gap_nm", "mu", "lambda_friction", "gamma_crit", "exponent"),
+                      help_suffix=" (--gap-nm is used without --gap-column)")
+    transient.set_defaults(func=cmd_transient)
+
+    fieldmap = commands.add_parser(
+        "fieldmap", help="slip maps for a film-thickness map h(x, y)",
+        description="Evaluate b_eff/h over a 2D film-thickness map (.npy, raw binary, or uncompressed TIFF "
+                    "height field), with a constant sliding speed or a speed map of the same shape. The "
+                    "maps are memory-mapped and processed tile by tile, so their size is not limited by "
+                    "RAM. Prints the slip and no-slip area fractions and optionally writes the ratio map "
+                    "(float32) and the decision map (uint8: 0 no-slip, 1 slip, 255 no data) as .npy or, "
+                    "for .tif/.tiff paths, TIFF.")
+    fieldmap.add_argument("gap_map", help="film-thickness map (.npy, .tif/.tiff, or raw with --raw-shape)")
+    fieldmap.add_argument("--speed-map", metavar="MAP", help="sliding-speed map (default: constant --sliding-speed)")
+    fieldmap.add_argument("--temperature-map", metavar="MAP", help="temperature map in K (with --viscosity)")
+    fieldmap.add_argument("--pressure-map", metavar="MAP", help="pressure map in Pa (with --pressure-law)")
+    fieldmap.add_argument("--ratio-map", metavar="OUTPUT", help="write the b_eff/h map")
+    fieldmap.add_argument("--decision-map", metavar="OUTPUT", help="write the slip decision map")
+    fieldmap.add_argument("--gap-scale", type=float, default=1.0,
+                          help="nm per map unit, e.g. the height step of a 16-bit TIFF (default: %(default)s)")
+    fieldmap.add_argument("--gap-offset", type=float, default=0.0,
+                          help="nm added after scaling (default: %(default)s)")
+    fieldmap.add_argument("--speed-scale", type=float, default=1.0,
+                          help="m/s per unit of the speed map or --sliding-speed (default: %(default)s)")
+    fieldmap.add_argument("--nodata", type=float, help="raw gap value marking pixels without data")
+    fieldmap.add_argument("--raw-shape", metavar="ROWS,COLUMNS", help="shape of raw binary maps")
+    fieldmap.add_argument("--raw-dtype", default="<f4", help="NumPy dtype of raw binary maps (default: %(default)s)")
+    fieldmap.add_argument("--raw-offset", type=int, default=0, help="header bytes of raw binary maps "
+                                                                    "(default: %(default)s)")
+    fieldmap.add_argument("--pixel-size", type=float, help="pixel edge length in m, to report areas in m²")
+    fieldmap.add_argument("--tile", type=int, default=1024, help="tile edge length in pixels (default: %(default)s)")
+    fieldmap.add_argument("--json", action="store_true", help="print the summary as JSON")
+    fieldmap.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(fieldmap, names=("sliding_speed", "mu", "lambda_friction", "gamma_crit", "exponent"),
+                      help_suffix=" (--sliding-speed is used without --speed-map)")
+    add_viscosity_options(fieldmap)
+    add_shear_rate_option(fieldmap)
+    fieldmap.set_defaults(func=cmd_fieldmap)
+
+    fit = commands.add_parser(
+        "fit", help="fit lambda, gamma_c and m to measured slip lengths",
+        description="Fit b_eff = b0 [1 + (gamma/gamma_c)^m] to tables of measured slip length versus shear "
+                    "rate by least squares on ln b_eff, for every dataset in the table at once. lambda "
+                    "follows from b0 = mu/lambda. With --bootstrap, resampled refits give percentile "
+                    "confidence intervals. Prints the fitted parameters and optionally writes them as a "
+                    "table (one row per dataset).")
+    fit.add_argument("input", help="input table (.csv, .parquet/.pq, .store, or - for CSV on stdin)")
+    fit.add_argument("--output", help="output table of fitted parameters (- for CSV on stdout)")
+    fit.add_argument("--shear-rate-column", default="shear_rate",
+                     help="shear rate column in 1/s (default: %(default)s)")
+    fit.add_argument("--slip-length-column", default="b_eff",
+                     help="slip length column in m (default: %(default)s)")
+    fit.add_argument("--dataset-column", default="dataset",
+                     help="numeric dataset id column; without it all rows form one dataset (default: %(default)s)")
+    fit.add_argument("--bootstrap", type=int, default=0, help="bootstrap replicates (default: %(default)s)")
+    fit.add_argument("--confidence", type=float, default=0.95,
+                     help="confidence level of the bootstrap intervals (default: %(default)s)")
+    fit.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    fit.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(fit, names=("mu",), help_suffix=" used to convert b0 to lambda")
+    add_cache_option(fit)
+    fit.set_defaults(func=cmd_fit)
+
+    greenkubo = commands.add_parser(
+        "greenkubo", help="friction coefficient lambda from an MD wall-force trajectory",
+        description="Estimate lambda = 1/(A kB T) * integral of <F(0) F(t)> dt from the lateral force on a wall "
+                    "in equilibrium MD. The trajectory is streamed in chunks and correlated block by block "
+                    "with FFTs; the spread of the blocks gives the error bar. Each listed force column "
+                    "(e.g. x and y) adds its own blocks. lambda is read at the plateau (maximum) of the "
+                    "running integral within --max-lag and then fed into the slip model with the other "
+                    "inputs.")
+    greenkubo.add_argument("trajectory", help="force trajectory: text (whitespace or comma separated, '#' "
+                                              "comments), raw binary, .npy, or a CSV/Parquet/store table")
+    greenkubo.add_argument("--timestep", type=float, required=True, help="time between samples in s")
+    greenkubo.add_argument("--area", type=float, required=True, help="wall area in m²")
+    greenkubo.add_argument("--temperature", type=float, default=300.0, help="temperature in K (default: %(default)s)")
+    greenkubo.add_argument("--columns", default="1,2",
+                           help="force columns: 0-based indices, or names for tables (default: %(default)s)")
+    greenkubo.add_argument("--format", choices=("auto", "text", "binary", "table"), default="auto",
+                           help="trajectory format (default: from the extension and options)")
+    greenkubo.add_argument("--fields", type=int, help="values per sample in a raw binary trajectory")
+    greenkubo.add_argument("--dtype", default="<f8", help="NumPy dtype of a raw binary trajectory "
+                                                          "(default: %(default)s)")
+    greenkubo.add_argument("--offset", type=int, default=0, help="header bytes of a raw binary trajectory "
+                                                                 "(default: %(default)s)")
+    greenkubo.add_argument("--force-scale", type=float, default=1.0,
+                           help="N per force unit, e.g. 6.9477e-11 for LAMMPS real units (default: %(default)s)")
+    greenkubo.add_argument("--max-lag", type=int, default=2000,
+                           help="longest correlation lag in samples (default: %(default)s)")
+    greenkubo.add_argument("--block", type=int, help="block length in samples (default: 20 x --max-lag)")
+    greenkubo.add_argument("--keep-mean", action="store_true", help="do not subtract the mean force")
+    greenkubo.add_argument("--acf", metavar="OUTPUT",
+                           help="write the autocorrelation and running integral with their errors")
+    greenkubo.add_argument("--chunk-rows", type=int, default=1 << 17, help="samples per chunk (default: %(default)s)")
+    greenkubo.add_argument("--json", action="store_true", help="print the result as JSON")
+    greenkubo.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    add_input_options(greenkubo, names=("gap_nm", "sliding_speed", "mu", "gamma_crit", "exponent"),
+                      help_suffix=" for the slip model")
+    greenkubo.set_defaults(func=cmd_greenkubo)
+
+    ingest = commands.add_parser(
+        "ingest", help="parse exported text reports into an indexed archive",
+        description="Walk directory trees of exported .txt reports (the GUI's export and its ASCII "
+                    "fallback, old and new layouts), parse them in parallel and append the results to an "
+                    "archive: a result store with the export time, the source file and a sorted index per "
+                    "input column, ratio and slip. Reports already in the archive are skipped. Exits with "
+                    "status 1 if any report did not parse.")
+    ingest.add_argument("archive", help="archive directory (.store), created if needed")
+    ingest.add_argument("roots", nargs="+", metavar="DIR", help="directories (or single files) to ingest")
+    ingest.add_argument("--pattern", default="*.txt", help="file name pattern (default: %(default)s)")
+    ingest.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ingest.add_argument("-q", "--quiet", action="store_true", help="do not report throughput")
+    ingest.set_defaults(func=cmd_ingest)
+
+    query = commands.add_parser(
+        "query", help="select archived results with a filter",
+        description="Select the rows of an ingested archive matching a filter of conditions joined by "
+                    "'and' or commas, e.g. \"slip == 1 and gap_nm < 50\", using the archive's sorted "
+                    "indexes, and write them as a table.")
+    query.add_argument("archive", help="archive written by the ingest command")
+    query.add_argument("filter", help="filter expression (empty selects every row)")
+    query.add_argument("--output", default="-", help="output table (default: CSV on stdout)")
+    query.add_argument("--columns", help="comma-separated columns to write (default: all)")
+    query.add_argument("--sources", action="store_true", help="print the report file of each row instead of a table")
+    query.add_argument("--count", action="store_true", help="print only the number of matching rows")
+    query.add_argument("-q", "--quiet", action="store_true", help="do not report the query time")
+    query.set_defaults(func=cmd_query)
+
+    cache = commands.add_parser(
+        "cache", help="show or clear the analysis cache",
+        description="The mc, sobol and fit commands and the GUI's analyses reuse results of identical "
+                    "inputs and code from an on-disk cache ($SLIP_CACHE_DIR, default: the user cache "
+                    "directory; at most $SLIP_CACHE_SIZE MB, default 1024; SLIP_CACHE=off disables it). "
+                    "'stats' shows hits, misses and the compute time saved; 'clear' deletes every entry.")
+    cache.add_argument("action", choices=("stats", "clear"))
+    cache.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    cache.set_defaults(func=cmd_cache)
+
+    serve = commands.add_parser(
+        "serve", help="serve the model over local HTTP/JSON",
+        description="Run an asyncio HTTP/1.1 server with POST /calculate (one case), /batch (arrays, JSON "
+                    "Lines response, streamed when large) and /boundary (critical speed or gap), plus GET "
+                    "/health and /stats. Concurrent /calculate requests are evaluated together in "
+                    "vectorized micro-batches. There is no authentication, so keep the default loopback "
+                    "address.")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (default: %(default)s)")
+    serve.add_argument("--max-batch", type=int, default=4096,
+                       help="largest micro-batch of /calculate requests (default: %(default)s)")
+    serve.add_argument("--max-delay", type=float, default=0.0,
+                       help="ms a micro-batch waits for more requests; 0 batches only requests that "
+                            "arrive together (default: %(default)s)")
+    serve.set_defaults(func=cmd_serve)
+
+    bench = commands.add_parser(
+        "bench", help="benchmark the model, batch, sweep, ingest and export paths",
+        description="Time each benchmark (best of --repeat runs) and trace its peak memory, append the "
+                    "results to a JSON Lines history and compare them with the median of the last runs "
+                    "on the same machine and mode. Exits with status 1 if any throughput drops, or peak "
+                    "memory grows, by more than its threshold.")
+    bench.add_argument("--quick", action="store_true",
+                       help="do a tenth of the work (noisier; compared only with quick runs)")
+    bench.add_argument("--only", nargs="+", metavar="NAME", help="benchmarks to run (shell patterns such as 'export_*')")
+    bench.add_argument("--history", default="bench_history.jsonl", help="history file (default: %(default)s)")
+    bench.add_argument("--no-record", action="store_true", help="compare without appending to the history")
+    bench.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (default: %(default)s)")
+    bench.add_argument("--threshold", type=float, default=0.2,
+                       help="largest allowed throughput drop as a fraction (default: %(default)s)")
+    bench.add_argument("--memory-threshold", type=float, default=0.25,
+                       help="largest allowed peak memory growth as a fraction (default: %(default)s)")
+    bench.add_argument("--json", action="store_true", help="print the record and comparison as JSON")
+    bench.add_argument("-q", "--quiet", action="store_true", help="do not report each benchmark as it finishes")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
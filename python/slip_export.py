@@ -0,0 +1,301 @@
+"""Export of slip model results: text reports and columnar tables.
+
+export() writes a single slip_model.SlipResult or a batch of any size. It
+takes a list of SlipResults, a structured array from
+slip_batch.evaluate_batch(), or a dict of column arrays, and picks the format
+from the file extension:
+
+* .txt: the plain-text report of one result (the GUI's original export);
+* .csv, .parquet/.pq, .store: see slip_io;
+* .jsonl/.ndjson: JSON Lines, one object per row;
+* .arrow/.feather: Arrow IPC file (needs pyarrow);
+* .h5/.hdf5: one dataset per column (needs h5py).
+
+Tables are written chunk by chunk with whole-column operations; nothing is
+formatted a value at a time in Python beyond what each text format needs.
+The writers share slip_io.TableWriter's write(chunk)/close() interface, and
+slip_io.open_table_writer() hands these extensions to open_writer(), so the
+CLI commands can write every format.
+
+The text report needs only the standard library. It is written in UTF-8 by
+default. With an encoding such as ASCII that cannot represent μ, λ, γ or the
+subscripts, those characters are written as ASCII names instead.
+"""
+
+import codecs
+import datetime
+import json
+import os
+import re
+
+import slip_model
+
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+ARROW_EXTENSIONS = (".arrow", ".feather")
+HDF5_EXTENSIONS = (".h5", ".hdf5")
+
+# NaN and infinities as written by slip_io.format_csv_rows(); JSON has only null for them
+_NON_FINITE = re.compile(r"-?\b(?:nan|inf)\b")
+
+# Characters of the report that are written as ASCII names when the encoding lacks them
+ASCII_NAMES = {
+    "μ": "u", "λ": "lambda", "γ": "gamma", "τ": "tau", "₀": "0", "ₑ": "e", "·": ".", "═": "=",
+    "²": "^2", "≥": ">=", "—": "-", "–": "-",
+}
+
+
+def _ascii_names(error):
+    """Codec error handler writing unencodable report characters by ASCII name"""
+    text = error.object[error.start:error.end]
+    return "".join(ASCII_NAMES.get(c, "?") for c in text), error.end
+
+
+codecs.register_error("slip_ascii", _ascii_names)
+
+
+def extension(path):
+    """Lower-case extension of path"""
+    return os.path.splitext(str(path))[1].lower()
+
+
+# Input lines of the report: label and unit, as in v1.01's export
+REPORT_INPUTS = {
+    "gap_nm": ("Gap Height", " nm"),
+    "sliding_speed": ("Sliding Speed", " m/s"),
+    "mu": ("Water Viscosity", " Pa·s"),
+    "lambda_friction": ("Interfacial Friction", " Pa·s/m"),
+    "gamma_crit": ("Critical Shear Rate", " 1/s"),
+    "exponent": ("Exponent (m)", ""),
+}
+
+# Result lines of the report, in order (sliding speed is repeated among the results, as in the GUI)
+REPORT_RESULTS = ("gap_m", "sliding_speed", "shear_rate", "shear_stress", "b0", "b_eff", "ratio")
+
+
+def format_results(result):
+    """The results panel text of one SlipResult, as the GUI shows it"""
+    labels = dict(slip_model.OUTPUT_LABELS, sliding_speed=slip_model.INPUT_LABELS["sliding_speed"])
+    lines = ["CALCULATION RESULTS", "═" * 50, ""]
+    lines += [f"{labels[name]}: {getattr(result, name):.3e}" for name in REPORT_RESULTS]
+    lines += ["", "RECOMMENDATION", "═" * 50, "", result.recommendation, "", result.cfd_suggestion, ""]
+    return "\n".join(lines)
+
+
+def format_report(result, app_name="Slip/No-Slip Estimator", author=None, generated=None, inputs=None):
+    """Plain-text report of one SlipResult, byte for byte in the layout of v1.01's export.
+
+    inputs optionally maps input names to the text they were entered as;
+    otherwise the values are written with format "g".
+    """
+    generated = generated or datetime.datetime.now()
+    inputs = inputs or {}
+    lines = [f"{app_name} - Results Export",
+             f"Generated: {generated.strftime('%Y-%m-%d %H:%M:%S')}",
+             f"Version: {slip_model.VERSION}"]
+    if author:
+        lines.append(f"Author: {author}")
+    lines += ["=" * 50, "", "INPUT PARAMETERS:"]
+    for name, (label, unit) in REPORT_INPUTS.items():
+        lines.append(f"{label}: {inputs.get(name, format(getattr(result, name), 'g'))}{unit}")
+    lines += ["", "CALCULATION RESULTS:", format_results(result)]
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path, result, encoding="utf-8", **kwargs):
+    """Write the text report of one SlipResult (keyword arguments go to format_report)"""
+    with open(path, "w", encoding=encoding, errors="slip_ascii", newline="") as f:
+        f.write(format_report(result, **kwargs))
+
+
+def result_columns(data):
+    """Dict of column arrays for a SlipResult, a sequence of them, a structured array or a dict"""
+    import numpy as np
+
+    if isinstance(data, slip_model.SlipResult):
+        data = [data]
+    if isinstance(data, dict):
+        return {name: np.asarray(values) for name, values in data.items()}
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        return {name: data[name].reshape(-1) for name in data.dtype.names}
+    rows = list(data)
+    columns = {}
+    for k, name in enumerate(slip_model.SlipResult._fields):
+        columns[name] = np.array([row[k] for row in rows], dtype=bool if name == "slip" else np.float64)
+    return columns
+
+
+def json_lines_template(columns):
+    """Row template of format_json_lines(): one %s per column; keys are escaped once here, not per row"""
+    return "{" + ", ".join(f"{json.dumps(name)}: %s" for name in columns) + "}"
+
+
+def format_json_lines(arrays, template):
+    """JSON Lines text (newline-terminated) of equal-length column arrays; NaN and infinities become null"""
+    import numpy as np
+    import slip_io
+
+    # Numbers and booleans are already valid JSON in CSV form; only the fields need keys
+    text = slip_io.format_csv_rows(arrays, json_booleans=True)
+    if any(a.dtype.kind == "f" and not np.isfinite(a).all() for a in arrays):
+        text = _NON_FINITE.sub("null", text)
+    return "\n".join([template % tuple(line.split(",")) for line in text.splitlines()]) + "\n"
+
+
+class JsonLinesWriter:
+    """JSON Lines writer fed with dicts of column arrays; NaN and infinities become null"""
+
+    def __init__(self, path, columns):
+        import slip_io
+
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self._file = slip_io._open_text(path, "w")
+        self._template = json_lines_template(self.columns)
+
+    def write(self, chunk):
+        """Append one chunk of rows"""
+        import numpy as np
+
+        arrays = [np.asarray(chunk[name]) for name in self.columns]
+        n = len(arrays[0]) if arrays else 0
+        if n:
+            self._file.write(format_json_lines(arrays, self._template))
+        self.rows += n
+
+    def close(self):
+        if self._file is not None:
+            if self.path == "-":
+                self._file.flush()
+            else:
+                self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowWriter:
+    """Arrow IPC file writer fed with dicts of column arrays"""
+
+    def __init__(self, path, columns):
+        import slip_io
+
+        self.pa = slip_io._require_pyarrow()
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self._writer = None
+
+    def write(self, chunk):
+        """Append one chunk of rows as a record batch"""
+        import pyarrow.ipc
+
+        table = self.pa.table({name: chunk[name] for name in self.columns})
+        if self._writer is None:
+            self._writer = pyarrow.ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _require_h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise RuntimeError("HDF5 support requires the 'h5py' package (pip install h5py)") from None
+    return h5py
+
+
+class Hdf5Writer:
+    """HDF5 writer with one resizable, chunked dataset per column"""
+
+    def __init__(self, path, columns, chunk_rows=1 << 16):
+        self.h5py = _require_h5py()
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._file = self.h5py.File(path, "w")
+        self._file.attrs["version"] = slip_model.VERSION
+
+    def write(self, chunk):
+        """Append one chunk of rows"""
+        import numpy as np
+
+        arrays = [np.asarray(chunk[name]) for name in self.columns]
+        n = len(arrays[0]) if arrays else 0
+        for name, a in zip(self.columns, arrays):
+            if name not in self._file:
+                self._file.create_dataset(name, shape=(0,), maxshape=(None,), dtype=a.dtype,
+                                          chunks=(self.chunk_rows,))
+            dataset = self._file[name]
+            dataset.resize((self.rows + n,))
+            dataset[self.rows:] = a
+        self.rows += n
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path, columns):
+    """Writer for path chosen by extension; CSV, Parquet and stores go to slip_io"""
+    ext = extension(path)
+    if ext in JSON_LINES_EXTENSIONS:
+        return JsonLinesWriter(path, columns)
+    if ext in ARROW_EXTENSIONS:
+        return ArrowWriter(path, columns)
+    if ext in HDF5_EXTENSIONS:
+        return Hdf5Writer(path, columns)
+    import slip_io
+
+    return slip_io.open_table_writer(path, columns)
+
+
+def export(path, data, chunk_rows=None, progress=None, **report):
+    """Write results to path in the format given by its extension; returns the number of rows.
+
+    .txt paths take a single SlipResult (report keywords go to
+    format_report). progress(rows) is called after each chunk.
+    """
+    if extension(path) == ".txt":
+        if not isinstance(data, slip_model.SlipResult):
+            raise ValueError("text reports hold a single result; export batches as .csv, .jsonl, .parquet, "
+                             ".arrow or .h5")
+        write_report(path, data, **report)
+        if progress is not None:
+            progress(1)
+        return 1
+    import slip_io
+
+    columns = result_columns(data)
+    names = list(columns)
+    rows = len(columns[names[0]]) if names else 0
+    chunk_rows = chunk_rows or slip_io.DEFAULT_CHUNK_ROWS
+    with open_writer(path, names) as writer:
+        for start in range(0, max(rows, 1), chunk_rows):
+            writer.write({name: values[start:start + chunk_rows] for name, values in columns.items()})
+            if progress is not None:
+                progress(min(chunk_rows, rows - start))
+    return rows
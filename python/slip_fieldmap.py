@@ -0,0 +1,315 @@
+"""Slip maps for spatially varying film thickness h(x, y).
+
+In bearings and seals the gap is a 2D field. process_map() evaluates the
+model over a film-thickness map, and optionally a sliding-speed map, one tile
+at a time. Inputs are memory-mapped and the ratio and decision maps are
+written into memory-mapped outputs, so a 20k x 20k map is processed in the
+memory of a single tile.
+
+Maps can be read from:
+
+- .npy files (memory-mapped),
+- raw binary files, given their shape and dtype,
+- uncompressed single-channel TIFF height fields (8/16/32-bit integer or
+  32/64-bit float, strips stored contiguously, as written by most profilometer
+  software and by write_tiff()).
+
+Outputs ending in .tif/.tiff are written as TIFF, anything else as .npy. The
+decision map holds 0 (no-slip), 1 (slip) or 255 (no data).
+"""
+
+import os
+import struct
+
+import numpy as np
+
+import slip_batch
+import slip_viscosity
+
+# Edge length of the square tiles evaluated at a time
+TILE = 1024
+
+# Decision map codes
+NO_SLIP = 0
+SLIP = 1
+NO_DATA = 255
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+# TIFF tags used by the reader and writer
+_WIDTH, _HEIGHT, _BITS, _COMPRESSION, _PHOTOMETRIC = 256, 257, 258, 259, 262
+_STRIP_OFFSETS, _SAMPLES, _ROWS_PER_STRIP, _STRIP_BYTES = 273, 277, 278, 279
+_PLANAR, _TILE_WIDTH, _SAMPLE_FORMAT = 284, 322, 339
+
+# TIFF field types: code -> (struct format, size)
+_TIFF_TYPES = {1: ("B", 1), 3: ("H", 2), 4: ("I", 4), 16: ("Q", 8)}
+
+# SampleFormat code -> NumPy kind
+_SAMPLE_KINDS = {1: "u", 2: "i", 3: "f"}
+
+# Target size of a TIFF strip written by write_tiff() (bytes)
+_STRIP_BYTES_TARGET = 1 << 16
+
+
+def is_tiff(path):
+    """Return True if the path names a TIFF file"""
+    return os.path.splitext(str(path))[1].lower() in TIFF_EXTENSIONS
+
+
+def _read_ifd(f, order, offset):
+    """Return {tag: tuple of values} for the TIFF image file directory at offset"""
+    f.seek(offset)
+    (count,) = struct.unpack(order + "H", f.read(2))
+    tags = {}
+    for _ in range(count):
+        tag, kind, n, value = struct.unpack(order + "HHI4s", f.read(12))
+        if kind not in _TIFF_TYPES:
+            continue
+        code, size = _TIFF_TYPES[kind]
+        if n * size > 4:
+            here = f.tell()
+            (pointer,) = struct.unpack(order + "I", value)
+            f.seek(pointer)
+            value = f.read(n * size)
+            f.seek(here)
+        tags[tag] = struct.unpack(order + code * n, value[:n * size])
+    return tags
+
+
+def read_tiff(path):
+    """Memory-map the first image of an uncompressed single-channel TIFF as a 2D array"""
+    with open(path, "rb") as f:
+        header = f.read(8)
+        if header[:4] not in (b"II*\0", b"MM\0*"):
+            if header[:4] in (b"II+\0", b"MM\0+"):
+                raise ValueError(f"{path}: BigTIFF files are not supported")
+            raise ValueError(f"{path}: not a TIFF file")
+        order = "<" if header[:2] == b"II" else ">"
+        (ifd,) = struct.unpack(order + "I", header[4:])
+        tags = _read_ifd(f, order, ifd)
+
+    def tag(code, default=None):
+        values = tags.get(code)
+        if values is None:
+            if default is None:
+                raise ValueError(f"{path}: TIFF tag {code} missing")
+            return default
+        return values
+
+    if tag(_COMPRESSION, (1,))[0] != 1:
+        raise ValueError(f"{path}: compressed TIFF files are not supported; save the map uncompressed")
+    if _TILE_WIDTH in tags:
+        raise ValueError(f"{path}: tiled TIFF files are not supported; save the map in strips")
+    if tag(_SAMPLES, (1,))[0] != 1:
+        raise ValueError(f"{path}: expected a single-channel (grayscale) height field")
+    width, height = tag(_WIDTH)[0], tag(_HEIGHT)[0]
+    bits = tag(_BITS)[0]
+    kind = _SAMPLE_KINDS.get(tag(_SAMPLE_FORMAT, (1,))[0])
+    if kind is None or bits % 8 or (kind == "f" and bits not in (32, 64)):
+        raise ValueError(f"{path}: unsupported sample format ({bits}-bit)")
+    dtype = np.dtype(f"{order}{kind}{bits // 8}")
+
+    offsets, counts = tag(_STRIP_OFFSETS), tag(_STRIP_BYTES)
+    if any(offsets[k + 1] != offsets[k] + counts[k] for k in range(len(offsets) - 1)):
+        raise ValueError(f"{path}: TIFF strips are not stored contiguously")
+    if sum(counts) < width * height * dtype.itemsize:
+        raise ValueError(f"{path}: TIFF strips hold less data than a {height} x {width} image")
+    return np.memmap(path, dtype=dtype, mode="r", offset=offsets[0], shape=(height, width))
+
+
+def _pack_values(kind, values):
+    """Little-endian bytes of a TIFF field's values"""
+    code, _ = _TIFF_TYPES[kind]
+    return struct.pack("<" + code * len(values), *values)
+
+
+def write_tiff(path, shape, dtype):
+    """Create an uncompressed single-channel TIFF and return its pixels as a writable memmap"""
+    dtype = np.dtype(dtype).newbyteorder("<")
+    kind = {"u": 1, "i": 2, "f": 3}.get(dtype.kind)
+    if kind is None:
+        raise ValueError(f"cannot write {dtype} pixels to TIFF")
+    height, width = shape
+    row_bytes = width * dtype.itemsize
+    nbytes = height * row_bytes
+    rows_per_strip = max(1, min(height, _STRIP_BYTES_TARGET // max(row_bytes, 1)))
+    strips = -(-height // rows_per_strip) if height else 0
+    if nbytes + 4096 + 8 * strips >= 1 << 32:
+        raise ValueError(f"{path}: {height} x {width} {dtype} image exceeds the 4 GiB TIFF limit; use .npy")
+
+    entries = [
+        (_WIDTH, 4, (width,)), (_HEIGHT, 4, (height,)), (_BITS, 3, (8 * dtype.itemsize,)),
+        (_COMPRESSION, 3, (1,)), (_PHOTOMETRIC, 3, (1,)), (_STRIP_OFFSETS, 4, None),
+        (_SAMPLES, 3, (1,)), (_ROWS_PER_STRIP, 4, (rows_per_strip,)), (_STRIP_BYTES, 4, None),
+        (_PLANAR, 3, (1,)), (_SAMPLE_FORMAT, 3, (kind,)),
+    ]
+    # Header, IFD, then the strip offset and byte count arrays, then the pixels
+    ifd_size = 2 + 12 * len(entries) + 4
+    arrays = 8 + ifd_size
+    data = arrays + 2 * 4 * strips
+    data += -data % 16
+    offsets = [data + k * rows_per_strip * row_bytes for k in range(strips)]
+    counts = [min(rows_per_strip, height - k * rows_per_strip) * row_bytes for k in range(strips)]
+
+    ifd = struct.pack("<H", len(entries))
+    extra = b""
+    for tag, kind_code, values in entries:
+        if tag == _STRIP_OFFSETS:
+            values = offsets
+        elif tag == _STRIP_BYTES:
+            values = counts
+        packed = _pack_values(kind_code, values)
+        if len(packed) > 4:
+            ifd += struct.pack("<HHII", tag, kind_code, len(values), arrays + len(extra))
+            extra += packed
+        else:
+            ifd += struct.pack("<HHI", tag, kind_code, len(values)) + packed.ljust(4, b"\0")
+    ifd += struct.pack("<I", 0)
+
+    with open(path, "wb") as f:
+        f.write(b"II*\0" + struct.pack("<I", 8) + ifd + extra)
+        f.write(b"\0" * (data - f.tell()))
+        f.truncate(data + nbytes)
+    if nbytes == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r+", offset=data, shape=shape)
+
+
+def open_map(path, shape=None, dtype=None, offset=0):
+    """Memory-map a 2D map from a .npy, TIFF or raw binary file.
+
+    shape (rows, columns) and dtype are required for raw files, whose data
+    starts offset bytes into the file; they are ignored otherwise.
+    """
+    if is_tiff(path):
+        data = read_tiff(path)
+    elif str(path).lower().endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+    else:
+        if shape is None or dtype is None:
+            raise ValueError(f"{path}: raw maps need a shape and a dtype")
+        data = np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset, shape=tuple(shape))
+    if data.ndim != 2:
+        raise ValueError(f"{path}: expected a 2D map, got shape {data.shape}")
+    return data
+
+
+def create_map(path, shape, dtype):
+    """Create a writable memory-mapped output map (.npy, or TIFF by extension)"""
+    if is_tiff(path):
+        return write_tiff(path, shape, dtype)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+
+def iter_tiles(shape, tile=TILE):
+    """Yield (row slice, column slice) of the tiles covering a 2D shape"""
+    rows, columns = shape
+    for i in range(0, rows, tile):
+        for j in range(0, columns, tile):
+            yield slice(i, min(i + tile, rows)), slice(j, min(j + tile, columns))
+
+
+def _tile(field, rows, columns):
+    """One tile of a map as float64, or a constant as is"""
+    if np.ndim(field) == 2:
+        return np.asarray(field[rows, columns], dtype=np.float64)
+    return float(field)
+
+
+def process_map(gap, sliding_speed, mu, lambda_friction, gamma_crit, exponent, gap_scale=1.0, gap_offset=0.0,
+                speed_scale=1.0, nodata=None, ratio_output=None, decision_output=None, pixel_size=None,
+                viscosity=None, temperature=None, pressure=None, self_consistent=False, tile=TILE, progress=None):
+    """Evaluate bₑff/h over a film-thickness map tile by tile and summarize the regime areas.
+
+    gap is a 2D array (usually a memmap from open_map) converted to nm as
+    gap * gap_scale + gap_offset. sliding_speed is a constant or an array of
+    the same shape, in m/s after multiplying by speed_scale. Pixels whose raw
+    gap equals nodata, or is NaN, are left out. ratio_output and
+    decision_output are optional output paths. pixel_size (m) adds areas in m²
+    to the summary. With a viscosity law (see slip_viscosity), mu is replaced
+    by viscosity(T, p) for temperature (K) and pressure (Pa), each a constant
+    or a map. self_consistent uses the slip-corrected shear rate (see
+    slip_batch.solve_shear_rate). progress(pixels) is called per tile.
+    """
+    shape = gap.shape
+    fields = {"speed": sliding_speed, "temperature": temperature, "pressure": pressure}
+    for name, field in fields.items():
+        if np.ndim(field) == 2 and np.shape(field) != shape:
+            raise ValueError(f"{name} map shape {np.shape(field)} does not match gap map shape {shape}")
+    ratio_map = create_map(ratio_output, shape, np.float32) if ratio_output else None
+    decision_map = create_map(decision_output, shape, np.uint8) if decision_output else None
+
+    counts = {"slip": 0, "no_slip": 0, "no_data": 0}
+    ratio_min, ratio_max = np.inf, -np.inf
+    buffer = np.empty(min(tile, shape[0]) * min(tile, shape[1]), dtype=slip_batch.RESULT_DTYPE)
+    for rows, columns in iter_tiles(shape, tile):
+        raw = np.asarray(gap[rows, columns])
+        h = raw.astype(np.float64) * gap_scale + gap_offset
+        valid = ~np.isnan(h)
+        if nodata is not None:
+            valid &= raw != nodata
+        U = _tile(sliding_speed, rows, columns) * speed_scale
+        out = buffer[:h.size].reshape(h.shape)
+        with np.errstate(all="ignore"):
+            if viscosity is None:
+                results = slip_batch.evaluate_batch(h, U, mu, lambda_friction, gamma_crit, exponent, out=out,
+                                                    self_consistent=self_consistent)
+            else:
+                results = slip_viscosity.evaluate_batch(
+                    h, U, _tile(temperature, rows, columns), _tile(pressure, rows, columns), viscosity,
+                    lambda_friction, gamma_crit, exponent, out=out, self_consistent=self_consistent)
+        ratio, slip = results["ratio"], results["slip"]
+
+        n_valid = int(np.count_nonzero(valid))
+        n_slip = int(np.count_nonzero(slip & valid))
+        counts["slip"] += n_slip
+        counts["no_slip"] += n_valid - n_slip
+        counts["no_data"] += h.size - n_valid
+        finite = ratio[valid & np.isfinite(ratio)]
+        if finite.size:
+            ratio_min = min(ratio_min, float(finite.min()))
+            ratio_max = max(ratio_max, float(finite.max()))
+
+        if ratio_map is not None:
+            ratio_map[rows, columns] = np.where(valid, ratio, np.nan)
+        if decision_map is not None:
+            decision_map[rows, columns] = np.where(valid, slip.astype(np.uint8), NO_DATA)
+        if progress is not None:
+            progress(h.size)
+
+    for output in (ratio_map, decision_map):
+        if isinstance(output, np.memmap):
+            output.flush()
+
+    pixels = shape[0] * shape[1]
+    valid = counts["slip"] + counts["no_slip"]
+    summary = {
+        "shape": list(shape),
+        "pixels": pixels,
+        "slip_pixels": counts["slip"],
+        "no_slip_pixels": counts["no_slip"],
+        "no_data_pixels": counts["no_data"],
+        "slip_fraction": counts["slip"] / valid if valid else float("nan"),
+        "no_slip_fraction": counts["no_slip"] / valid if valid else float("nan"),
+        "ratio_min": ratio_min if ratio_min <= ratio_max else float("nan"),
+        "ratio_max": ratio_max if ratio_min <= ratio_max else float("nan"),
+    }
+    if pixel_size is not None:
+        area = pixel_size ** 2
+        summary["slip_area_m2"] = counts["slip"] * area
+        summary["no_slip_area_m2"] = counts["no_slip"] * area
+    return summary
+
+
+def format_summary(summary):
+    """Format a process_map() summary as text"""
+    rows, columns = summary["shape"]
+    lines = [
+        f"Map: {rows:,} x {columns:,} pixels ({summary['no_data_pixels']:,} without data)",
+        f"Slip:    {summary['slip_fraction']:8.3%} of the area ({summary['slip_pixels']:,} pixels)",
+        f"No-slip: {summary['no_slip_fraction']:8.3%} of the area ({summary['no_slip_pixels']:,} pixels)",
+        f"b_eff/h: {summary['ratio_min']:.3e} to {summary['ratio_max']:.3e}",
+    ]
+    if "slip_area_m2" in summary:
+        lines.append(f"Slip area: {summary['slip_area_m2']:.4e} m², no-slip area: {summary['no_slip_area_m2']:.4e} m²")
+    return "\n".join(lines)
@@ -0,0 +1,265 @@
+"""Fit b₀ (hence λ), γc and m to measured slip length versus shear rate.
+
+Experiments and NEMD runs give pairs (γ, bₑff). fit_datasets() fits
+bₑff = b₀ [1 + (γ/γc)^m] to every dataset of such pairs at once. The
+parameters are ln b₀, ln γc and m, which keeps b₀ and γc positive. The
+residuals are ln bₑff(model) − ln bₑff(measured), so every point counts by
+its relative error, which suits slip lengths spanning several decades.
+Points with a non-positive or non-finite γ or bₑff are left out.
+
+Datasets are padded into (datasets × points) arrays. Levenberg–Marquardt
+then runs on all of them together: the residuals, the analytic Jacobian and
+the 3×3 normal equations of every dataset are computed in a few vectorized
+passes per iteration, and each dataset keeps its own damping. Datasets
+drop out of the arrays as they converge, so a slow dataset does not keep
+the others iterating. Bootstrap confidence intervals refit resampled copies
+of all datasets in the same way, with the resampling expressed as per-point
+weights (how often each point was drawn), so a replicate costs no more than
+the original fit.
+
+λ follows from b₀ = μ/λ for a given viscosity μ.
+"""
+
+import numpy as np
+
+import slip_io
+import slip_model
+
+# Fitted parameters per dataset; *_lo and *_hi bound the bootstrap confidence interval (NaN without bootstrap)
+FIT_DTYPE = np.dtype([
+    ("dataset", np.float64), ("points", np.int64),
+    ("b0", np.float64), ("gamma_crit", np.float64), ("exponent", np.float64), ("lambda_friction", np.float64),
+    ("rms", np.float64), ("converged", np.bool_),
+    ("b0_lo", np.float64), ("b0_hi", np.float64),
+    ("gamma_crit_lo", np.float64), ("gamma_crit_hi", np.float64),
+    ("exponent_lo", np.float64), ("exponent_hi", np.float64),
+    ("lambda_friction_lo", np.float64), ("lambda_friction_hi", np.float64),
+])
+
+# Bootstrap replicates are fitted in batches of about this many (dataset, point) elements
+BOOTSTRAP_ELEMENTS = 1 << 22
+
+
+def pack_datasets(dataset, shear_rate, b_eff):
+    """Group points by dataset id into padded (datasets × points) arrays.
+
+    Returns (ids, ln γ, ln bₑff, counts); valid points come first in each
+    row, and row k holds counts[k] of them. Padding is zero.
+    """
+    shear_rate = np.asarray(shear_rate, dtype=np.float64)
+    b_eff = np.asarray(b_eff, dtype=np.float64)
+    dataset = np.zeros(len(shear_rate)) if dataset is None else np.asarray(dataset, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        valid = (shear_rate > 0) & (b_eff > 0) & np.isfinite(shear_rate) & np.isfinite(b_eff)
+    ids = np.unique(dataset)
+    kept = dataset[valid]
+    row = np.searchsorted(ids, kept)
+    counts = np.bincount(row, minlength=len(ids))
+    order = np.argsort(row, kind="stable")
+    row = row[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    column = np.arange(len(row)) - starts[row]
+    width = max(int(counts.max(initial=0)), 1)
+    log_rate = np.zeros((len(ids), width))
+    log_b = np.zeros((len(ids), width))
+    log_rate[row, column] = np.log(shear_rate[valid][order])
+    log_b[row, column] = np.log(b_eff[valid][order])
+    return ids, log_rate, log_b, counts
+
+
+def initial_guess(log_rate, log_b, weights):
+    """Starting (ln b₀, ln γc, m) per dataset.
+
+    b₀ is the smallest slip length. Where the slip length at least doubles,
+    ln(bₑff/b₀ − 1) = m (ln γ − ln γc) is fitted by a straight line;
+    elsewhere m = 1 and γc is the largest shear rate.
+    """
+    used = weights > 0
+    lb0 = np.where(used, log_b, np.inf).min(axis=1)
+    lb0[~np.isfinite(lb0)] = 0.0
+    excess = log_b - lb0[:, None]
+    rising = used & (excess > np.log(2))
+    z = np.log(np.expm1(np.where(rising, excess, 1.0)))
+    n = rising.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(rising, log_rate, 0).sum(axis=1) / n
+        mean_z = np.where(rising, z, 0).sum(axis=1) / n
+        dx = np.where(rising, log_rate - mean_x[:, None], 0)
+        m = (dx * (z - mean_z[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+        lgc = mean_x - mean_z / m
+    fallback = ~((n >= 2) & (m > 0.05) & np.isfinite(lgc))
+    m[fallback] = 1.0
+    lgc[fallback] = np.where(used, log_rate, -np.inf).max(axis=1)[fallback]
+    lgc[~np.isfinite(lgc)] = 0.0
+    return np.stack([lb0, lgc, m], axis=1)
+
+
+def _model(params, log_rate):
+    """ln bₑff for parameters (K, 3), with x = ln γ − ln γc, z = ln q and ln(1 + q), q = (γ/γc)^m"""
+    x = log_rate - params[:, 1:2]
+    z = params[:, 2:3] * x
+    # ln(1 + q) without overflow for large q
+    softplus = np.logaddexp(0.0, z)
+    return params[:, 0:1] + softplus, x, z, softplus
+
+
+def _cost(params, log_rate, log_b, weights):
+    r = _model(params, log_rate)[0] - log_b
+    return np.einsum("kn,kn,kn->k", weights, r, r)
+
+
+def fit_log(log_rate, log_b, weights, start=None, max_iter=200, tol=1e-12):
+    """Levenberg–Marquardt fit of (ln b₀, ln γc, m) to every row at once.
+
+    weights (K, N) multiply the squared residuals (0 for padding, draw counts
+    for bootstrap replicates). Returns (params (K, 3), cost, converged).
+    Rows are dropped from the working arrays once half of them have
+    converged, so a few slow rows do not keep the rest iterating.
+    """
+    if start is None:
+        start = initial_guess(log_rate, log_b, weights)
+    params = np.array(start, dtype=np.float64)
+    k = len(params)
+    cost = _cost(params, log_rate, log_b, weights)
+    converged = np.zeros(k, dtype=bool)
+    # Working copies of the rows still iterating; index maps them back to the output rows
+    index = np.arange(k)
+    p, c, done, damping = params.copy(), cost.copy(), converged.copy(), np.full(k, 1e-3)
+    lr, lb, w = log_rate, log_b, weights
+    jacobian = np.empty((3,) + lr.shape)
+    jacobian[0] = 1.0
+    with np.errstate(over="ignore", invalid="ignore"):
+        for _ in range(max_iter):
+            prediction, x, z, softplus = _model(p, lr)
+            r = prediction - lb
+            s = np.exp(z - softplus)
+            # ∂/∂ln b₀ = 1, ∂/∂ln γc = −m s, ∂/∂m = (ln γ − ln γc) s
+            np.multiply(-p[:, 2:3], s, out=jacobian[1])
+            np.multiply(x, s, out=jacobian[2])
+            wj = jacobian * w
+            normal = np.einsum("akn,bkn->kab", wj, jacobian)
+            gradient = np.einsum("akn,kn->ka", wj, r)
+            # Marquardt scaling, floored so that flat directions (γ far below γc) stay solvable
+            diagonal = np.diagonal(normal, axis1=1, axis2=2)
+            scale = np.maximum(diagonal, 1e-12 * diagonal.sum(axis=1, keepdims=True) + 1e-300)
+            system = normal + (damping[:, None] * scale)[:, :, None] * np.eye(3)
+            step = -np.linalg.solve(system, gradient[:, :, None])[:, :, 0]
+            step[done] = 0.0
+            trial = p + step
+            trial_cost = _cost(trial, lr, lb, w)
+            better = (trial_cost <= c) & ~done
+            small = (c - trial_cost <= tol * c) | (np.abs(step).max(axis=1) <= 1e-10)
+            done |= better & small
+            p[better] = trial[better]
+            c[better] = trial_cost[better]
+            damping = np.where(better, np.maximum(damping / 10, 1e-12), np.minimum(damping * 10, 1e16))
+            # A damping this large means no step reduces the cost: a minimum up to rounding
+            done |= damping >= 1e16
+            if done.all():
+                break
+            if 2 * np.count_nonzero(done) >= len(done):
+                params[index], cost[index], converged[index] = p, c, done
+                keep = ~done
+                index = index[keep]
+                p, c, done, damping = p[keep], c[keep], done[keep], damping[keep]
+                lr, lb, w = lr[keep], lb[keep], w[keep]
+                jacobian = jacobian[:, keep]
+    params[index], cost[index], converged[index] = p, c, done
+    return params, cost, converged
+
+
+def _bootstrap(log_rate, log_b, counts, params, replicates, rng, progress=None):
+    """Parameters (replicates, K, 3) fitted to resampled copies of every dataset"""
+    k, width = log_rate.shape
+    batch = max(1, BOOTSTRAP_ELEMENTS // (k * width))
+    position = np.arange(width)
+    results = []
+    for first in range(0, replicates, batch):
+        r = min(batch, replicates - first)
+        # Draw counts[k] points with replacement from each dataset, as per-point draw counts
+        draws = (rng.random((r, k, width)) * counts[:, None]).astype(np.int64)
+        cells = np.arange(r * k).reshape(r, k, 1) * width + draws
+        cells = cells[np.broadcast_to(position < counts[:, None], cells.shape)]
+        weights = np.bincount(cells, minlength=r * k * width).reshape(r * k, width).astype(np.float64)
+        fitted, _, _ = fit_log(np.tile(log_rate, (r, 1)), np.tile(log_b, (r, 1)), weights,
+                               start=np.tile(params, (r, 1)))
+        results.append(fitted.reshape(r, k, 3))
+        if progress is not None:
+            progress(r)
+    return np.concatenate(results)
+
+
+def fit_datasets(shear_rate, b_eff, dataset=None, mu=slip_model.DEFAULTS["mu"], bootstrap=0, confidence=0.95,
+                 seed=0, progress=None):
+    """Fit the slip-length law to each dataset and return a FIT_DTYPE array.
+
+    dataset holds a numeric id per point (all points form one dataset if
+    None). mu (Pa·s) converts b₀ to λ. With bootstrap > 0, that many
+    resampled replicates give percentile confidence intervals at the
+    confidence level. Datasets with fewer than 3 valid points get NaN
+    parameters. progress(replicates) is called per bootstrap batch.
+    """
+    ids, log_rate, log_b, counts = pack_datasets(dataset, shear_rate, b_eff)
+    weights = (np.arange(log_rate.shape[1]) < counts[:, None]).astype(np.float64)
+    params, cost, converged = fit_log(log_rate, log_b, weights)
+    fits = np.empty(len(ids), dtype=FIT_DTYPE)
+    for name in FIT_DTYPE.names[8:]:
+        fits[name] = np.nan
+    fits["dataset"] = ids
+    fits["points"] = counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fits["rms"] = np.sqrt(cost / counts)
+    fits["converged"] = converged
+    fits["b0"], fits["gamma_crit"], fits["exponent"] = np.exp(params[:, 0]), np.exp(params[:, 1]), params[:, 2]
+
+    if bootstrap > 0:
+        samples = _bootstrap(log_rate, log_b, counts, params, bootstrap, np.random.default_rng(seed), progress)
+        tail = 50 * (1 - confidence)
+        lo, hi = np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+        fits["b0_lo"], fits["gamma_crit_lo"], fits["exponent_lo"] = np.exp(lo[:, 0]), np.exp(lo[:, 1]), lo[:, 2]
+        fits["b0_hi"], fits["gamma_crit_hi"], fits["exponent_hi"] = np.exp(hi[:, 0]), np.exp(hi[:, 1]), hi[:, 2]
+        fits["lambda_friction_lo"] = mu / fits["b0_hi"]
+        fits["lambda_friction_hi"] = mu / fits["b0_lo"]
+
+    fits["lambda_friction"] = mu / fits["b0"]
+    underdetermined = counts < 3
+    for name in FIT_DTYPE.names[2:]:
+        if name not in ("rms", "converged"):
+            fits[name][underdetermined] = np.nan
+    fits["converged"][underdetermined] = False
+    return fits
+
+
+def read_datasets(path, shear_rate_column="shear_rate", slip_length_column="b_eff", dataset_column="dataset",
+                  chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Read (dataset or None, shear rate, slip length) arrays from a CSV/Parquet/store table"""
+    columns = [shear_rate_column, slip_length_column, dataset_column]
+    parts = {name: [] for name in columns}
+    for chunk in slip_io.iter_table_chunks(path, chunk_rows, columns, skip_missing=True):
+        if shear_rate_column not in chunk or slip_length_column not in chunk:
+            raise ValueError(f"{path} needs columns '{shear_rate_column}' and '{slip_length_column}'")
+        for name, values in chunk.items():
+            parts[name].append(values)
+    arrays = {name: np.concatenate(values) if values else None for name, values in parts.items()}
+    if arrays[shear_rate_column] is None:
+        arrays[shear_rate_column] = arrays[slip_length_column] = np.empty(0)
+    return arrays[dataset_column], arrays[shear_rate_column], arrays[slip_length_column]
+
+
+def format_fits(fits, limit=20):
+    """Plain-text table of fitted parameters (the first limit datasets)"""
+    bootstrap = len(fits) and np.isfinite(fits["b0_lo"]).any()
+    lines = [f"{'dataset':>10} {'points':>7} {'b0 (m)':>10} {'lambda (Pa s/m)':>16} {'gamma_c (1/s)':>14} "
+             f"{'m':>8} {'rms ln b':>9}  converged"]
+    for fit in fits[:limit]:
+        lines.append(f"{fit['dataset']:>10g} {fit['points']:>7d} {fit['b0']:>10.3e} {fit['lambda_friction']:>16.3e} "
+                     f"{fit['gamma_crit']:>14.3e} {fit['exponent']:>8.4f} {fit['rms']:>9.2e}  "
+                     f"{'yes' if fit['converged'] else 'no'}")
+        if bootstrap:
+            lines.append(f"{'':>18} [{fit['b0_lo']:.3e}, {fit['b0_hi']:.3e}]  "
+                         f"[{fit['lambda_friction_lo']:.3e}, {fit['lambda_friction_hi']:.3e}]  "
+                         f"[{fit['gamma_crit_lo']:.3e}, {fit['gamma_crit_hi']:.3e}]  "
+                         f"[{fit['exponent_lo']:.4f}, {fit['exponent_hi']:.4f}]")
+    if len(fits) > limit:
+        lines.append(f"... {len(fits) - limit:,} more datasets")
+    return "\n".join(lines)
@@ -0,0 +1,267 @@
+"""Green–Kubo estimate of the interfacial friction coefficient λ from MD.
+
+In equilibrium MD, λ follows from the autocorrelation of the total lateral
+force F(t) that the liquid exerts on a wall of area A:
+
+    λ = 1 / (A kB T) ∫₀^∞ ⟨F(0) F(t)⟩ dt
+
+Force trajectories of long runs are many GB, so they are read in chunks
+(iter_text_forces(), iter_binary_forces(), iter_table_forces()) and folded
+into a ForceCorrelation accumulator that holds only one block plus max_lag
+samples. Each block of samples is correlated with itself and the max_lag
+samples that follow it by zero-padded FFTs, all blocks of a chunk in one
+batched transform. Blocks are much longer than the force correlation time,
+so they are close to independent; the spread of their running integrals
+gives the error bar of λ (block averaging).
+
+In a finite system the running integral rises to a plateau and then decays
+back to zero, so λ is read at the plateau: the maximum of the block-averaged
+running integral within max_lag. Each in-plane force component (x and y)
+counts as a separate set of blocks.
+"""
+
+import itertools
+import sys
+
+import numpy as np
+
+import slip_io
+
+BOLTZMANN = 1.380649e-23  # J/K
+
+DEFAULT_MAX_LAG = 2000
+# Blocks are this many times max_lag long
+DEFAULT_BLOCK_FACTOR = 20
+
+
+def _fft_length(n):
+    """Smallest power of two ≥ n"""
+    return 1 << max(0, int(n - 1).bit_length())
+
+
+class ForceCorrelation:
+    """Block-averaged force autocorrelation and running Green–Kubo integral.
+
+    update() takes chunks of shape (samples, components); samples beyond the
+    last full block (plus its max_lag look-ahead) are left out. With
+    subtract_mean, the mean force is removed before correlating: mean (one
+    value per component, e.g. from mean_force() in a first pass) if given,
+    else the mean of all samples read so far. Removing each block's own mean
+    instead would bias the integral low by about 2τ/block of its value for
+    correlation time τ.
+    """
+
+    def __init__(self, max_lag=DEFAULT_MAX_LAG, block=None, subtract_mean=True, mean=None):
+        if max_lag < 1:
+            raise ValueError("max_lag must be >= 1")
+        self.max_lag = int(max_lag)
+        self.block = int(block) if block is not None else DEFAULT_BLOCK_FACTOR * self.max_lag
+        if self.block < self.max_lag:
+            raise ValueError("block must be at least max_lag samples")
+        self.subtract_mean = subtract_mean
+        self.mean = None if mean is None else np.atleast_1d(np.asarray(mean, dtype=np.float64))
+        self.samples = 0
+        self.blocks = 0
+        self._pending = None
+        self._sum = 0.0
+        self._nfft = _fft_length(self.block + self.max_lag)
+        # Sums over blocks of the ACF and of the running integral (in units of the time step), and their squares
+        self._acf = np.zeros(self.max_lag)
+        self._acf2 = np.zeros(self.max_lag)
+        self._integral = np.zeros(self.max_lag)
+        self._integral2 = np.zeros(self.max_lag)
+
+    def update(self, forces):
+        """Fold in a chunk of forces, shape (samples,) or (samples, components).
+
+        Without a fixed mean, the blocks completed by this chunk are centred
+        on the running mean of the samples read so far, so λ depends slightly
+        on how the input is chunked. Pass the mean of the whole trajectory to
+        the constructor for a result that does not.
+        """
+        forces = np.asarray(forces, dtype=np.float64)
+        if forces.ndim == 1:
+            forces = forces[:, None]
+        self.samples += len(forces)
+        self._sum = self._sum + forces.sum(axis=0)
+        pending = forces if self._pending is None else np.concatenate((self._pending, forces))
+        span = self.block + self.max_lag
+        nblocks = (len(pending) - self.max_lag) // self.block if len(pending) >= span else 0
+        if nblocks:
+            self._add_blocks(pending, nblocks)
+        self._pending = pending[nblocks * self.block:].copy() if nblocks else pending
+
+    def _add_blocks(self, pending, nblocks):
+        b, lag, nfft = self.block, self.max_lag, self._nfft
+        # Segments of block + look-ahead, starting every block samples: (components, nblocks, span)
+        segments = np.lib.stride_tricks.sliding_window_view(pending[:nblocks * b + lag], b + lag, axis=0)[::b]
+        segments = np.moveaxis(segments, 1, 0)
+        if self.subtract_mean:
+            mean = self.mean if self.mean is not None else self._sum / self.samples
+            segments = segments - mean[:, None, None]
+        spectrum = np.fft.rfft(segments, nfft)
+        head = np.fft.rfft(segments[..., :b], nfft)
+        # Σ_t x[t] x[t + τ] over the block, for τ < max_lag
+        acf = np.fft.irfft(np.conj(head) * spectrum, nfft)[..., :lag] / b
+        acf = acf.reshape(-1, lag)
+        # Trapezoidal running integral ∫₀^τ C dt, in units of the time step
+        integral = np.cumsum(acf, axis=1) - 0.5 * (acf[:, :1] + acf)
+        self._acf += acf.sum(axis=0)
+        self._acf2 += (acf * acf).sum(axis=0)
+        self._integral += integral.sum(axis=0)
+        self._integral2 += (integral * integral).sum(axis=0)
+        self.blocks += len(acf)
+
+    @staticmethod
+    def _mean_error(total, squares, n):
+        mean = total / n
+        variance = np.maximum(squares / n - mean * mean, 0.0) * n / max(n - 1, 1)
+        return mean, np.sqrt(variance / n)
+
+    def result(self, timestep, area, temperature, force_scale=1.0):
+        """Green–Kubo λ (Pa·s/m) with its block-averaging standard error, as a plain dict.
+
+        timestep is the sampling interval (s), area the wall area (m²),
+        temperature in K, and force_scale converts forces to N.
+        """
+        if self.blocks == 0:
+            raise ValueError(f"need at least {self.block + self.max_lag:,} samples for one block "
+                             f"(got {self.samples:,}); lower max_lag or block")
+        scale = force_scale * force_scale
+        acf, acf_error = self._mean_error(self._acf, self._acf2, self.blocks)
+        integral, integral_error = self._mean_error(self._integral, self._integral2, self.blocks)
+        factor = scale * timestep / (area * BOLTZMANN * temperature)
+        running, running_error = integral * factor, integral_error * factor
+        plateau = int(np.argmax(running))
+        return {
+            "lambda_friction": float(running[plateau]),
+            "lambda_error": float(running_error[plateau]),
+            "plateau_time": plateau * timestep,
+            "blocks": self.blocks,
+            "samples": self.samples,
+            "time": np.arange(self.max_lag) * timestep,
+            "acf": acf * scale,
+            "acf_error": acf_error * scale,
+            "running": running,
+            "running_error": running_error,
+        }
+
+
+# Trajectory readers: each yields arrays of shape (samples, components)
+
+def iter_text_forces(path, columns, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Chunks of the given 0-based columns of a whitespace- or comma-separated text file.
+
+    Lines starting with '#' (as in LAMMPS fix ave/time output) are skipped,
+    as is a header line that does not parse as numbers.
+    """
+    f = slip_io._open_text(path, "r")
+    try:
+        lines = (line for line in f if line.strip() and not line.lstrip().startswith("#"))
+        first = next(lines, None)
+        if first is None:
+            return
+        delimiter = "," if "," in first else None
+        try:
+            [float(v) for v in first.split(delimiter)]
+            lines = itertools.chain([first], lines)
+        except ValueError:
+            pass  # header line
+        while True:
+            block = list(itertools.islice(lines, chunk_rows))
+            if not block:
+                break
+            yield np.loadtxt(block, delimiter=delimiter, usecols=columns, dtype=np.float64, ndmin=2)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_binary_forces(path, columns, fields, dtype="<f8", offset=0, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Chunks of the given columns of a raw binary file of fields values per sample.
+
+    .npy files are memory-mapped; their own shape and dtype replace fields,
+    dtype and offset.
+    """
+    if str(path).endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        if data.ndim == 1:
+            data = data[:, None]
+    else:
+        data = np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset)
+        data = data[:len(data) // fields * fields].reshape(-1, fields)
+    for start in range(0, len(data), chunk_rows):
+        yield np.asarray(data[start:start + chunk_rows, columns], dtype=np.float64)
+
+
+def iter_table_forces(path, columns, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Chunks of named columns of a CSV (with header), Parquet table or result store"""
+    for chunk in slip_io.iter_table_chunks(path, chunk_rows, columns):
+        yield np.column_stack([chunk[name] for name in columns])
+
+
+def iter_forces(path, columns, kind="auto", fields=None, dtype="<f8", offset=0, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Force chunks from a trajectory of any supported kind: text, binary or table.
+
+    columns is a comma-separated string or a list: 0-based indices for text
+    and binary files, names for tables. With kind "auto", .npy files and
+    files given fields are binary, Parquet files and named columns are
+    tables, and anything else is text.
+    """
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    columns = [str(c).strip() for c in columns]
+    path = str(path)
+    if kind == "auto":
+        if path.endswith(".npy") or fields is not None:
+            kind = "binary"
+        elif slip_io.is_parquet(path) or not all(c.isdigit() for c in columns):
+            kind = "table"
+        else:
+            kind = "text"
+    if kind == "table":
+        return iter_table_forces(path, columns, chunk_rows)
+    columns = [int(c) for c in columns]
+    if kind == "binary":
+        if fields is None and not path.endswith(".npy"):
+            raise ValueError("raw binary trajectories need the number of fields per sample")
+        return iter_binary_forces(path, columns, fields, dtype, offset, chunk_rows)
+    return iter_text_forces(path, columns, chunk_rows)
+
+
+def mean_force(chunks, progress=None):
+    """Mean of force chunks per component: the first pass for a chunking-independent ForceCorrelation"""
+    total, samples = 0.0, 0
+    for forces in chunks:
+        forces = np.asarray(forces, dtype=np.float64)
+        total = total + (forces[:, None] if forces.ndim == 1 else forces).sum(axis=0)
+        samples += len(forces)
+        if progress is not None:
+            progress(len(forces))
+    if not samples:
+        raise ValueError("no force samples")
+    return total / samples
+
+
+def run_green_kubo(chunks, timestep, area, temperature, force_scale=1.0, max_lag=DEFAULT_MAX_LAG, block=None,
+                   subtract_mean=True, progress=None, mean=None):
+    """Stream force chunks into a ForceCorrelation and return its result() dict.
+
+    mean is the fixed mean force to subtract (see ForceCorrelation).
+    progress(samples) is called per chunk.
+    """
+    correlation = ForceCorrelation(max_lag, block, subtract_mean, mean)
+    for forces in chunks:
+        correlation.update(forces)
+        if progress is not None:
+            progress(len(forces))
+    return correlation.result(timestep, area, temperature, force_scale)
+
+
+def format_result(result):
+    """Human-readable summary of a result() dict"""
+    return "\n".join([
+        f"Interfacial friction, λ: {result['lambda_friction']:.4e} ± {result['lambda_error']:.1e} Pa·s/m",
+        f"Plateau of the running integral at t = {result['plateau_time']:.4e} s",
+        f"Blocks: {result['blocks']:,} from {result['samples']:,} samples",
+    ])
@@ -0,0 +1,134 @@
+"""Background execution of GUI computations.
+
+Tk widgets may only be touched from the thread running the main loop, so
+jobs run on a worker thread and never see a widget. Whatever they report,
+progress, a result or an exception, goes through a queue. The Tk thread
+drains the queue with root.after() and calls the GUI's handlers there.
+
+Cancellation is cooperative: Job.progress() raises Cancelled once the job has
+been cancelled. The model code only needs to report progress through a
+callback, as run_monte_carlo() and run_sweep() already do. NumPy releases the
+GIL in its inner loops, and jobs that need more than one core start their
+own process pool, so a thread is enough to keep the window responsive.
+"""
+
+import queue
+import threading
+
+# Milliseconds between checks of the result queue while a job is running
+POLL_MS = 50
+
+
+class Cancelled(Exception):
+    """Raised inside a job that has been cancelled"""
+
+
+class Job:
+    """Handle passed to a running job: progress reporting and cancellation checks"""
+
+    def __init__(self, messages):
+        self._messages = messages
+        self._cancel = threading.Event()
+        self.done = 0
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise Cancelled if the job has been cancelled"""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, done, total=None):
+        """Report done more units of work out of total (None for an unknown total)"""
+        self.check()
+        self.done += done
+        self._messages.put((self, "progress", (self.done, total)))
+
+
+class BackgroundRunner:
+    """Runs one job at a time on a worker thread and hands its outcome back on the Tk thread.
+
+    Submitting a job cancels the one still running, whose outcome is then
+    dropped, so rapid resubmission (live recompute) always shows the latest
+    result. on_busy(busy) is called when the runner starts or stops working.
+    """
+
+    def __init__(self, root, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.current = None
+        self._handlers = {}
+        self._messages = queue.Queue()
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self.current is not None
+
+    def submit(self, func, on_done=None, on_error=None, on_progress=None):
+        """Run func(job) on a worker thread.
+
+        on_done(result), on_error(exception) and on_progress(done, total) are
+        called on the Tk thread. Returns the Job.
+        """
+        self.cancel()
+        job = Job(self._messages)
+        self._handlers[job] = (on_done, on_error, on_progress)
+        self.current = job
+        threading.Thread(target=self._run, args=(job, func), daemon=True).start()
+        if self.on_busy is not None:
+            self.on_busy(True)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        return job
+
+    def cancel(self):
+        """Cancel the running job, if any; its outcome will be ignored"""
+        job, self.current = self.current, None
+        if job is not None:
+            job.cancel()
+            if self.on_busy is not None:
+                self.on_busy(False)
+
+    def _run(self, job, func):
+        try:
+            result = func(job)
+        except Cancelled:
+            self._messages.put((job, "cancelled", None))
+        except Exception as e:
+            self._messages.put((job, "error", e))
+        else:
+            self._messages.put((job, "done", result))
+
+    def _poll(self):
+        while True:
+            try:
+                job, kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            on_done, on_error, on_progress = self._handlers.get(job, (None, None, None))
+            if kind != "progress":
+                self._handlers.pop(job, None)
+            if job is not self.current:
+                continue
+            if kind == "progress":
+                if on_progress is not None:
+                    on_progress(*payload)
+                continue
+            self.current = None
+            if self.on_busy is not None:
+                self.on_busy(False)
+            if kind == "done" and on_done is not None:
+                on_done(payload)
+            elif kind == "error" and on_error is not None:
+                on_error(payload)
+        if self._handlers:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
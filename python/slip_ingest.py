@@ -0,0 +1,346 @@
+"""Bulk ingest of exported text reports into an indexed result archive.
+
+Years of GUI exports leave directory trees full of one-result .txt reports.
+ingest() parses them in parallel worker processes and appends the results
+to an archive: a result store (see slip_store) with two extra columns,
+
+    generated   export time from the report header (POSIX seconds, NaN if absent)
+    source      line of the archive's sources.txt naming the report file
+
+and a sorted index per input column, ratio and slip under index/. A filter
+such as "slip == 1 and gap_nm < 50" is answered by binary search on the
+most selective indexed condition; only the rows it selects are read to test
+the other conditions, so queries take milliseconds on millions of rows.
+
+Reports parse in v1.01's layout, which slip_export.format_report() keeps,
+and in its ASCII fallbacks, where μ, λ, γ, b₀ and bₑff are spelled out and
+other characters may have become '?'. Files already in the archive are
+skipped, so re-running ingest on a growing tree adds only the new reports.
+"""
+
+import datetime
+import fnmatch
+import json
+import multiprocessing
+import operator
+import os
+import re
+
+import numpy as np
+
+import slip_export
+import slip_model
+import slip_store
+
+ARCHIVE_DTYPE = np.dtype(slip_store.STORE_DTYPE.descr + [("generated", np.float64), ("source", np.int64)])
+
+SOURCES_NAME = "sources.txt"
+INDEX_DIR = "index"
+INDEX_HEADER = "index.json"
+
+# Columns with a sorted index
+INDEX_COLUMNS = slip_model.INPUT_NAMES + ("ratio", "slip")
+
+# Report files handed to a worker at a time
+DEFAULT_BATCH_FILES = 256
+
+# Normalized report labels (see _normalize_label) of each section's fields
+INPUT_FIELDS = {
+    "gap height": "gap_nm",
+    "sliding speed": "sliding_speed",
+    "water viscosity": "mu",
+    "interfacial friction": "lambda_friction",
+    "critical shear rate": "gamma_crit",
+    "exponent": "exponent",
+}
+RESULT_FIELDS = {
+    "gap": "gap_m",
+    "shear rate": "shear_rate",
+    "shear stress": "shear_stress",
+    "baseline slip length": "b0",
+    "effective slip length": "b_eff",
+    "slip length / gap": "ratio",
+}
+
+_UNITS = re.compile(r"\([^)]*\)")
+
+
+def _normalize_label(label):
+    """Lower-case ASCII label without units or symbols: 'Baseline Slip Length, b₀ (m)' -> 'baseline slip length'"""
+    label = "".join(slip_export.ASCII_NAMES.get(c, c) for c in label)
+    label = _UNITS.sub("", label.split(",")[0])
+    return " ".join(label.lower().split())
+
+
+def _number(text):
+    """Leading number of a value such as '100 nm' or '1.000e-07'"""
+    parts = text.split()
+    return float(parts[0]) if parts else float("nan")
+
+
+def _decode(data):
+    """Text of a report file: UTF-8 (with or without BOM), UTF-16 with BOM, or else Latin-1"""
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def parse_report(text):
+    """Parse the text of one exported report into a dict of ARCHIVE_DTYPE fields (without source).
+
+    Raises ValueError if an input parameter is missing. Result lines that are
+    missing are NaN; without a recommendation line, slip follows from ratio.
+    """
+    record = {name: np.nan for name in ARCHIVE_DTYPE.names if name != "source"}
+    record["slip"] = None
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        upper = line.upper()
+        if upper.startswith("INPUT PARAMETERS"):
+            section = INPUT_FIELDS
+        elif upper.startswith("CALCULATION RESULTS"):
+            section = RESULT_FIELDS
+        elif upper.startswith("RECOMMENDATION"):
+            section = None
+        elif line.startswith("Generated:"):
+            try:
+                stamp = datetime.datetime.strptime(line.split(":", 1)[1].strip(), "%Y-%m-%d %H:%M:%S")
+                record["generated"] = stamp.timestamp()
+            except ValueError:
+                pass
+        elif line.startswith(slip_model.SLIP_TEXT):
+            record["slip"] = True
+        elif line.startswith(slip_model.NO_SLIP_TEXT):
+            record["slip"] = False
+        elif section is not None and ":" in line:
+            label, value = line.rsplit(":", 1)
+            name = section.get(_normalize_label(label))
+            if name is not None:
+                try:
+                    record[name] = _number(value)
+                except ValueError:
+                    raise ValueError(f"cannot parse value of '{label}': {value.strip()}") from None
+    missing = [name for name in slip_model.INPUT_NAMES if np.isnan(record[name])]
+    if missing:
+        raise ValueError(f"missing input parameter(s) {', '.join(missing)}")
+    if record["slip"] is None:
+        record["slip"] = not (record["ratio"] < slip_model.SLIP_THRESHOLD)
+    return record
+
+
+def parse_file(path):
+    """Parse one exported report file; see parse_report()"""
+    with open(path, "rb") as f:
+        return parse_report(_decode(f.read()))
+
+
+def _parse_batch(paths):
+    """Parse a batch of report files into a dict of columns (without source) and a list of (path, error)"""
+    records, ok, failed = [], [], []
+    for path in paths:
+        try:
+            records.append(parse_file(path))
+            ok.append(path)
+        except (OSError, ValueError) as e:
+            failed.append((path, str(e)))
+    columns = {name: np.array([r[name] for r in records], dtype=ARCHIVE_DTYPE[name])
+               for name in ARCHIVE_DTYPE.names if name != "source"}
+    return columns, ok, failed
+
+
+def find_reports(roots, pattern="*.txt"):
+    """Sorted absolute paths of the files matching pattern under roots (directories or files)"""
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    paths = []
+    for root in roots:
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            paths.append(root)
+            continue
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            paths += [os.path.join(folder, name) for name in sorted(files) if fnmatch.fnmatch(name, pattern)]
+    return paths
+
+
+def read_sources(archive):
+    """Report paths of an archive, in source order"""
+    path = os.path.join(str(archive), SOURCES_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def ingest(roots, archive, pattern="*.txt", workers=None, batch_files=DEFAULT_BATCH_FILES, progress=None):
+    """Parse every report under roots into archive (created if needed) and rebuild its index.
+
+    workers processes parse batch_files reports at a time (default: all
+    cores). progress(files) is called per batch. Returns a dict with the
+    numbers of files found, skipped (already archived) and added, the
+    archive's rows, and the (path, error) of reports that did not parse.
+    """
+    archive = str(archive)
+    if os.path.exists(os.path.join(archive, slip_store.HEADER_NAME)):
+        store = slip_store.ResultStore(archive, "r+")
+        if store.dtype != ARCHIVE_DTYPE:
+            raise ValueError(f"{archive} is a result store but not a report archive")
+    else:
+        store = slip_store.ResultStore.create(archive, ARCHIVE_DTYPE, attrs={"kind": "report archive"})
+    archived = read_sources(archive)
+    known = set(archived)
+    found = find_reports(roots, pattern)
+    todo = [path for path in found if path not in known]
+    batches = [todo[i:i + batch_files] for i in range(0, len(todo), batch_files)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(batches) or 1))
+
+    failed, added = [], 0
+    pending, paths = [], []
+
+    def flush():
+        # The rows go to disk before their sources are recorded, so a crash never lists a report the
+        # archive lacks; doing this per store chunk's worth of reports keeps the rewrites of the last chunk rare
+        if paths:
+            columns = {name: np.concatenate([p[name] for p in pending]) for name in pending[0]}
+            columns["source"] = np.arange(len(archived) + added - len(paths), len(archived) + added, dtype=np.int64)
+            store.append(columns)
+            store.flush()
+            sources.write("".join(path + "\n" for path in paths))
+            sources.flush()
+        pending.clear()
+        paths.clear()
+
+    with open(os.path.join(archive, SOURCES_NAME), "a", encoding="utf-8") as sources:
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        try:
+            results = map(_parse_batch, batches) if pool is None else pool.imap(_parse_batch, batches)
+            for batch, (columns, ok, errors) in zip(batches, results):
+                if ok:
+                    pending.append(columns)
+                    paths.extend(ok)
+                    added += len(ok)
+                    if len(paths) >= store.chunk_rows:
+                        flush()
+                failed += errors
+                if progress is not None:
+                    progress(len(batch))
+            flush()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    build_index(archive)
+    return {"found": len(found), "skipped": len(found) - len(todo), "added": added, "rows": len(store),
+            "failed": failed}
+
+
+def build_index(archive):
+    """(Re)build the sorted index of every INDEX_COLUMNS column of an archive"""
+    store = slip_store.ResultStore(str(archive))
+    folder = os.path.join(store.path, INDEX_DIR)
+    os.makedirs(folder, exist_ok=True)
+    for name in INDEX_COLUMNS:
+        values = store.read(columns=[name])[name].astype(np.float64)
+        # NaN sorts last
+        order = np.argsort(values, kind="stable")
+        np.save(os.path.join(folder, f"{name}.rows.npy"), order)
+        np.save(os.path.join(folder, f"{name}.values.npy"), values[order])
+    with open(os.path.join(folder, INDEX_HEADER), "w", encoding="utf-8") as f:
+        json.dump({"rows": len(store), "columns": list(INDEX_COLUMNS)}, f)
+
+
+def _index_range(values, op, value):
+    """[lo, hi) of the sorted values satisfying op value, or None if the index cannot answer op"""
+    if op is operator.ne:
+        return None
+    if np.isnan(value):
+        return 0, 0
+    finite = int(np.searchsorted(values, np.nan))
+    left = int(np.searchsorted(values, value, "left"))
+    right = int(np.searchsorted(values, value, "right"))
+    return {
+        operator.lt: (0, left),
+        operator.le: (0, right),
+        operator.gt: (right, finite),
+        operator.ge: (left, finite),
+        operator.eq: (left, right),
+    }[op]
+
+
+class ResultArchive:
+    """Read access and indexed queries on an archive written by ingest()"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.store = slip_store.ResultStore(self.path)
+        if self.store.dtype != ARCHIVE_DTYPE:
+            raise ValueError(f"{self.path} is not a report archive")
+        self._index = {}
+        self._sources = None
+        try:
+            with open(os.path.join(self.path, INDEX_DIR, INDEX_HEADER), encoding="utf-8") as f:
+                header = json.load(f)
+            self.indexed = header["columns"] if header["rows"] == len(self.store) else []
+        except OSError:
+            self.indexed = []
+
+    def __len__(self):
+        return len(self.store)
+
+    def _sorted(self, name):
+        if name not in self._index:
+            folder = os.path.join(self.path, INDEX_DIR)
+            self._index[name] = (np.load(os.path.join(folder, f"{name}.values.npy"), mmap_mode="r"),
+                                 np.load(os.path.join(folder, f"{name}.rows.npy"), mmap_mode="r"))
+        return self._index[name]
+
+    def rows(self, conditions):
+        """Sorted row numbers matching a filter string or a parse_filter() list"""
+        if isinstance(conditions, str):
+            conditions = slip_store.parse_filter(conditions, ARCHIVE_DTYPE.names)
+        best = None
+        for k, (name, op, value) in enumerate(conditions):
+            if name in self.indexed:
+                span = _index_range(self._sorted(name)[0], op, value)
+                if span is not None and (best is None or span[1] - span[0] < best[1][1] - best[1][0]):
+                    best = (k, span)
+        if best is None:
+            candidates = np.arange(len(self.store))
+            rest = conditions
+        else:
+            k, (lo, hi) = best
+            candidates = np.sort(self._sorted(conditions[k][0])[1][lo:hi])
+            rest = conditions[:k] + conditions[k + 1:]
+        if rest and candidates.size:
+            names = list(dict.fromkeys(name for name, _, _ in rest))
+            values = self.store.read(candidates, names)
+            keep = np.ones(candidates.size, dtype=bool)
+            for name, op, value in rest:
+                keep &= op(values[name], value)
+            candidates = candidates[keep]
+        return candidates
+
+    def query(self, conditions, columns=None):
+        """Structured array of the matching rows (all columns, or the given ones)"""
+        return self.store.read(self.rows(conditions), columns)
+
+    def count(self, conditions):
+        return len(self.rows(conditions))
+
+    def sources(self, source):
+        """Report path(s) of source number(s)"""
+        if self._sources is None:
+            self._sources = read_sources(self.path)
+        if np.isscalar(source):
+            return self._sources[int(source)]
+        return [self._sources[int(s)] for s in source]
+
+
+def open_archive(path):
+    """Open an archive written by ingest()"""
+    return ResultArchive(path)
@@ -0,0 +1,194 @@
+"""Chunked table input/output for the batch tools.
+
+Tables are read and written a fixed number of rows at a time, so memory use
+does not depend on file size. CSV is handled with NumPy alone. Parquet needs
+the optional pyarrow package and is selected by the .parquet/.pq extension.
+Paths ending in .store (or existing store directories) are result stores,
+see slip_store. Writers for JSON Lines, Arrow and HDF5 come from slip_export.
+"""
+
+import itertools
+import os
+import sys
+
+import numpy as np
+
+import slip_store
+
+# Rows per chunk used when the caller does not choose one
+DEFAULT_CHUNK_ROWS = 1 << 17
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+
+def is_parquet(path):
+    """Return True if the path names a Parquet file"""
+    return os.path.splitext(str(path))[1].lower() in PARQUET_EXTENSIONS
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support requires the 'pyarrow' package (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _open_text(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _select_columns(path, header, columns, skip_missing):
+    if columns is None:
+        return list(header)
+    missing = [name for name in columns if name not in header]
+    if missing and not skip_missing:
+        raise KeyError(f"{path}: missing column(s) {', '.join(missing)}")
+    return [name for name in columns if name in header]
+
+
+def iter_csv_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None, skip_missing=False):
+    """Yield dicts of float64 column arrays, chunk_rows rows at a time, from a CSV file"""
+    f = _open_text(path, "r")
+    try:
+        header = [name.strip() for name in f.readline().split(",")]
+        wanted = _select_columns(path, header, columns, skip_missing)
+        if not wanted:
+            return
+        usecols = [header.index(name) for name in wanted]
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                break
+            data = np.loadtxt(lines, delimiter=",", usecols=usecols, dtype=np.float64, ndmin=2)
+            yield {name: data[:, i] for i, name in enumerate(wanted)}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_parquet_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None, skip_missing=False):
+    """Yield dicts of float64 column arrays, chunk_rows rows at a time, from a Parquet file"""
+    pa = _require_pyarrow()
+    pf = pa.parquet.ParquetFile(path)
+    wanted = _select_columns(path, pf.schema_arrow.names, columns, skip_missing)
+    if not wanted:
+        return
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=wanted):
+        yield {name: batch.column(i).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+               for i, name in enumerate(batch.schema.names)}
+
+
+def iter_table_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None, skip_missing=False):
+    """Yield column chunks from a CSV table, Parquet table or result store.
+
+    With skip_missing, requested columns that the table lacks are left out of
+    the chunks instead of raising KeyError.
+    """
+    if is_parquet(path):
+        return iter_parquet_chunks(path, chunk_rows, columns, skip_missing)
+    if path != "-" and slip_store.is_store_path(path):
+        return slip_store.iter_store_chunks(path, chunk_rows, columns, skip_missing)
+    return iter_csv_chunks(path, chunk_rows, columns, skip_missing)
+
+
+def format_csv_rows(arrays, json_booleans=False):
+    """CSV text, without header, of equal-length 1D arrays.
+
+    Integer columns are written as integers, booleans as 0/1 (true/false with
+    json_booleans), everything else as float64 in round-trip precision.
+    pyarrow's C++ CSV writer is used when it is installed; the pure NumPy
+    fallback is several times slower.
+    """
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        # repr() gives the shortest string that round-trips each float64
+        fields = []
+        for a in arrays:
+            if a.dtype.kind == "b" and json_booleans:
+                fields.append(np.where(a, "true", "false").tolist())
+            elif a.dtype.kind in "biu":
+                fields.append(map(str, a.astype(np.int64).tolist()))
+            else:
+                fields.append(map(repr, a.astype(np.float64, copy=False).tolist()))
+        return "\n".join(map(",".join, zip(*fields))) + "\n"
+    columns = {}
+    for k, a in enumerate(arrays):
+        if a.dtype.kind == "b":
+            columns[str(k)] = a if json_booleans else a.astype(np.uint8)
+        elif a.dtype.kind in "iu":
+            columns[str(k)] = a
+        else:
+            columns[str(k)] = a.astype(np.float64, copy=False)
+    buffer = pyarrow.BufferOutputStream()
+    pyarrow.csv.write_csv(pyarrow.table(columns), buffer, pyarrow.csv.WriteOptions(include_header=False))
+    return buffer.getvalue().to_pybytes().decode()
+
+
+class TableWriter:
+    """Incremental CSV or Parquet writer fed with dicts of column arrays.
+
+    Columns are written in the order given to the constructor. Integer and
+    boolean columns are written as integers, everything else as float64 in
+    round-trip precision.
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self._parquet = is_parquet(path)
+        self._writer = None
+        self._file = None
+        if not self._parquet:
+            self._file = _open_text(path, "w")
+            self._file.write(",".join(self.columns) + "\n")
+
+    def write(self, chunk):
+        """Append one chunk of rows"""
+        arrays = [np.asarray(chunk[name]) for name in self.columns]
+        n = len(arrays[0]) if arrays else 0
+        if self._parquet:
+            pa = _require_pyarrow()
+            table = pa.table({name: a for name, a in zip(self.columns, arrays)})
+            if self._writer is None:
+                self._writer = pa.parquet.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        elif n:
+            self._file.write(format_csv_rows(arrays))
+        self.rows += n
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            if self._file is sys.stdout:
+                self._file.flush()
+            else:
+                self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_table_writer(path, columns):
+    """Return a TableWriter, a slip_store.StoreWriter for result store paths, or a
+    slip_export writer for JSON Lines, Arrow and HDF5 paths"""
+    if path != "-" and slip_store.is_store_path(path):
+        return slip_store.StoreWriter(path, columns)
+    import slip_export
+
+    if slip_export.extension(path) in (slip_export.JSON_LINES_EXTENSIONS + slip_export.ARROW_EXTENSIONS
+                                       + slip_export.HDF5_EXTENSIONS):
+        return slip_export.open_writer(path, columns)
+    return TableWriter(path, columns)
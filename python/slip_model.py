@@ -0,0 +1,212 @@
+"""Headless slip/no-slip model used by the Slip/No-Slip Estimator.
+
+This module holds the physics behind the GUI's Calculate button so that it
+can be imported by batch jobs and CFD pre-processors without tkinter or a
+display. It only depends on the standard library and imports in a few
+milliseconds. The formulas use plain arithmetic operators, so every function
+also accepts NumPy arrays.
+"""
+
+import math
+from typing import NamedTuple
+
+VERSION = "1.01"
+
+# Default inputs, identical to the GUI Entry defaults
+DEFAULTS = {
+    "gap_nm": 100.0,            # Gap height (nm)
+    "sliding_speed": 1.0,       # Sliding speed (m/s)
+    "mu": 0.001,                # Water viscosity (Pa·s)
+    "lambda_friction": 1e7,     # Interfacial friction (Pa·s/m)
+    "gamma_crit": 1e7,          # Critical shear rate (1/s)
+    "exponent": 2.0,            # Exponent (m)
+}
+
+# Order of the six model inputs, as they appear in the GUI
+INPUT_NAMES = ("gap_nm", "sliding_speed", "mu", "lambda_friction", "gamma_crit", "exponent")
+
+# GUI label of each input
+INPUT_LABELS = {
+    "gap_nm": "Gap Height (nm)",
+    "sliding_speed": "Sliding Speed (m/s)",
+    "mu": "Water Viscosity (Pa·s)",
+    "lambda_friction": "Interfacial Friction (Pa·s/m)",
+    "gamma_crit": "Critical Shear Rate (1/s)",
+    "exponent": "Exponent (m)",
+}
+
+# Decision criterion: slip is significant once bₑff/h reaches this value
+SLIP_THRESHOLD = 0.01
+
+NO_SLIP_TEXT = "No-slip condition is appropriate"
+SLIP_TEXT = "Slip condition should be considered"
+
+# Label of each computed quantity, as in the GUI results panel
+OUTPUT_LABELS = {
+    "gap_m": "Gap (m)",
+    "shear_rate": "Shear Rate (1/s)",
+    "shear_stress": "Shear Stress (Pa)",
+    "b0": "Baseline Slip Length, b₀ (m)",
+    "b_eff": "Effective Slip Length, bₑff (m)",
+    "ratio": "Slip Length / Gap",
+    "slip": "Slip",
+}
+
+
+class SlipResult(NamedTuple):
+    """Inputs and outputs of one evaluation of the model"""
+
+    gap_nm: float
+    sliding_speed: float
+    mu: float
+    lambda_friction: float
+    gamma_crit: float
+    exponent: float
+    gap_m: float
+    shear_rate: float
+    shear_stress: float
+    b0: float
+    b_eff: float
+    ratio: float
+    slip: bool
+
+    @property
+    def recommendation(self):
+        return recommendation(self.ratio)
+
+    @property
+    def cfd_suggestion(self):
+        return cfd_suggestion(self.ratio, self.b_eff)
+
+
+def nm_to_m(gap_nm):
+    """Convert a gap height from nanometres to metres"""
+    return gap_nm * 1e-9
+
+
+def shear_rate(sliding_speed, gap_m):
+    """Shear rate (1/s): γ = U / h"""
+    return sliding_speed / gap_m
+
+
+def _root(value, exponent):
+    """value ** (1 / (exponent + 1)), infinite where that overflows"""
+    try:
+        return value**(1 / (exponent + 1))
+    except OverflowError:
+        return math.inf
+
+
+def self_consistent_shear_rate(sliding_speed, gap_m, b0, gamma_crit, exponent, rtol=1e-12, max_iter=100):
+    """Slip-corrected Couette shear rate (1/s) for scalar inputs.
+
+    Solves γ = U / (h + 2 bₑff(γ)) by Newton's method on γ (h + 2 bₑff(γ)) − U,
+    starting from the upper end of a bracket of the root, narrowing the
+    bracket as it goes and bisecting it when a step leaves it. Returns NaN
+    for m ≤ -1, where the equation has no root or two of them, and if the
+    solve does not converge. For m near -1 the root can lie below the
+    smallest float and is then zero. slip_batch.solve_shear_rate() is the vectorized
+    version.
+    """
+    if not exponent > -1:
+        return math.nan
+    speed = abs(sliding_speed)
+    linear = gap_m + 2 * b0
+    nominal = speed / gap_m if gap_m else math.inf
+    first = speed / (gap_m + 2 * effective_slip_length(b0, nominal, gamma_crit, exponent))
+    if exponent > 0:
+        asymptote = _root(speed * gamma_crit**exponent / (2 * b0), exponent) if b0 > 0 else math.inf
+        lo, hi = first, min(speed / linear, asymptote)
+    else:
+        half = _root(speed * gamma_crit**exponent / (4 * b0), exponent) if b0 > 0 else math.inf
+        lo, hi = min(0.5 * speed / linear, half), min(speed / linear, first)
+    if not hi > lo:
+        # No slip (b₀ = 0), no motion, or invalid input: the bracket is a point (or NaN)
+        return math.copysign(hi, sliding_speed)
+    # The error after a step is about max(m, 1) × (relative step)², so stop once that is below rtol
+    tol = math.sqrt(rtol / max(exponent, 1))
+    rate = hi
+    for _ in range(max_iter):
+        try:
+            power = 2 * b0 * (rate / gamma_crit)**exponent
+        except (OverflowError, ZeroDivisionError):
+            # A vanishing rate with m < 0
+            power = math.inf
+        residual = rate * (linear + power) - speed
+        if residual > 0:
+            hi = rate
+        elif residual < 0:
+            lo = rate
+        step = rate - residual / (linear + (exponent + 1) * power)
+        if not lo <= step <= hi:
+            # The bracket may span hundreds of decades for m near -1, and its lower end underflow to zero
+            step = math.sqrt(lo) * math.sqrt(hi) if lo > 0 else hi * 2.0**-64
+        converged = abs(step - rate) <= tol * step
+        rate = step
+        if converged:
+            break
+    else:
+        return math.nan
+    return math.copysign(rate, sliding_speed)
+
+
+def shear_stress(mu, rate):
+    """Shear stress (Pa): τ = μ × γ"""
+    return mu * rate
+
+
+def baseline_slip_length(mu, lambda_friction):
+    """Baseline slip length (m) at low shear: b₀ = μ / λ"""
+    return mu / lambda_friction
+
+
+def effective_slip_length(b0, rate, gamma_crit, exponent):
+    """Effective slip length (m) including the sliding effect: bₑff = b₀ [1 + (γ / γ_c)^m]"""
+    reduced = rate / gamma_crit
+    try:
+        power = reduced**exponent
+    except ZeroDivisionError:
+        # Python numbers raise for (0 / γ_c)^m with m < 0; it is infinite, as for NumPy arrays
+        power = math.inf
+    return b0 * (1 + power)
+
+
+def slip_ratio(b_eff, gap_m):
+    """Slip length relative to the gap: bₑff / h"""
+    return b_eff / gap_m
+
+
+def is_slip(ratio):
+    """Return True when the slip ratio calls for a slip boundary condition"""
+    return not ratio < SLIP_THRESHOLD
+
+
+def recommendation(ratio):
+    """Recommendation text shown in the GUI for a given slip ratio"""
+    return SLIP_TEXT if is_slip(ratio) else NO_SLIP_TEXT
+
+
+def cfd_suggestion(ratio, b_eff):
+    """Suggested CFD boundary condition for a given slip ratio"""
+    if is_slip(ratio):
+        return f"For CFD simulation: Use a Navier slip boundary condition with a slip length of {b_eff:.3e} m."
+    return "For CFD simulation: Use a no-slip boundary condition (e.g., u = 0 at the wall)."
+
+
+def evaluate(gap_nm, sliding_speed, mu, lambda_friction, gamma_crit, exponent, self_consistent=False):
+    """Run the full calculation chain for one set of inputs and return a SlipResult.
+
+    With self_consistent, γ is the slip-corrected Couette shear rate
+    U / (h + 2 bₑff) instead of the nominal U / h.
+    """
+    gap_m = nm_to_m(gap_nm)
+    b0 = baseline_slip_length(mu, lambda_friction)
+    if self_consistent:
+        rate = self_consistent_shear_rate(sliding_speed, gap_m, b0, gamma_crit, exponent)
+    else:
+        rate = shear_rate(sliding_speed, gap_m)
+    stress = shear_stress(mu, rate)
+    b_eff = effective_slip_length(b0, rate, gamma_crit, exponent)
+    ratio = slip_ratio(b_eff, gap_m)
+    return SlipResult(gap_nm, sliding_speed, mu, lambda_friction, gamma_crit, exponent,
+                      gap_m, rate, stress, b0, b_eff, ratio, is_slip(ratio))
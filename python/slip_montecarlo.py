@@ -0,0 +1,346 @@
+"""Monte Carlo uncertainty propagation through the slip model.
+
+Each uncertain input gets a distribution (fixed, uniform, log-uniform,
+log-normal or a user histogram). Samples are drawn and evaluated in
+vectorized blocks with slip_batch.evaluate_batch(). Every block is folded
+into a MonteCarloSummary made of streaming accumulators, so memory is
+bounded no matter how many samples are drawn:
+
+* P(slip) from a running count, with its binomial standard error;
+* quantiles of bₑff and of bₑff/h from fixed log-spaced histograms
+  (0.001-decade bins, i.e. about 0.23 % relative resolution);
+* running mean and variance (Chan's pairwise update).
+
+Block i always uses its own random stream derived from (seed, i). The
+samples, and hence P(slip) and the quantiles, are therefore reproducible
+regardless of how many worker processes share a run.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+DEFAULT_BLOCK = 1 << 20
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Range and resolution of the quantile histograms, in log10 units
+LOG_MIN, LOG_MAX, LOG_STEP = -30.0, 10.0, 1e-3
+
+
+# Distributions
+
+class Fixed:
+    """A constant input"""
+
+    def __init__(self, value):
+        self.value = float(value)
+
+    def sample(self, rng, n):
+        return np.full(n, self.value)
+
+    def __repr__(self):
+        return f"fixed:{self.value:g}"
+
+
+class Uniform:
+    """Uniform between lo and hi"""
+
+    def __init__(self, lo, hi):
+        self.lo, self.hi = float(lo), float(hi)
+
+    def sample(self, rng, n):
+        return rng.uniform(self.lo, self.hi, n)
+
+    def __repr__(self):
+        return f"uniform:{self.lo:g}:{self.hi:g}"
+
+
+class LogUniform:
+    """Uniform in log between lo and hi (both > 0)"""
+
+    def __init__(self, lo, hi):
+        if lo <= 0 or hi <= 0:
+            raise ValueError("log-uniform bounds must be positive")
+        self.lo, self.hi = float(lo), float(hi)
+
+    def sample(self, rng, n):
+        return np.exp(rng.uniform(np.log(self.lo), np.log(self.hi), n))
+
+    def __repr__(self):
+        return f"loguniform:{self.lo:g}:{self.hi:g}"
+
+
+class LogNormal:
+    """Log-normal with the given median and standard deviation of log10(x) in decades"""
+
+    def __init__(self, median, sigma_decades):
+        if median <= 0:
+            raise ValueError("log-normal median must be positive")
+        self.median, self.sigma = float(median), float(sigma_decades)
+
+    def sample(self, rng, n):
+        return self.median * 10.0**(self.sigma * rng.standard_normal(n))
+
+    def __repr__(self):
+        return f"lognormal:{self.median:g}:{self.sigma:g}"
+
+
+class Histogram:
+    """Piecewise-uniform distribution over bins [lower, upper) with relative weights.
+
+    With log=True the samples are uniform in log within each bin.
+    """
+
+    def __init__(self, lower, upper, weights, log=False):
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.sum() <= 0 or (weights < 0).any():
+            raise ValueError("histogram weights must be non-negative and not all zero")
+        self.cdf = np.cumsum(weights) / weights.sum()
+        self.log = log
+        if log and ((self.lower <= 0).any() or (self.upper <= 0).any()):
+            raise ValueError("log histogram bins must be positive")
+
+    @classmethod
+    def from_csv(cls, path, log=False):
+        """Read a histogram from a CSV file with columns lower,upper,weight"""
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        return cls(data[:, 0], data[:, 1], data[:, 2], log=log)
+
+    def sample(self, rng, n):
+        u = rng.random(n)
+        bins = np.minimum(np.searchsorted(self.cdf, u, side="right"), len(self.cdf) - 1)
+        t = rng.random(n)
+        lo, hi = self.lower[bins], self.upper[bins]
+        if self.log:
+            return np.exp(np.log(lo) + t * (np.log(hi) - np.log(lo)))
+        return lo + t * (hi - lo)
+
+    def __repr__(self):
+        return f"hist:{len(self.cdf)} bins{' (log)' if self.log else ''}"
+
+
+def parse_distribution(spec):
+    """Parse a distribution spec.
+
+    Accepted forms: VALUE, fixed:VALUE, uniform:LO:HI, loguniform:LO:HI,
+    lognormal:MEDIAN:SIGMA_DECADES, hist:FILE.csv and loghist:FILE.csv.
+    """
+    kind, _, rest = spec.partition(":")
+    kind = kind.strip().lower()
+    if not rest:
+        return Fixed(float(kind))
+    if kind in ("hist", "loghist"):
+        return Histogram.from_csv(rest, log=kind == "loghist")
+    args = [float(v) for v in rest.split(":")]
+    kinds = {"fixed": (Fixed, 1), "uniform": (Uniform, 2), "loguniform": (LogUniform, 2),
+             "lognormal": (LogNormal, 2)}
+    if kind not in kinds or len(args) != kinds[kind][1]:
+        raise ValueError(f"bad distribution '{spec}'")
+    return kinds[kind][0](*args)
+
+
+# Streaming accumulators
+
+class LogHistogram:
+    """Fixed-bin histogram of log10(x) for streaming quantiles of positive values"""
+
+    def __init__(self):
+        self.nbins = int(round((LOG_MAX - LOG_MIN) / LOG_STEP))
+        self.counts = np.zeros(self.nbins + 2, dtype=np.int64)   # plus under/overflow bins
+        self.nonpositive = 0
+        self.nan = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        nan = np.isnan(values)
+        self.nan += int(nan.sum())
+        positive = values > 0
+        self.nonpositive += int((~positive & ~nan).sum())
+        with np.errstate(divide="ignore"):
+            index = np.floor((np.log10(values[positive]) - LOG_MIN) / LOG_STEP)
+        index = np.clip(index, -1, self.nbins).astype(np.int64) + 1
+        self.counts += np.bincount(index, minlength=self.nbins + 2)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.nonpositive += other.nonpositive
+        self.nan += other.nan
+
+    def quantile(self, q):
+        """Approximate quantile(s), interpolating log-linearly within a bin"""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        total = self.nonpositive + self.counts.sum()
+        out = np.full(q.shape, np.nan)
+        if total == 0:
+            return out
+        cum = self.nonpositive + np.cumsum(self.counts)
+        target = q * total
+        for i, t in enumerate(target):
+            if t < self.nonpositive:
+                out[i] = 0.0
+                continue
+            b = min(int(np.searchsorted(cum, t, side="left")), len(cum) - 1)
+            below = cum[b] - self.counts[b]
+            frac = (t - below) / self.counts[b] if self.counts[b] else 0.0
+            if b == 0:
+                out[i] = 10.0**LOG_MIN
+            elif b == self.nbins + 1:
+                out[i] = 10.0**LOG_MAX
+            else:
+                out[i] = 10.0**(LOG_MIN + (b - 1 + frac) * LOG_STEP)
+        return out
+
+
+class RunningMoments:
+    """Count, mean and variance of finite values, mergeable across blocks"""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size:
+            other = RunningMoments()
+            other.n, other.mean = values.size, float(values.mean())
+            other.m2 = float(((values - other.mean)**2).sum())
+            self.merge(other)
+
+    def merge(self, other):
+        n = self.n + other.n
+        if n == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+    @property
+    def std(self):
+        return (self.m2 / (self.n - 1))**0.5 if self.n > 1 else float("nan")
+
+
+class MonteCarloSummary:
+    """Streaming summary of Monte Carlo samples of the slip model"""
+
+    def __init__(self):
+        self.n = 0
+        self.n_slip = 0
+        self.hist = {"b_eff": LogHistogram(), "ratio": LogHistogram()}
+        self.moments = {"b_eff": RunningMoments(), "ratio": RunningMoments()}
+
+    def add(self, result):
+        """Fold in a structured array from slip_batch.evaluate_batch()"""
+        self.n += result.size
+        self.n_slip += int(np.count_nonzero(result["slip"]))
+        for name in self.hist:
+            self.hist[name].add(result[name])
+            self.moments[name].add(result[name])
+
+    def merge(self, other):
+        self.n += other.n
+        self.n_slip += other.n_slip
+        for name in self.hist:
+            self.hist[name].merge(other.hist[name])
+            self.moments[name].merge(other.moments[name])
+
+    @property
+    def p_slip(self):
+        return self.n_slip / self.n if self.n else float("nan")
+
+    @property
+    def p_slip_stderr(self):
+        p = self.p_slip
+        return (p * (1 - p) / self.n)**0.5 if self.n else float("nan")
+
+    def report(self, quantiles=DEFAULT_QUANTILES):
+        """Plain dict of the results, suitable for printing or JSON"""
+        out = {"samples": self.n, "p_slip": self.p_slip, "p_slip_stderr": self.p_slip_stderr}
+        for name in self.hist:
+            values = self.hist[name].quantile(quantiles)
+            out[name] = {
+                "mean": self.moments[name].mean,
+                "std": self.moments[name].std,
+                "quantiles": {f"{q:g}": float(v) for q, v in zip(quantiles, values)},
+            }
+        return out
+
+
+def format_report(report):
+    """Human-readable text of a MonteCarloSummary.report()"""
+    lines = [f"Samples: {report['samples']:,}",
+             f"P(slip): {report['p_slip']:.4f} ± {report['p_slip_stderr']:.4f}"]
+    for name, label in (("b_eff", "Effective Slip Length, bₑff (m)"), ("ratio", "Slip Length / Gap")):
+        stats = report[name]
+        lines.append(f"{label}: mean {stats['mean']:.3e}, std {stats['std']:.3e}")
+        lines.append("  " + ", ".join(f"q{q}: {v:.3e}" for q, v in stats["quantiles"].items()))
+    return "\n".join(lines)
+
+
+# Sampling
+
+def sample_block(distributions, n, rng):
+    """Draw n samples of every model input (missing inputs use the GUI defaults)"""
+    inputs = []
+    for name in slip_model.INPUT_NAMES:
+        dist = distributions.get(name)
+        if dist is None or isinstance(dist, Fixed):
+            inputs.append(slip_model.DEFAULTS[name] if dist is None else dist.value)
+        else:
+            inputs.append(dist.sample(rng, n))
+    return inputs
+
+
+def block_rng(seed, index):
+    """Random generator of block index, independent of the worker that runs it"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def run_blocks(distributions, samples, blocks, seed, block_size=DEFAULT_BLOCK, progress=None):
+    """Evaluate the given block indices and return their merged summary"""
+    summary = MonteCarloSummary()
+    out = np.empty(block_size, dtype=slip_batch.RESULT_DTYPE)
+    for index in blocks:
+        n = min(block_size, samples - index * block_size)
+        inputs = sample_block(distributions, n, block_rng(seed, index))
+        if all(np.ndim(v) == 0 for v in inputs):
+            inputs[0] = np.full(n, inputs[0])
+        with np.errstate(all="ignore"):
+            summary.add(slip_batch.evaluate_batch(*inputs, out=out[:n]))
+        if progress is not None:
+            progress(n)
+    return summary
+
+
+def _run_worker(job):
+    return run_blocks(*job)
+
+
+def run_monte_carlo(distributions, samples, seed=0, block_size=DEFAULT_BLOCK, workers=1, progress=None):
+    """Propagate input distributions through the model and return a MonteCarloSummary.
+
+    distributions maps input names to distribution objects; inputs that are
+    not listed stay at the GUI defaults. progress, if given, is called with
+    the number of samples finished (per block with one worker, per worker
+    share otherwise).
+    """
+    samples = int(samples)
+    nblocks = -(-samples // block_size)
+    workers = max(1, min(workers or os.cpu_count() or 1, nblocks))
+    if workers == 1:
+        return run_blocks(distributions, samples, range(nblocks), seed, block_size, progress)
+
+    jobs = [(distributions, samples, range(w, nblocks, workers), seed, block_size) for w in range(workers)]
+    summary = MonteCarloSummary()
+    with multiprocessing.Pool(workers) as pool:
+        for part in pool.imap_unordered(_run_worker, jobs):
+            summary.merge(part)
+            if progress is not None:
+                progress(part.n)
+    return summary
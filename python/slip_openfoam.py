@@ -0,0 +1,560 @@
+"""Per-face Navier slip lengths for OpenFOAM wall patches.
+
+Reads the wall-patch values of OpenFOAM fields (ASCII or binary format,
+optionally gzipped), evaluates the slip model face by face and writes the
+effective slip length bₑff as a new volScalarField that a Navier slip
+boundary condition can use.
+
+The sliding speed comes from a velocity field (|U| on the patch, γ = U / h)
+or the wall shear rate from a field of its own, scaled by a constant (for
+example 1/ν for OpenFOAM's kinematic wallShearStress). The local gap comes
+from a scalar field in metres or from a constant.
+
+Field files are never loaded whole. A small tokenizer walks the dictionary
+structure and skips the (possibly huge) internalField by line count or byte
+count. The patch values are then streamed in fixed-size chunks, so memory
+stays bounded for patches with tens of millions of faces.
+"""
+
+import gzip
+import itertools
+import os
+import re
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+DEFAULT_CHUNK = 1 << 20
+
+# Number of components of each OpenFOAM list element type
+COMPONENTS = {"scalar": 1, "vector": 3, "sphericalTensor": 1, "symmTensor": 6, "tensor": 9, "label": 1}
+
+# Patch types that need the same type in every field
+CONSTRAINT_TYPES = ("empty", "wedge", "symmetry", "symmetryPlane", "cyclic", "cyclicAMI", "processor")
+
+_PUNCT = b"{}();[]"
+
+
+class FoamFormatError(ValueError):
+    """Raised when a file does not look like the expected OpenFOAM data"""
+
+
+def _open(path):
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path = path + ".gz"
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+class FoamStream:
+    """Tokenizer over an OpenFOAM file that can also hand out raw lines and bytes"""
+
+    def __init__(self, f):
+        self.f = f
+        self.header = {}
+        self._pushed = []
+
+    def _peek(self):
+        data = self.f.peek(1)[:1] if hasattr(self.f, "peek") else b""
+        return data
+
+    def _getc(self):
+        return self.f.read(1)
+
+    def token(self):
+        """Return the next token as bytes (b"" at end of file)"""
+        if self._pushed:
+            return self._pushed.pop()
+        while True:
+            c = self._getc()
+            if not c:
+                return b""
+            if c.isspace():
+                continue
+            if c == b"/":
+                nxt = self._peek()
+                if nxt == b"/":
+                    self.f.readline()
+                    continue
+                if nxt == b"*":
+                    self._getc()
+                    prev = b""
+                    while True:
+                        c = self._getc()
+                        if not c or (prev == b"*" and c == b"/"):
+                            break
+                        prev = c
+                    continue
+            if c in _PUNCT:
+                return c
+            if c == b'"':
+                out = [c]
+                while True:
+                    c = self._getc()
+                    out.append(c)
+                    if not c or c == b'"':
+                        return b"".join(out)
+            out = [c]
+            while True:
+                nxt = self._peek()
+                if not nxt or nxt.isspace() or nxt in _PUNCT:
+                    return b"".join(out)
+                out.append(self._getc())
+
+    def push(self, tok):
+        self._pushed.append(tok)
+
+    def expect(self, wanted):
+        tok = self.token()
+        if tok != wanted:
+            raise FoamFormatError(f"expected {wanted!r}, found {tok!r}")
+
+    def read_header(self):
+        """Parse the FoamFile dictionary"""
+        if self.token() != b"FoamFile":
+            raise FoamFormatError("missing FoamFile header")
+        self.header = {k: v for k, v in self.read_dict().items() if isinstance(v, str)}
+        return self.header
+
+    def read_dict(self):
+        """Parse a small dictionary (after its '{') into {key: str or dict}"""
+        self.expect(b"{")
+        out = {}
+        while True:
+            key = self.token()
+            if key == b"}" or not key:
+                return out
+            tok = self.token()
+            if tok == b"{":
+                self.push(tok)
+                out[key.decode()] = self.read_dict()
+                continue
+            words = []
+            while tok != b";":
+                if not tok:
+                    raise FoamFormatError("unexpected end of file")
+                words.append(tok.decode())
+                tok = self.token()
+            out[key.decode()] = " ".join(words).strip('"')
+
+    @property
+    def binary(self):
+        return self.header.get("format", "ascii") == "binary"
+
+    @property
+    def scalar_dtype(self):
+        arch = self.header.get("arch", "")
+        match = re.search(r"scalar=(\d+)", arch)
+        bits = int(match.group(1)) if match else 64
+        order = ">" if "MSB" in arch else "<"
+        return np.dtype(f"{order}f{bits // 8}")
+
+    @property
+    def label_dtype(self):
+        arch = self.header.get("arch", "")
+        match = re.search(r"label=(\d+)", arch)
+        bits = int(match.group(1)) if match else 32
+        order = ">" if "MSB" in arch else "<"
+        return np.dtype(f"{order}i{bits // 8}")
+
+    def iter_list(self, count, ncomp, chunk=DEFAULT_CHUNK, kind="scalar"):
+        """Stream the body of a list of count elements whose '(' has just been read.
+
+        Yields float64 arrays of shape (n,) for scalars or (n, ncomp) otherwise.
+        The closing ')' is consumed.
+        """
+        if self.binary:
+            dtype = self.label_dtype if kind == "label" else self.scalar_dtype
+            per = ncomp * dtype.itemsize
+            done = 0
+            while done < count:
+                n = min(chunk, count - done)
+                raw = self.f.read(n * per)
+                if len(raw) != n * per:
+                    raise FoamFormatError("binary list is truncated")
+                values = np.frombuffer(raw, dtype=dtype).astype(np.float64)
+                yield values if ncomp == 1 else values.reshape(n, ncomp)
+                done += n
+            self.expect(b")")
+            return
+
+        rest = self.f.readline()
+        if rest.strip():
+            values = _parse_numbers(self._inline_body(rest))
+            if values.size != count * ncomp:
+                raise FoamFormatError(f"list holds {values.size} numbers, expected {count * ncomp}")
+            values = values if ncomp == 1 else values.reshape(count, ncomp)
+            for start in range(0, count, chunk):
+                yield values[start:start + chunk]
+            return
+
+        done = 0
+        while done < count:
+            n = min(chunk, count - done)
+            lines = [self.f.readline() for _ in range(n)]
+            values = _parse_numbers(b"".join(lines))
+            if values.size != n * ncomp:
+                raise FoamFormatError("ASCII list is truncated or malformed")
+            yield values if ncomp == 1 else values.reshape(n, ncomp)
+            done += n
+        self.expect(b")")
+
+    def _inline_body(self, text):
+        """Text of a short list written inline, N(a b c) or N((x y z) ...), up to its ')'"""
+        depth = 1 + text.count(b"(") - text.count(b")")
+        while depth > 0:
+            line = self.f.readline()
+            if not line:
+                raise FoamFormatError("unterminated list")
+            text += line
+            depth += line.count(b"(") - line.count(b")")
+        end = len(text)
+        depth = 1
+        for i, ch in enumerate(text):
+            depth += (ch == 0x28) - (ch == 0x29)
+            if depth == 0:
+                end = i
+                break
+        # Put back whatever followed the list (normally ';')
+        for tok in reversed(text[end + 1:].split()):
+            self.push(tok)
+        return text[:end]
+
+    def skip_list(self, count, ncomp, kind="scalar"):
+        """Skip the body of a list without parsing its values"""
+        if self.binary:
+            dtype = self.label_dtype if kind == "label" else self.scalar_dtype
+            size = count * ncomp * dtype.itemsize
+            while size > 0:
+                step = len(self.f.read(min(size, 1 << 24)))
+                if not step:
+                    raise FoamFormatError("binary list is truncated")
+                size -= step
+        else:
+            rest = self.f.readline()
+            if rest.strip():
+                self._inline_body(rest)
+                return
+            for _ in range(count):
+                self.f.readline()
+        self.expect(b")")
+
+
+def _parse_numbers(text):
+    return np.array(text.translate(None, b"()").split(), dtype=np.float64)
+
+
+def _list_start(stream, tok):
+    """Read the count and '(' following a List<T> token; return (count, ncomp, kind)"""
+    kind = tok[5:-1].decode()
+    count_tok = stream.token()
+    # Binary and inline lists put '(' straight after the count
+    if count_tok.endswith(b"("):
+        count_tok = count_tok[:-1]
+    else:
+        stream.expect(b"(")
+    return int(count_tok), COMPONENTS.get(kind, 1), kind
+
+
+def _skip_value(stream):
+    """Skip an entry value up to and including its ';'; return its plain words"""
+    words = []
+    while True:
+        tok = stream.token()
+        if not tok:
+            raise FoamFormatError("unexpected end of file")
+        if tok == b";":
+            return words
+        if tok.startswith(b"List<"):
+            stream.skip_list(*_list_start(stream, tok))
+            continue
+        words.append(tok.decode())
+
+
+def _skip_dict(stream):
+    """Skip a dictionary, including its '{', and any lists inside it"""
+    depth = 0
+    while True:
+        tok = stream.token()
+        if not tok:
+            raise FoamFormatError("unexpected end of file")
+        if tok == b"{":
+            depth += 1
+        elif tok == b"}":
+            depth -= 1
+            if depth == 0:
+                return
+        elif tok.startswith(b"List<"):
+            stream.skip_list(*_list_start(stream, tok))
+
+
+def _skip_entry(stream):
+    tok = stream.token()
+    stream.push(tok)
+    if tok == b"{":
+        _skip_dict(stream)
+    else:
+        _skip_value(stream)
+
+
+def read_boundary(case, region=None):
+    """Return the patches of constant/polyMesh/boundary as {name: dict} in file order"""
+    parts = [case, "constant"] + ([region] if region else []) + ["polyMesh", "boundary"]
+    with _open(os.path.join(*parts)) as f:
+        stream = FoamStream(f)
+        stream.read_header()
+        tok = stream.token()
+        if tok != b"(":
+            stream.expect(b"(")
+        patches = {}
+        while True:
+            name = stream.token()
+            if name == b")" or not name:
+                return patches
+            patches[name.decode()] = stream.read_dict()
+
+
+def iter_patch_values(path, patch, n_faces, chunk=DEFAULT_CHUNK):
+    """Yield the values of one patch of a field file in chunks of at most chunk faces.
+
+    Vector and tensor values come out as (n, ncomp) arrays, scalars as (n,).
+    uniform values are broadcast to n_faces without materializing the patch.
+    """
+    f = _open(path)
+    try:
+        stream = FoamStream(f)
+        stream.read_header()
+        while True:
+            key = stream.token()
+            if not key:
+                raise FoamFormatError(f"{path}: no boundaryField")
+            if key == b"boundaryField":
+                break
+            _skip_entry(stream)
+
+        stream.expect(b"{")
+        while True:
+            name = stream.token()
+            if name == b"}" or not name:
+                raise FoamFormatError(f"{path}: patch '{patch}' not found")
+            if name.decode().strip('"') != patch:
+                _skip_dict(stream)
+                continue
+            stream.expect(b"{")
+            while True:
+                key = stream.token()
+                if key == b"}" or not key:
+                    raise FoamFormatError(f"{path}: patch '{patch}' has no value entry")
+                if key != b"value":
+                    _skip_entry(stream)
+                    continue
+                kind = stream.token()
+                if kind == b"uniform":
+                    value = _parse_numbers(" ".join(_skip_value(stream)).encode())
+                    shape = (value.size,) if value.size > 1 else ()
+                    for start in range(0, n_faces, chunk):
+                        n = min(chunk, n_faces - start)
+                        yield np.broadcast_to(value.reshape(shape), (n,) + shape)
+                    return
+                if kind != b"nonuniform":
+                    raise FoamFormatError(f"{path}: unsupported value '{kind.decode()}'")
+                tok = stream.token()
+                if not tok.startswith(b"List<"):
+                    raise FoamFormatError(f"{path}: expected a List after nonuniform")
+                count, ncomp, kind = _list_start(stream, tok)
+                if count != n_faces:
+                    raise FoamFormatError(f"{path}: patch '{patch}' has {count} values, mesh has {n_faces} faces")
+                yield from stream.iter_list(count, ncomp, chunk, kind)
+                return
+    finally:
+        f.close()
+
+
+def magnitude(values):
+    """|v| for (n, ncomp) arrays; scalars are returned as is"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return values
+    return np.sqrt(np.einsum("ij,ij->i", values, values))
+
+
+def latest_time(case):
+    """Name of the latest time directory of a case"""
+    times = []
+    for entry in os.listdir(case):
+        try:
+            times.append((float(entry), entry))
+        except ValueError:
+            continue
+    if not times:
+        raise FileNotFoundError(f"{case}: no time directories")
+    return max(times)[1]
+
+
+def _foam_header(object_name, location, binary, dimensions):
+    arch = '    arch        "LSB;label=32;scalar=64";\n' if binary else ""
+    return ("FoamFile\n{\n"
+            "    version     2.0;\n"
+            f"    format      {'binary' if binary else 'ascii'};\n"
+            f"{arch}"
+            "    class       volScalarField;\n"
+            f"    location    \"{location}\";\n"
+            f"    object      {object_name};\n"
+            "}\n\n"
+            f"dimensions      {dimensions};\n\n"
+            "internalField   uniform 0;\n\n"
+            "boundaryField\n{\n")
+
+
+class PatchFieldWriter:
+    """Writes a volScalarField whose chosen patches carry streamed per-face values"""
+
+    def __init__(self, path, object_name, location, binary=False, dimensions="[0 1 0 0 0 0 0]"):
+        self.binary = binary
+        self.f = open(path, "wb")
+        self.f.write(_foam_header(object_name, location, binary, dimensions).encode())
+
+    def write_other(self, name, patch_type):
+        if patch_type in CONSTRAINT_TYPES:
+            self.f.write(f"    {name}\n    {{\n        type            {patch_type};\n    }}\n".encode())
+        else:
+            self.f.write(f"    {name}\n    {{\n        type            calculated;\n"
+                         f"        value           uniform 0;\n    }}\n".encode())
+
+    def write_patch(self, name, count, chunks):
+        """Write one patch from an iterable of float64 chunks totalling count values"""
+        self.f.write(f"    {name}\n    {{\n        type            calculated;\n"
+                     f"        value           nonuniform List<scalar>".encode())
+        written = 0
+        if self.binary:
+            self.f.write(f" {count}(".encode())
+            for values in chunks:
+                self.f.write(np.ascontiguousarray(values, dtype="<f8").tobytes())
+                written += len(values)
+            self.f.write(b")")
+        else:
+            self.f.write(f"\n{count}\n(\n".encode())
+            for values in chunks:
+                self.f.write("\n".join(map(repr, np.asarray(values, dtype=np.float64).tolist())).encode())
+                self.f.write(b"\n")
+                written += len(values)
+            self.f.write(b")")
+        self.f.write(b";\n    }\n")
+        if written != count:
+            raise FoamFormatError(f"patch {name}: wrote {written} values, expected {count}")
+
+    def close(self):
+        self.f.write(b"}\n")
+        self.f.close()
+
+    def abort(self):
+        """Close the file unfinished, after an error"""
+        self.f.close()
+
+
+def slip_length_chunks(directory, patch, n_faces, mu, lambda_friction, gamma_crit, exponent,
+                       speed_field=None, shear_rate_field=None, shear_rate_scale=1.0,
+                       gap_field=None, gap_nm=None, chunk=DEFAULT_CHUNK, quantity="b_eff"):
+    """Yield per-face values of quantity ("b_eff", "ratio" or "slip") for one patch, chunk by chunk.
+
+    directory is the time directory holding the input fields.
+    """
+    if gap_field is not None:
+        gaps = (magnitude(v) * 1e9 for v in iter_patch_values(os.path.join(directory, gap_field), patch, n_faces, chunk))
+    elif gap_nm is not None:
+        gaps = (np.broadcast_to(float(gap_nm), (min(chunk, n_faces - s),)) for s in range(0, n_faces, chunk))
+    else:
+        gaps = None
+
+    b0 = slip_model.baseline_slip_length(mu, lambda_friction)
+    with np.errstate(all="ignore"):
+        if speed_field is not None:
+            if gaps is None:
+                raise ValueError("a gap field or constant gap is needed with a speed field")
+            speeds = (magnitude(v) for v in iter_patch_values(os.path.join(directory, speed_field), patch, n_faces, chunk))
+            for h, U in zip(gaps, speeds):
+                yield slip_batch.evaluate_batch(h, U, mu, lambda_friction, gamma_crit, exponent)[quantity]
+        else:
+            rates = (magnitude(v) * shear_rate_scale
+                     for v in iter_patch_values(os.path.join(directory, shear_rate_field), patch, n_faces, chunk))
+            for h, rate in zip(gaps if gaps is not None else itertools.repeat(None), rates):
+                b_eff = slip_model.effective_slip_length(b0, rate, gamma_crit, exponent)
+                if quantity == "b_eff":
+                    yield b_eff
+                    continue
+                if h is None:
+                    raise ValueError("a gap field or constant gap is needed for the slip ratio")
+                ratio = slip_model.slip_ratio(b_eff, h * 1e-9)
+                yield ratio if quantity == "ratio" else slip_batch.decide(ratio).astype(np.float64)
+
+
+def write_slip_fields(case, patches, mu, lambda_friction, gamma_crit, exponent, time=None, region=None,
+                      speed_field=None, shear_rate_field=None, shear_rate_scale=1.0,
+                      gap_field=None, gap_nm=None, output_field="slipLength", ratio_field=None,
+                      binary=None, chunk=DEFAULT_CHUNK, progress=None):
+    """Compute bₑff on the given wall patches and write it (and optionally bₑff/h) as volScalarFields.
+
+    Returns the paths written. binary=None follows the format of the input field. The fields are
+    written to temporary files that replace existing ones only once all of them are complete.
+    """
+    if (speed_field is None) == (shear_rate_field is None):
+        raise ValueError("give exactly one of speed_field and shear_rate_field")
+    time = time or latest_time(case)
+    boundary = read_boundary(case, region)
+    missing = [p for p in patches if p not in boundary]
+    if missing:
+        raise ValueError(f"patch(es) not in mesh: {', '.join(missing)}")
+    directory = os.path.join(case, time, region) if region else os.path.join(case, time)
+    source = os.path.join(directory, speed_field or shear_rate_field)
+    if binary is None:
+        with _open(source) as f:
+            stream = FoamStream(f)
+            stream.read_header()
+            binary = stream.binary
+
+    outputs = [(output_field, "b_eff", "[0 1 0 0 0 0 0]")]
+    if ratio_field:
+        outputs.append((ratio_field, "ratio", "[0 0 0 0 0 0 0]"))
+    # OpenFOAM writes the location of region fields as "<time>/<region>"
+    location = f"{time}/{region}" if region else time
+    files = []          # (temporary, path) of each output
+    try:
+        for name, quantity, dimensions in outputs:
+            path = os.path.join(directory, name)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            writer = PatchFieldWriter(temporary, name, location, binary=binary, dimensions=dimensions)
+            files.append((temporary, path))
+            try:
+                for patch, info in boundary.items():
+                    if patch not in patches:
+                        writer.write_other(patch, info.get("type", "patch"))
+                        continue
+                    n_faces = int(info["nFaces"])
+                    chunks = slip_length_chunks(directory, patch, n_faces, mu, lambda_friction, gamma_crit,
+                                                exponent, speed_field, shear_rate_field, shear_rate_scale,
+                                                gap_field, gap_nm, chunk, quantity)
+                    if progress is not None:
+                        chunks = _report(chunks, progress)
+                    writer.write_patch(patch, n_faces, chunks)
+            except BaseException:
+                writer.abort()
+                raise
+            writer.close()
+    except BaseException:
+        # Leave the existing fields as they were rather than truncated
+        for temporary, _ in files:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        raise
+    for temporary, path in files:
+        os.replace(temporary, path)
+    return [path for _, path in files]
+
+
+def _report(chunks, progress):
+    for values in chunks:
+        progress(len(values))
+        yield values
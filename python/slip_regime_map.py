@@ -0,0 +1,389 @@
+"""Interactive slip/no-slip regime map for the GUI.
+
+The map shows the decision over two chosen inputs (gap × speed by default)
+with the other four held at the values of the Entry fields. It is drawn from
+square raster tiles in axis space (decades for log axes). Each zoom level
+doubles the resolution of the one below. A tile is one vectorized
+slip_batch.evaluate_batch() call over its pixel grid, converted to a Tk
+PhotoImage through an in-memory PPM. Tiles are cached per axis pair, fixed
+inputs and zoom level, so panning back, zooming back or returning to earlier
+inputs reuses them.
+
+Only the work that an interaction needs is done. Panning moves the tile
+images and renders newly exposed tiles. Editing an axis input only moves
+the marker. Editing a fixed input re-renders the visible tiles, while the old
+images stay on screen until their replacements are ready. Zooming keeps the
+tiles of the previous level on screen, scaled by PhotoImage.zoom() or
+subsample(), beneath the new level until its tiles are all drawn. Missing
+tiles are rendered in short slices between events, within a per-frame time
+budget.
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+# Default extent of each input on the map: (lo, hi, log axis)
+AXIS_RANGES = {
+    "gap_nm": (1e-1, 1e4, True),
+    "sliding_speed": (1e-4, 1e3, True),
+    "mu": (1e-5, 1.0, True),
+    "lambda_friction": (1e4, 1e10, True),
+    "gamma_crit": (1e4, 1e10, True),
+    "exponent": (0.0, 5.0, False),
+}
+
+TILE = 128                  # Tile size (pixels)
+PIXELS_PER_UNIT = 64        # Level-0 pixels per decade (per unit on linear axes)
+MIN_LEVEL, MAX_LEVEL = -2, 8
+MAX_TILES = 512             # Cached tile images (64 KiB of pixels each)
+FRAME_BUDGET = 0.012        # Seconds of tile rendering per event-loop slice
+BACKDROP_LEVELS = 2         # Zoom levels a tile is kept, scaled, while the new level renders
+
+# Tile colours: light to saturated with distance from the threshold, in decades of bₑff/h
+NO_SLIP_RGB = (np.array([232, 245, 233]), np.array([76, 175, 80]))
+SLIP_RGB = (np.array([255, 235, 238]), np.array([244, 67, 54]))
+CONTOUR_RGB = np.array([33, 33, 33])
+INVALID_RGB = np.array([189, 189, 189])
+SATURATION_DECADES = 4.0
+
+
+def _to_axis(value, log):
+    return math.log10(value) if log else value
+
+
+def _from_axis(u, log):
+    return 10.0**u if log else u
+
+
+def tile_rgb(x_name, y_name, values, level, i, j):
+    """RGB pixels (TILE, TILE, 3) of one tile; row 0 is the top edge"""
+    scale = PIXELS_PER_UNIT * 2.0**level
+    x_log, y_log = AXIS_RANGES[x_name][2], AXIS_RANGES[y_name][2]
+    # Pixel centres plus a one-pixel border for the contour test
+    px = (np.arange(-1, TILE + 1) + i * TILE + 0.5) / scale
+    py = -(np.arange(-1, TILE + 1) + j * TILE + 0.5) / scale
+    xs = 10.0**px if x_log else px
+    ys = 10.0**py if y_log else py
+
+    inputs = [values[name] for name in slip_model.INPUT_NAMES]
+    inputs[slip_model.INPUT_NAMES.index(x_name)] = xs[None, :]
+    inputs[slip_model.INPUT_NAMES.index(y_name)] = ys[:, None]
+    with np.errstate(all="ignore"):
+        ratio = slip_batch.evaluate_batch(*inputs)["ratio"]
+        distance = np.log10(ratio) - math.log10(slip_model.SLIP_THRESHOLD)
+
+    slip = ~(distance < 0)
+    inner = distance[1:-1, 1:-1]
+    t = np.clip(np.abs(inner) / SATURATION_DECADES, 0.0, 1.0)[..., None]
+    light = np.where(slip[1:-1, 1:-1, None], SLIP_RGB[0], NO_SLIP_RGB[0])
+    dark = np.where(slip[1:-1, 1:-1, None], SLIP_RGB[1], NO_SLIP_RGB[1])
+    rgb = light + (dark - light) * t
+
+    # bₑff/h = 0.01: pixels whose decision differs from a neighbour's
+    centre = slip[1:-1, 1:-1]
+    edge = ((centre != slip[1:-1, 2:]) | (centre != slip[1:-1, :-2])
+            | (centre != slip[2:, 1:-1]) | (centre != slip[:-2, 1:-1])) & centre
+    rgb[edge] = CONTOUR_RGB
+    rgb[~np.isfinite(inner)] = INVALID_RGB
+    return rgb.astype(np.uint8)
+
+
+def rgb_to_photo(rgb, master=None):
+    """Tk PhotoImage of an (h, w, 3) uint8 array, via an in-memory binary PPM"""
+    h, w, _ = rgb.shape
+    return tk.PhotoImage(master=master, data=b"P6 %d %d 255 " % (w, h) + rgb.tobytes(), format="PPM")
+
+
+class RegimeMap:
+    """Regime map panel: axis selectors, a tiled canvas and a readout line"""
+
+    def __init__(self, parent, background="#ffffff", marker="#1976d2"):
+        self.frame = ttk.Frame(parent)
+        self.marker_color = marker
+        self.values = dict(slip_model.DEFAULTS)
+        self.x_name, self.y_name = "gap_nm", "sliding_speed"
+        self.level = 0
+        self.origin = [0.0, 0.0]        # Level pixel coordinates of the canvas's top-left corner
+        self.cache = OrderedDict()      # tile key -> PhotoImage
+        self.items = {}                 # (i, j) -> (canvas item, tile key, image shown)
+        self.backdrop = {}              # canvas item -> (level, i, j, tile image, scaled image) of earlier levels
+        self.pending = []
+        self._render_after = None
+        self._drag = None
+
+        controls = ttk.Frame(self.frame)
+        controls.pack(fill=tk.X, pady=(0, 5))
+        labels = [slip_model.INPUT_LABELS[name] for name in slip_model.INPUT_NAMES]
+        self.x_var = tk.StringVar(value=slip_model.INPUT_LABELS[self.x_name])
+        self.y_var = tk.StringVar(value=slip_model.INPUT_LABELS[self.y_name])
+        ttk.Label(controls, text="X:").pack(side=tk.LEFT)
+        x_box = ttk.Combobox(controls, textvariable=self.x_var, values=labels, state="readonly", width=24)
+        x_box.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(controls, text="Y:").pack(side=tk.LEFT)
+        y_box = ttk.Combobox(controls, textvariable=self.y_var, values=labels, state="readonly", width=24)
+        y_box.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Button(controls, text="Reset View", command=self.reset_view).pack(side=tk.RIGHT)
+        x_box.bind("<<ComboboxSelected>>", self._axes_changed)
+        y_box.bind("<<ComboboxSelected>>", self._axes_changed)
+
+        self.canvas = tk.Canvas(self.frame, bg=background, highlightthickness=0, width=400, height=400)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.readout = tk.StringVar(value="Drag to pan, scroll to zoom")
+        ttk.Label(self.frame, textvariable=self.readout, font=("Segoe UI", 9)).pack(fill=tk.X, pady=(5, 0))
+
+        self.canvas.bind("<Configure>", lambda event: self.reset_view() if not self.items else self.redraw())
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._drag_to)
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom(1 if e.delta > 0 else -1, e.x, e.y))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom(1, e.x, e.y))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom(-1, e.x, e.y))
+        self.canvas.bind("<Motion>", self._hover)
+
+    # Coordinates ---------------------------------------------------------
+
+    @property
+    def scale(self):
+        return PIXELS_PER_UNIT * 2.0**self.level
+
+    def to_canvas(self, x, y):
+        """Canvas pixel position of input values (x, y)"""
+        u = _to_axis(x, AXIS_RANGES[self.x_name][2])
+        v = _to_axis(y, AXIS_RANGES[self.y_name][2])
+        return u * self.scale - self.origin[0], -v * self.scale - self.origin[1]
+
+    def from_canvas(self, cx, cy):
+        """Input values (x, y) at a canvas pixel"""
+        u = (cx + self.origin[0]) / self.scale
+        v = -(cy + self.origin[1]) / self.scale
+        return _from_axis(u, AXIS_RANGES[self.x_name][2]), _from_axis(v, AXIS_RANGES[self.y_name][2])
+
+    def _fixed(self):
+        return tuple(self.values[name] for name in slip_model.INPUT_NAMES if name not in (self.x_name, self.y_name))
+
+    def _key(self, i, j):
+        return (self.x_name, self.y_name, self._fixed(), self.level, i, j)
+
+    # Public interface ----------------------------------------------------
+
+    def set_inputs(self, values):
+        """Update the operating point; re-renders tiles only if a non-axis input changed"""
+        fixed = self._fixed()
+        self.values.update(values)
+        if self._fixed() != fixed:
+            self.redraw()
+        else:
+            self._draw_overlay()
+
+    def reset_view(self):
+        """Fit the default ranges of the two axes into the canvas"""
+        width, height = max(self.canvas.winfo_width(), 2), max(self.canvas.winfo_height(), 2)
+        (x0, x1, x_log), (y0, y1, y_log) = AXIS_RANGES[self.x_name], AXIS_RANGES[self.y_name]
+        ux0, ux1 = _to_axis(x0, x_log), _to_axis(x1, x_log)
+        uy0, uy1 = _to_axis(y0, y_log), _to_axis(y1, y_log)
+        fit = min(width / ((ux1 - ux0) * PIXELS_PER_UNIT), height / ((uy1 - uy0) * PIXELS_PER_UNIT))
+        self.level = max(MIN_LEVEL, min(MAX_LEVEL, math.floor(math.log2(fit))))
+        self.origin = [(ux0 + ux1) / 2 * self.scale - width / 2, -(uy0 + uy1) / 2 * self.scale - height / 2]
+        self._clear()
+        self.redraw()
+
+    def redraw(self):
+        """Place cached tiles for the current view and queue the missing ones"""
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        i0, i1 = math.floor(self.origin[0] / TILE), math.floor((self.origin[0] + width) / TILE)
+        j0, j1 = math.floor(self.origin[1] / TILE), math.floor((self.origin[1] + height) / TILE)
+        visible = {(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)}
+
+        for ij in list(self.items):
+            if ij not in visible:
+                self.canvas.delete(self.items.pop(ij)[0])
+        for item_id, (level, i, j, _, _) in list(self.backdrop.items()):
+            size = TILE * 2.0**(self.level - level)
+            x, y = i * size - self.origin[0], j * size - self.origin[1]
+            if x + size < 0 or y + size < 0 or x > width or y > height:
+                self.canvas.delete(item_id)
+                del self.backdrop[item_id]
+            else:
+                self.canvas.coords(item_id, x, y)
+        self.pending = []
+        for i, j in sorted(visible, key=lambda ij: abs(ij[0] - (i0 + i1) / 2) + abs(ij[1] - (j0 + j1) / 2)):
+            key = self._key(i, j)
+            x, y = i * TILE - self.origin[0], j * TILE - self.origin[1]
+            item = self.items.get((i, j))
+            if item is not None:
+                self.canvas.coords(item[0], x, y)
+            if item is not None and item[1] == key:
+                continue
+            image = self.cache.get(key)
+            if image is None:
+                # Keep any stale image on screen until its replacement is rendered
+                self.pending.append((i, j))
+                continue
+            self.cache.move_to_end(key)
+            self._place(i, j, key, image)
+        self._draw_overlay()
+        if not self.pending:
+            self._drop_backdrop()
+        elif self._render_after is None:
+            self._render_after = self.canvas.after_idle(self._render_pending)
+
+    # Rendering -----------------------------------------------------------
+
+    def _place(self, i, j, key, image):
+        x, y = i * TILE - self.origin[0], j * TILE - self.origin[1]
+        item = self.items.get((i, j))
+        if item is None:
+            item_id = self.canvas.create_image(x, y, image=image, anchor=tk.NW, tags="tile")
+        else:
+            item_id = item[0]
+            self.canvas.itemconfig(item_id, image=image)
+        # Holding the image keeps it alive after it drops out of the cache
+        self.items[(i, j)] = (item_id, key, image)
+
+    def _render_pending(self):
+        self._render_after = None
+        start = time.perf_counter()
+        while self.pending and time.perf_counter() - start < FRAME_BUDGET:
+            i, j = self.pending.pop(0)
+            key = self._key(i, j)
+            image = self.cache.get(key)
+            if image is None:
+                image = rgb_to_photo(tile_rgb(self.x_name, self.y_name, self.values, self.level, i, j),
+                                     master=self.canvas)
+                self.cache[key] = image
+                while len(self.cache) > MAX_TILES:
+                    self.cache.popitem(last=False)
+            self._place(i, j, key, image)
+        self._draw_overlay()
+        if self.pending:
+            self._render_after = self.canvas.after(1, self._render_pending)
+        else:
+            self._drop_backdrop()
+
+    def _hold_backdrop(self, level):
+        """Keep the tiles placed at level, and earlier backdrop tiles, on screen scaled to the current level"""
+        for (i, j), (item_id, _, image) in self.items.items():
+            self.backdrop[item_id] = (level, i, j, image, image)
+        self.items.clear()
+        for item_id, (tile_level, i, j, image, _) in list(self.backdrop.items()):
+            steps = self.level - tile_level
+            if abs(steps) > BACKDROP_LEVELS:
+                self.canvas.delete(item_id)
+                del self.backdrop[item_id]
+                continue
+            scaled = image.zoom(2**steps) if steps > 0 else image.subsample(2**-steps) if steps < 0 else image
+            self.canvas.itemconfig(item_id, image=scaled, tags="backdrop")
+            self.backdrop[item_id] = (tile_level, i, j, image, scaled)
+        if self.backdrop:
+            self.canvas.tag_lower("backdrop")
+
+    def _drop_backdrop(self):
+        self.canvas.delete("backdrop")
+        self.backdrop.clear()
+
+    def _clear(self):
+        self.canvas.delete("tile")
+        self.items.clear()
+        self._drop_backdrop()
+
+    def _draw_overlay(self):
+        """Axis ticks and the marker of the current operating point, above the tiles"""
+        c = self.canvas
+        c.delete("overlay")
+        width, height = c.winfo_width(), c.winfo_height()
+        x_lo, y_hi = self.from_canvas(0, 0)
+        x_hi, y_lo = self.from_canvas(width, height)
+        for value in _ticks(x_lo, x_hi, AXIS_RANGES[self.x_name][2], width):
+            cx = self.to_canvas(value, y_lo)[0]
+            c.create_line(cx, height - 6, cx, height, tags="overlay")
+            c.create_text(cx, height - 8, text=f"{value:g}", anchor=tk.S, font=("Segoe UI", 8), tags="overlay")
+        for value in _ticks(y_lo, y_hi, AXIS_RANGES[self.y_name][2], height):
+            cy = self.to_canvas(x_lo, value)[1]
+            c.create_line(0, cy, 6, cy, tags="overlay")
+            c.create_text(8, cy, text=f"{value:g}", anchor=tk.W, font=("Segoe UI", 8), tags="overlay")
+        c.create_text(width - 4, height - 22, text=slip_model.INPUT_LABELS[self.x_name], anchor=tk.E,
+                      font=("Segoe UI", 9, "bold"), tags="overlay")
+        c.create_text(8, 4, text=slip_model.INPUT_LABELS[self.y_name], anchor=tk.NW,
+                      font=("Segoe UI", 9, "bold"), tags="overlay")
+
+        try:
+            mx, my = self.to_canvas(self.values[self.x_name], self.values[self.y_name])
+        except ValueError:
+            return
+        c.create_oval(mx - 6, my - 6, mx + 6, my + 6, outline=self.marker_color, width=2, tags="overlay")
+        c.create_line(mx - 10, my, mx + 10, my, fill=self.marker_color, tags="overlay")
+        c.create_line(mx, my - 10, mx, my + 10, fill=self.marker_color, tags="overlay")
+
+    # Events --------------------------------------------------------------
+
+    def _axes_changed(self, event=None):
+        by_label = {label: name for name, label in slip_model.INPUT_LABELS.items()}
+        x_name, y_name = by_label[self.x_var.get()], by_label[self.y_var.get()]
+        if x_name == y_name:
+            # Swap rather than show a degenerate map
+            x_name, y_name = (x_name, self.x_name) if y_name == self.y_name else (self.y_name, y_name)
+            self.x_var.set(slip_model.INPUT_LABELS[x_name])
+            self.y_var.set(slip_model.INPUT_LABELS[y_name])
+        self.x_name, self.y_name = x_name, y_name
+        self.reset_view()
+
+    def _start_drag(self, event):
+        self._drag = (event.x, event.y)
+
+    def _drag_to(self, event):
+        if self._drag is None:
+            return
+        dx, dy = event.x - self._drag[0], event.y - self._drag[1]
+        self._drag = (event.x, event.y)
+        self.origin[0] -= dx
+        self.origin[1] -= dy
+        self.redraw()
+
+    def _zoom(self, step, cx, cy):
+        level = max(MIN_LEVEL, min(MAX_LEVEL, self.level + step))
+        if level == self.level:
+            return
+        # Keep the axis point under the cursor in place
+        factor = 2.0**(level - self.level)
+        self.origin = [(self.origin[0] + cx) * factor - cx, (self.origin[1] + cy) * factor - cy]
+        previous, self.level = self.level, level
+        self._hold_backdrop(previous)
+        self.redraw()
+
+    def _hover(self, event):
+        x, y = self.from_canvas(event.x, event.y)
+        inputs = dict(self.values, **{self.x_name: x, self.y_name: y})
+        try:
+            result = slip_model.evaluate(**inputs)
+        except (ZeroDivisionError, OverflowError, ValueError):
+            return
+        self.readout.set(f"{slip_model.INPUT_LABELS[self.x_name]} = {x:.3g}, "
+                         f"{slip_model.INPUT_LABELS[self.y_name]} = {y:.3g}: "
+                         f"bₑff/h = {result.ratio:.3e} ({'slip' if result.slip else 'no-slip'})")
+
+
+def _ticks(lo, hi, log, pixels):
+    """Tick values between lo and hi: decades on log axes, round steps on linear ones"""
+    if log:
+        if not (lo > 0 and hi > 0):
+            return []
+        a, b = math.ceil(math.log10(lo)), math.floor(math.log10(hi))
+        step = max(1, math.ceil((b - a + 1) * 60 / max(pixels, 1)))
+        return [10.0**k for k in range(a, b + 1, step)]
+    span = hi - lo
+    if span <= 0:
+        return []
+    step = 10.0**math.floor(math.log10(span * 60 / max(pixels, 1)))
+    for factor in (1, 2, 5, 10):
+        if span / (step * factor) * 60 <= pixels:
+            step *= factor
+            break
+    return [k * step for k in range(math.ceil(lo / step), math.floor(hi / step) + 1)]
@@ -0,0 +1,184 @@
+"""Work-stealing task scheduler with a persistent completion manifest.
+
+Long batch and sweep jobs are split into numbered tasks (typically one or a
+few result chunks each). run_tasks() deals the pending tasks out to worker
+processes as contiguous runs. Each worker works through its own run from the
+front. A worker that runs dry steals the back half of the longest remaining
+run, so fast workers keep busy while slow ones finish what they hold. The
+runs live in a small shared-memory table guarded by one lock. Tasks
+themselves never travel through a queue; only completion notices do.
+
+Manifest records finished tasks in a local append-only file, one task id per
+line after a JSON header. After a pre-emption, the job is restarted with the
+same manifest and only the missing tasks are scheduled.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+# Seconds between liveness checks of the worker processes
+POLL_INTERVAL = 0.5
+
+
+class Manifest:
+    """Append-only record of completed tasks for one job.
+
+    fingerprint identifies the job (grid, output layout, task size). Opening
+    a manifest whose fingerprint differs raises ValueError with resume=True
+    and starts a fresh manifest otherwise.
+    """
+
+    def __init__(self, path, fingerprint, tasks, resume=False):
+        self.path = str(path)
+        self.fingerprint = fingerprint
+        self.tasks = int(tasks)
+        self.done = set()
+        if resume and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("fingerprint") != fingerprint or header.get("tasks") != self.tasks:
+                    raise ValueError(f"{self.path} belongs to a different job; rerun without resuming")
+                for line in f:
+                    line = line.strip()
+                    # A line cut short by a crash has no newline and may be garbled
+                    if line.isdigit():
+                        self.done.add(int(line))
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(json.dumps({"fingerprint": fingerprint, "tasks": self.tasks}) + "\n")
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def pending(self):
+        """Task ids that have not been completed"""
+        return [task for task in range(self.tasks) if task not in self.done]
+
+    def mark(self, task):
+        """Record a finished task durably"""
+        self._file.write(f"{task}\n")
+        self._sync()
+        self.done.add(task)
+
+    def complete(self):
+        return len(self.done) == self.tasks
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _take(worker, tasks, runs, lock):
+    """Pop the next task of a worker, stealing half of the longest other run if its own is empty"""
+    with lock:
+        head, tail = runs[2 * worker], runs[2 * worker + 1]
+        stolen = False
+        if head >= tail:
+            victim, longest = -1, 0
+            for other in range(len(runs) // 2):
+                remaining = runs[2 * other + 1] - runs[2 * other]
+                if remaining > longest:
+                    victim, longest = other, remaining
+            if victim < 0:
+                return None, False
+            # Keep the victim's front half, take the back half
+            mid = runs[2 * victim] + longest // 2
+            head, tail = mid, runs[2 * victim + 1]
+            runs[2 * victim + 1] = mid
+            stolen = True
+        runs[2 * worker], runs[2 * worker + 1] = head + 1, tail
+        return tasks[head], stolen
+
+
+def _worker_loop(worker, tasks, runs, lock, results, run, initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        task, stolen = _take(worker, tasks, runs, lock)
+        if task is None:
+            break
+        t0 = time.perf_counter()
+        info = run(task)
+        results.put((worker, task, time.perf_counter() - t0, stolen, info))
+    results.put((worker, None, 0.0, False, None))
+
+
+def _deal(pending, workers):
+    """Initial runs: contiguous, near-equal slices of the pending list"""
+    runs = []
+    for w in range(workers):
+        runs += [len(pending) * w // workers, len(pending) * (w + 1) // workers]
+    return runs
+
+
+def run_tasks(pending, run, workers=None, initializer=None, initargs=(), on_result=None):
+    """Run run(task) for every task id in pending on a pool of work-stealing processes.
+
+    run and initializer must be picklable module-level functions. on_result,
+    called in this process, receives (worker, task, seconds, stolen, info) for
+    every finished task, where info is what run() returned. Returns per-worker
+    statistics: tasks, busy seconds and steals.
+    """
+    pending = [int(task) for task in pending]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    stats = {w: {"tasks": 0, "seconds": 0.0, "steals": 0} for w in range(workers)}
+
+    def record(worker, task, seconds, stolen, info):
+        stats[worker]["tasks"] += 1
+        stats[worker]["seconds"] += seconds
+        stats[worker]["steals"] += int(stolen)
+        if on_result is not None:
+            on_result(worker, task, seconds, stolen, info)
+
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for task in pending:
+            t0 = time.perf_counter()
+            info = run(task)
+            record(0, task, time.perf_counter() - t0, False, info)
+        return stats
+
+    ctx = multiprocessing.get_context()
+    tasks = ctx.Array("q", pending, lock=False)
+    runs = ctx.Array("q", _deal(pending, workers), lock=False)
+    lock = ctx.Lock()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker_loop, daemon=True,
+                         args=(w, tasks, runs, lock, results, run, initializer, initargs))
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        running = set(range(workers))
+        while running:
+            try:
+                worker, task, seconds, stolen, info = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                dead = [w for w in running if not procs[w].is_alive()]
+                if dead and results.empty():
+                    raise RuntimeError(f"worker process(es) {dead} exited with code "
+                                       f"{[procs[w].exitcode for w in dead]}")
+                continue
+            if task is None:
+                running.discard(worker)
+            else:
+                record(worker, task, seconds, stolen, info)
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+    return stats
@@ -0,0 +1,210 @@
+"""Global sensitivity analysis (Sobol indices) of the slip model.
+
+The varied inputs are sampled uniformly, or log-uniformly for ranges that
+span decades, over user-given ranges. Together the ranges describe an
+operating regime. First-order (S_i) and total (ST_i) Sobol indices of the
+chosen output are estimated with the Saltelli scheme: two base matrices A
+and B and, for every varied input i, the matrix AB_i that is A with column i
+taken from B. The estimators are Saltelli (2010) for S_i and Jansen for
+ST_i:
+
+    S_i  = E[f(B) (f(AB_i) - f(A))] / V
+    ST_i = E[(f(A) - f(AB_i))²] / (2 V)
+
+The base samples are generated and evaluated in chunks: A, B and every AB_i
+of one chunk go through a single slip_batch.evaluate_batch() call. Each chunk
+is reduced to a handful of sums straight away, so memory does not depend on
+the sample count. Chunks can be spread over worker processes. The spread of
+per-chunk estimates gives a standard error for every index.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+DEFAULT_CHUNK = 1 << 15
+
+# Quantities whose sensitivity can be analysed. bₑff/h spans decades over
+# typical ranges, so the indices of its logarithm are the better behaved default.
+OUTPUTS = ("log10_ratio", "ratio", "slip")
+
+
+def default_ranges(center=None, decades=1.0):
+    """Ranges spanning ±decades around an operating point (GUI defaults if not given).
+
+    Returns {name: (lo, hi, log)}; the exponent is varied linearly by ±1.
+    """
+    center = dict(slip_model.DEFAULTS, **(center or {}))
+    ranges = {}
+    for name in slip_model.INPUT_NAMES:
+        value = center[name]
+        if name == "exponent":
+            ranges[name] = (max(value - 1.0, 0.0), value + 1.0, False)
+        else:
+            ranges[name] = (value * 10.0**-decades, value * 10.0**decades, True)
+    return ranges
+
+
+def parse_range(spec):
+    """Parse "name=lo:hi[:lin]" into (name, (lo, hi, log))"""
+    name, _, values = spec.partition("=")
+    name = name.strip().replace("-", "_")
+    if name not in slip_model.INPUT_NAMES:
+        raise ValueError(f"unknown input '{name}'")
+    parts = values.split(":")
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] not in ("lin", "log")):
+        raise ValueError(f"bad range '{spec}' (expected name=lo:hi[:lin])")
+    lo, hi = float(parts[0]), float(parts[1])
+    log = not (len(parts) == 3 and parts[2] == "lin")
+    if log and (lo <= 0 or hi <= 0):
+        raise ValueError(f"log range of {name} must be positive")
+    return name, (lo, hi, log)
+
+
+def _scale(u, lo, hi, log):
+    if log:
+        return np.exp(np.log(lo) + u * (np.log(hi) - np.log(lo)))
+    return lo + u * (hi - lo)
+
+
+def _output(result, output):
+    if output == "ratio":
+        return result["ratio"]
+    if output == "log10_ratio":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.log10(result["ratio"])
+    return result["slip"].astype(np.float64)
+
+
+def evaluate_chunk(ranges, fixed, n, output, seed, index):
+    """Evaluate one chunk of the Saltelli design and reduce it to sums.
+
+    Returns an array [n, Σf_A, Σf_B, Σf_A², Σf_B², Σ f_B (f_ABi - f_A) for each i,
+    Σ (f_A - f_ABi)² for each i]. Samples whose outputs are not all finite are
+    dropped from the chunk.
+    """
+    names = list(ranges)
+    d = len(names)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+    a = rng.random((n, d))
+    b = rng.random((n, d))
+
+    # Rows: A, B, AB_1 ... AB_d stacked, one matrix column per varied input
+    stacked = np.empty(((d + 2) * n, d))
+    stacked[:n], stacked[n:2 * n] = a, b
+    for i in range(d):
+        block = stacked[(i + 2) * n:(i + 3) * n]
+        block[:] = a
+        block[:, i] = b[:, i]
+
+    inputs = []
+    for name in slip_model.INPUT_NAMES:
+        if name in ranges:
+            lo, hi, log = ranges[name]
+            inputs.append(_scale(stacked[:, names.index(name)], lo, hi, log))
+        else:
+            inputs.append(fixed.get(name, slip_model.DEFAULTS[name]))
+    with np.errstate(all="ignore"):
+        f = _output(slip_batch.evaluate_batch(*inputs), output).reshape(d + 2, n)
+
+    f = f[:, np.isfinite(f).all(axis=0)]
+    fa, fb, fab = f[0], f[1], f[2:]
+    sums = np.empty(5 + 2 * d)
+    sums[0] = fa.size
+    sums[1], sums[2] = fa.sum(), fb.sum()
+    sums[3], sums[4] = (fa * fa).sum(), (fb * fb).sum()
+    sums[5:5 + d] = (fb * (fab - fa)).sum(axis=1)
+    sums[5 + d:] = ((fa - fab)**2).sum(axis=1)
+    return sums
+
+
+def _indices(sums, d):
+    """First-order and total indices from accumulated chunk sums"""
+    n = sums[..., 0]
+    mean = (sums[..., 1] + sums[..., 2]) / (2 * n)
+    variance = (sums[..., 3] + sums[..., 4]) / (2 * n) - mean**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = sums[..., 5:5 + d] / n[..., None] / variance[..., None]
+        total = sums[..., 5 + d:] / (2 * n[..., None]) / variance[..., None]
+    return first, total, variance
+
+
+def _run_chunks(job):
+    ranges, fixed, samples, chunk, output, seed, chunks = job
+    return [(index, evaluate_chunk(ranges, fixed, min(chunk, samples - index * chunk), output, seed, index))
+            for index in chunks]
+
+
+def run_sobol(ranges, samples, fixed=None, output="log10_ratio", seed=0, chunk=DEFAULT_CHUNK, workers=1,
+              progress=None):
+    """Estimate Sobol indices of output over the given input ranges.
+
+    ranges maps each varied input to (lo, hi, log); the other inputs are taken
+    from fixed, or the GUI defaults. samples is the number of base samples N;
+    the model is evaluated N (d + 2) times. Returns a dict with the first-order
+    and total indices, their standard errors, the output variance and the
+    number of model evaluations.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"output must be one of {', '.join(OUTPUTS)}")
+    ranges = {name: ranges[name] for name in slip_model.INPUT_NAMES if name in ranges}
+    fixed = dict(fixed or {})
+    d = len(ranges)
+    if d == 0:
+        raise ValueError("at least one input must be varied")
+    samples = int(samples)
+    nchunks = -(-samples // chunk)
+    workers = max(1, min(workers or os.cpu_count() or 1, nchunks))
+
+    jobs = [(ranges, fixed, samples, chunk, output, seed, range(w, nchunks, workers)) for w in range(workers)]
+
+    per_chunk = np.empty((nchunks, 5 + 2 * d))
+    if workers == 1:
+        for index in range(nchunks):
+            per_chunk[index] = evaluate_chunk(ranges, fixed, min(chunk, samples - index * chunk), output,
+                                              seed, index)
+            if progress is not None:
+                progress(int(per_chunk[index, 0]))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for part in pool.imap_unordered(_run_chunks, jobs):
+                for index, sums in part:
+                    per_chunk[index] = sums
+                if progress is not None:
+                    progress(int(sum(sums[0] for _, sums in part)))
+
+    first, total, variance = _indices(per_chunk.sum(axis=0), d)
+    result = {
+        "inputs": list(ranges),
+        "output": output,
+        "samples": int(per_chunk[:, 0].sum()),
+        "evaluations": samples * (d + 2),
+        "variance": float(variance),
+        "first_order": dict(zip(ranges, first.tolist())),
+        "total": dict(zip(ranges, total.tolist())),
+    }
+    if nchunks > 1:
+        # Standard error from the scatter of per-chunk estimates
+        chunk_first, chunk_total, _ = _indices(per_chunk, d)
+        scale = np.sqrt(nchunks)
+        result["first_order_stderr"] = dict(zip(ranges, (np.nanstd(chunk_first, axis=0, ddof=1) / scale).tolist()))
+        result["total_stderr"] = dict(zip(ranges, (np.nanstd(chunk_total, axis=0, ddof=1) / scale).tolist()))
+    return result
+
+
+def format_result(result):
+    """Human-readable table of a run_sobol() result"""
+    lines = [f"Sobol indices of {result['output']} ({result['samples']:,} base samples, "
+             f"{result['evaluations']:,} model evaluations)",
+             f"{'Input':<32}{'S_i':>10}{'±':>8}{'ST_i':>8}{'±':>8}"]
+    stderr_first = result.get("first_order_stderr", {})
+    stderr_total = result.get("total_stderr", {})
+    for name in result["inputs"]:
+        lines.append(f"{slip_model.INPUT_LABELS[name]:<32}"
+                     f"{result['first_order'][name]:>10.4f}{stderr_first.get(name, float('nan')):>8.4f}"
+                     f"{result['total'][name]:>8.4f}{stderr_total.get(name, float('nan')):>8.4f}")
+    return "\n".join(lines)
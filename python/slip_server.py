@@ -0,0 +1,381 @@
+"""Local JSON/HTTP evaluation service with request micro-batching.
+
+Job launchers and meshing scripts can query the model over HTTP/1.1 on
+localhost instead of starting a process per case:
+
+    POST /calculate   {"gap_nm": 20, "sliding_speed": 5, ...}
+                      -> {"gap_nm": 20.0, ..., "ratio": 0.0655, "slip": true,
+                          "recommendation": "...", "cfd_suggestion": "..."}
+    POST /batch       {"gap_nm": [10, 20, 50], "sliding_speed": 5, ...}
+                      -> JSON Lines, one result row per input row
+    POST /boundary    {"solve": "speed" | "gap", "gap_nm": 20, ...}
+                      -> {"critical_speed": 3.2}  (or "critical_gap_nm")
+    GET  /health      -> {"status": "ok", "version": "1.01"}
+    GET  /stats       -> request, batch and latency statistics
+
+Inputs left out take the GUI defaults. "self_consistent": true selects the
+slip-corrected shear rate (see slip_batch.solve_shear_rate). Numbers that
+are NaN or infinite are returned as null.
+
+Every /calculate request that arrives in the same pass of the event loop
+is evaluated in a single slip_batch.evaluate_batch() call. The first request
+of a pass schedules the evaluation with loop.call_soon(). The handlers of
+the other connections that became readable in that pass run before it, so
+their requests join the batch without any added wait. With max_delay > 0,
+the batch waits up to that long for more requests.
+
+/batch and /boundary take arrays (scalars broadcast) and are vectorized
+themselves. A /batch response of more than STREAM_ROWS rows is computed
+and sent chunk by chunk with chunked transfer encoding, waiting for the
+client to take each chunk, so memory stays bounded and concurrent small
+requests are served between chunks.
+
+The server has no authentication; keep it on a loopback address.
+"""
+
+import asyncio
+import collections
+import json
+import math
+import time
+
+import numpy as np
+
+import slip_batch
+import slip_boundary
+import slip_export
+import slip_model
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 4096
+
+# /batch responses longer than this are streamed; also the rows per streamed chunk
+STREAM_ROWS = 16384
+
+# Largest accepted request body
+MAX_BODY = 64 << 20
+
+# Latencies kept for the percentiles of /stats
+LATENCY_SAMPLES = 10000
+
+RESULT_NAMES = slip_model.SlipResult._fields
+# Columns of /batch rows, as written by the batch command
+BATCH_NAMES = slip_model.INPUT_NAMES + slip_batch.RESULT_DTYPE.names
+OPTIONS = ("self_consistent",)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """Client error answered with an HTTP status and a JSON error message"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _finite(value):
+    return value if not isinstance(value, float) or math.isfinite(value) else None
+
+
+def _parse_inputs(body, array=False, names=slip_model.INPUT_NAMES, extra=()):
+    """Model inputs of a request object, defaults filled in; arrays allowed with array=True"""
+    if not isinstance(body, dict):
+        raise RequestError("request body must be a JSON object")
+    unknown = set(body) - set(names) - set(OPTIONS) - set(extra)
+    if unknown:
+        raise RequestError(f"unknown field(s) {', '.join(sorted(unknown))}")
+    for name in OPTIONS:
+        if not isinstance(body.get(name, False), bool):
+            raise RequestError(f"{name} must be true or false")
+    values = []
+    for name in names:
+        value = body.get(name, slip_model.DEFAULTS[name])
+        try:
+            if array:
+                value = np.asarray(value, dtype=np.float64)
+                if value.ndim > 1:
+                    raise ValueError
+            elif isinstance(value, bool):
+                raise TypeError
+            else:
+                value = float(value)
+        except (TypeError, ValueError):
+            kind = "a number or a list of numbers" if array else "a number"
+            raise RequestError(f"{name} must be {kind}") from None
+        values.append(value)
+    return values
+
+
+class MicroBatcher:
+    """Coalesces single evaluations into vectorized batches"""
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_delay=0.0):
+        self.max_batch = int(max_batch)
+        self.max_delay = float(max_delay)
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+        self._pending = []
+        self._handle = None
+
+    def evaluate(self, inputs, self_consistent=False):
+        """Future of the result row (a tuple in SlipResult field order) for one set of inputs"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((inputs, bool(self_consistent), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._handle is None:
+            if self.max_delay > 0:
+                self._handle = loop.call_later(self.max_delay, self._flush)
+            else:
+                self._handle = loop.call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, []
+        for self_consistent in (False, True):
+            group = [item for item in pending if item[1] is self_consistent]
+            if group:
+                self._evaluate(group, self_consistent)
+
+    def _evaluate(self, group, self_consistent):
+        try:
+            inputs = np.array([item[0] for item in group], dtype=np.float64)
+            with np.errstate(all="ignore"):
+                result = slip_batch.evaluate_batch(*inputs.T, self_consistent=self_consistent)
+            rows = result.tolist()
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (values, _, future), row in zip(group, rows):
+            if not future.done():
+                future.set_result(tuple(values) + (slip_model.nm_to_m(values[0]),) + row)
+        self.batches += 1
+        self.rows += len(group)
+        self.largest = max(self.largest, len(group))
+
+
+class SlipServer:
+    """asyncio HTTP/1.1 server for the endpoints in the module docstring"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH, max_delay=0.0):
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(max_batch, max_delay)
+        self.requests = collections.Counter()
+        self.errors = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.started = time.time()
+        self.server = None
+        self._batch_template = slip_export.json_lines_template(BATCH_NAMES)
+        self._routes = {
+            ("POST", "/calculate"): self.calculate,
+            ("POST", "/batch"): self.batch,
+            ("POST", "/boundary"): self.boundary,
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+        }
+
+    async def start(self):
+        """Start listening; returns the asyncio.Server (port 0 picks a free port, see self.port)"""
+        self.server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    # Endpoints: each takes the decoded JSON body and returns an object to send, or None if it streamed
+
+    async def calculate(self, body, writer):
+        inputs = _parse_inputs(body)
+        row = await self.batcher.evaluate(inputs, body.get("self_consistent", False))
+        result = dict(zip(RESULT_NAMES, map(_finite, row)))
+        result["recommendation"] = slip_model.recommendation(row[-2])
+        result["cfd_suggestion"] = slip_model.cfd_suggestion(row[-2], row[-3])
+        return result
+
+    async def batch(self, body, writer):
+        inputs = _parse_inputs(body, array=True)
+        try:
+            shape = slip_batch.broadcast_shape(*inputs)
+        except ValueError:
+            raise RequestError("input arrays must have the same length (or be scalars)") from None
+        rows = int(np.prod(shape))
+        columns = [np.broadcast_to(value, shape).reshape(-1) for value in inputs]
+        self_consistent = body.get("self_consistent", False)
+        if rows <= STREAM_ROWS:
+            return self._batch_lines(columns, 0, rows, self_consistent).encode()
+        for start in range(0, rows, STREAM_ROWS):
+            try:
+                data = self._batch_lines(columns, start, min(start + STREAM_ROWS, rows), self_consistent).encode()
+            except Exception as e:
+                if start == 0:
+                    raise
+                # The 200 status has gone out: drop the connection so the client sees an incomplete body
+                writer.transport.abort()
+                raise ConnectionAbortedError(f"batch failed after {start} rows: {e}") from e
+            if start == 0:
+                # Headers go out only once the first chunk has been computed without error
+                self._start_response(writer, 200, None, "application/x-ndjson")
+            writer.write(b"%x\r\n%b\r\n" % (len(data), data))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        return None
+
+    def _batch_lines(self, columns, start, stop, self_consistent):
+        inputs = [c[start:stop] for c in columns]
+        with np.errstate(all="ignore"):
+            result = slip_batch.evaluate_batch(*inputs, self_consistent=self_consistent)
+        arrays = inputs + [result[name] for name in slip_batch.RESULT_DTYPE.names]
+        return slip_export.format_json_lines(arrays, self._batch_template) if stop > start else ""
+
+    async def boundary(self, body, writer):
+        if not isinstance(body, dict) or body.get("solve") not in ("speed", "gap"):
+            raise RequestError('"solve" must be "speed" or "gap"')
+        solved = "sliding_speed" if body["solve"] == "speed" else "gap_nm"
+        names = [name for name in slip_model.INPUT_NAMES if name != solved]
+        inputs = _parse_inputs(body, array=True, names=names, extra=("solve", solved))
+        solver = slip_boundary.critical_speed if body["solve"] == "speed" else slip_boundary.critical_gap
+        try:
+            value = solver(*inputs)
+        except ValueError as e:
+            raise RequestError(str(e)) from None
+        key = "critical_speed" if body["solve"] == "speed" else "critical_gap_nm"
+        value = value.tolist()
+        return {key: [_finite(v) for v in value] if isinstance(value, list) else _finite(value)}
+
+    async def health(self, body, writer):
+        return {"status": "ok", "version": slip_model.VERSION}
+
+    async def stats(self, body, writer):
+        latencies = np.array(self.latencies) * 1e3
+        percentiles = (np.percentile(latencies, [50, 90, 99]).tolist() if latencies.size
+                       else [None, None, None])
+        batcher = self.batcher
+        return {
+            "uptime": time.time() - self.started,
+            "requests": dict(self.requests),
+            "errors": self.errors,
+            "batches": batcher.batches,
+            "batched_rows": batcher.rows,
+            "mean_batch": batcher.rows / batcher.batches if batcher.batches else None,
+            "largest_batch": batcher.largest,
+            "latency_ms": dict(zip(("p50", "p90", "p99"), percentiles)),
+        }
+
+    # HTTP
+
+    def _start_response(self, writer, status, length, content_type="application/json", keep_alive=True):
+        headers = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Type: {content_type}"]
+        headers.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+        if not keep_alive:
+            headers.append("Connection: close")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+
+    def _respond(self, writer, status, data, content_type="application/json", keep_alive=True):
+        self._start_response(writer, status, len(data), content_type, keep_alive)
+        writer.write(data)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                start = time.perf_counter()
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    self._respond(writer, 400, b'{"error": "malformed request line"}', keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    self._respond(writer, 411, b'{"error": "send a Content-Length"}', keep_alive=False)
+                    break
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._respond(writer, 400, b'{"error": "malformed Content-Length"}', keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    self._respond(writer, 413, b'{"error": "request body too large"}', keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                await self._dispatch(method, target.split("?", 1)[0], body, writer, keep_alive)
+                self.latencies.append(time.perf_counter() - start)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # server shutting down
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body, writer, keep_alive):
+        self.requests[path] += 1
+        handler = self._routes.get((method, path))
+        try:
+            if handler is None:
+                status = 405 if any(route[1] == path for route in self._routes) else 404
+                raise RequestError(f"{method} {path} is not supported", status)
+            try:
+                data = json.loads(body) if body.strip() else {}
+            except ValueError as e:
+                raise RequestError(f"invalid JSON: {e}") from None
+            result = await handler(data, writer)
+        except ConnectionError:
+            # The client is gone or a streamed response was aborted: nothing more can be sent
+            self.errors += 1
+            raise
+        except RequestError as e:
+            self.errors += 1
+            self._respond(writer, e.status, json.dumps({"error": str(e)}).encode(), keep_alive=keep_alive)
+            return
+        except Exception as e:
+            self.errors += 1
+            self._respond(writer, 500, json.dumps({"error": str(e)}).encode(), keep_alive=keep_alive)
+            return
+        if isinstance(result, bytes):
+            self._respond(writer, 200, result, "application/x-ndjson", keep_alive)
+        elif result is not None:
+            self._respond(writer, 200, json.dumps(result).encode(), keep_alive=keep_alive)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH, max_delay=0.0, ready=None):
+    """Run a SlipServer until interrupted; ready(server) is called once it listens"""
+    async def main():
+        server = SlipServer(host, port, max_batch, max_delay)
+        await server.start()
+        if ready is not None:
+            ready(server)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,417 @@
+"""Chunked, memory-mapped on-disk store for batch and sweep results.
+
+A store is a directory with a small JSON header and one sub-directory per
+column. Rows are split into fixed-size chunks and every chunk of every
+column is a plain .npy file:
+
+    results.store/
+        store.json          column dtypes, chunk size, row count, attributes
+        gap_nm/0.npy
+        gap_nm/1.npy
+        ...
+        ratio/0.npy
+        ...
+
+Chunks are memory-mapped on demand, so reading a slice or a set of rows
+touches only the chunks that hold them. Chunk files are written to a
+temporary name and renamed into place, so an interrupted writer never leaves
+a half-written chunk behind. A store can be filled chunk by chunk in any
+order, which is how parallel sweeps write it, or grown with append().
+append() keeps a partial last chunk in memory and writes it when it fills
+or on flush() and close(), so many small appends cost no more I/O than one
+large one.
+"""
+
+import json
+import operator
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+import slip_batch
+import slip_model
+
+STORE_VERSION = 1
+HEADER_NAME = "store.json"
+
+# Rows per chunk file (8 MB per float64 column)
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+# Inputs followed by everything calculate() produces
+STORE_DTYPE = np.dtype([(name, np.float64) for name in slip_model.INPUT_NAMES] + slip_batch.RESULT_DTYPE.descr)
+
+# Number of memory-mapped chunk files kept open per store
+OPEN_CHUNKS = 64
+
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+             "==": operator.eq, "=": operator.eq, "!=": operator.ne}
+
+_CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(\S+)\s*$")
+
+
+def parse_filter(text, columns=STORE_DTYPE.names):
+    """Parse a filter such as "slip == 1 and gap_nm < 50" into a list of (column, operator, value).
+
+    Conditions are joined by "and" or commas; slip also accepts slip/no-slip
+    and true/false.
+    """
+    conditions = []
+    for part in re.split(r",|\band\b", text):
+        if not part.strip():
+            continue
+        match = _CONDITION.match(part)
+        if match is None:
+            raise ValueError(f"cannot parse condition '{part.strip()}' (expected e.g. 'ratio >= 0.01')")
+        name, op, value = match.groups()
+        if name not in columns:
+            raise ValueError(f"unknown column '{name}'")
+        if name == "slip" and value.lower() in ("slip", "true", "no-slip", "noslip", "false"):
+            value = 1.0 if value.lower() in ("slip", "true") else 0.0
+        conditions.append((name, OPERATORS[op], float(value)))
+    return conditions
+
+
+def is_store_path(path):
+    """Return True for paths that name a result store (existing store directory or .store suffix)"""
+    path = str(path).rstrip("/\\")
+    return path.endswith(".store") or os.path.isfile(os.path.join(path, HEADER_NAME))
+
+
+def _as_columns(data, dtype):
+    """Return a dict of column arrays from a structured array or a dict"""
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        return {name: data[name] for name in dtype.names}
+    return {name: np.asarray(data[name]) for name in dtype.names}
+
+
+class ColumnView:
+    """Lazy view of one store column supporting slices, integers and index arrays"""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.dtype = store.dtype[name]
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, key):
+        return self.store.read(key, columns=[self.name])[self.name]
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+class ResultStore:
+    """Columnar result store backed by memory-mapped .npy chunk files"""
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "r+"):
+            raise ValueError("mode must be 'r' or 'r+'")
+        self.path = str(path)
+        self.mode = mode
+        with open(os.path.join(self.path, HEADER_NAME), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.path}: unsupported store version {header.get('version')}")
+        self.dtype = np.dtype([(name, np.dtype(kind)) for name, kind in header["columns"]])
+        self.chunk_rows = int(header["chunk_rows"])
+        self.rows = int(header["rows"])
+        self.attrs = header.get("attrs", {})
+        self._open = OrderedDict()
+        self._tail = None
+
+    @classmethod
+    def create(cls, path, dtype=STORE_DTYPE, chunk_rows=DEFAULT_CHUNK_ROWS, rows=0, attrs=None, overwrite=False):
+        """Create an empty store. rows fixes the length up front for stores filled chunk by chunk."""
+        path = str(path)
+        if os.path.exists(os.path.join(path, HEADER_NAME)):
+            if not overwrite:
+                raise FileExistsError(f"{path} already contains a result store")
+            cls(path).clear_chunks()
+        dtype = np.dtype(dtype)
+        for name in dtype.names:
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+        store = cls.__new__(cls)
+        store.path, store.mode = path, "r+"
+        store.dtype, store.chunk_rows, store.rows = dtype, int(chunk_rows), int(rows)
+        store.attrs = dict(attrs or {})
+        store._open = OrderedDict()
+        store._tail = None
+        store.flush()
+        return store
+
+    def flush(self):
+        """Write the partial last chunk kept by append(), then the header, atomically replacing both"""
+        if self._tail is not None and self._tail["dirty"]:
+            index = self._tail["index"]
+            start, stop = self.chunk_bounds(index)
+            self._save_chunk(index, {name: values[:stop - start] for name, values in self._tail["columns"].items()})
+            self._tail["dirty"] = False
+        header = {
+            "version": STORE_VERSION,
+            "columns": [[name, self.dtype[name].str] for name in self.dtype.names],
+            "chunk_rows": self.chunk_rows,
+            "rows": self.rows,
+            "attrs": self.attrs,
+        }
+        target = os.path.join(self.path, HEADER_NAME)
+        with open(target + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=1)
+        os.replace(target + ".tmp", target)
+
+    # Layout
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return self.dtype.names
+
+    @property
+    def nchunks(self):
+        return -(-self.rows // self.chunk_rows)
+
+    def chunk_bounds(self, index):
+        """(start, stop) rows held by chunk index"""
+        start = index * self.chunk_rows
+        return start, min(start + self.chunk_rows, self.rows)
+
+    def _chunk_file(self, name, index):
+        return os.path.join(self.path, name, f"{index}.npy")
+
+    def has_chunk(self, index):
+        """Return True once every column of chunk index is on disk"""
+        return all(os.path.exists(self._chunk_file(name, index)) for name in self.dtype.names)
+
+    def missing_chunks(self):
+        """Indices of chunks that have not been written yet"""
+        return [i for i in range(self.nchunks) if not self.has_chunk(i)]
+
+    # Writing
+
+    def clear_chunks(self):
+        """Delete every chunk file of the store (the header is left alone)"""
+        for name in self.dtype.names:
+            folder = os.path.join(self.path, name)
+            for entry in os.listdir(folder) if os.path.isdir(folder) else ():
+                if entry.split(".")[0].isdigit() and entry.endswith((".npy", ".npy.tmp")):
+                    os.remove(os.path.join(folder, entry))
+        self._open.clear()
+        self._tail = None
+
+    def _check_writable(self):
+        if self.mode != "r+":
+            raise PermissionError(f"{self.path} is open read-only")
+
+    def write_chunk(self, index, data):
+        """Write all columns of chunk index from a structured array or dict of columns"""
+        self._check_writable()
+        start, stop = self.chunk_bounds(index)
+        columns = _as_columns(data, self.dtype)
+        for name in self.dtype.names:
+            values = np.ascontiguousarray(columns[name], dtype=self.dtype[name])
+            if values.shape != (stop - start,):
+                raise ValueError(f"chunk {index} of {name} needs {stop - start} rows, got {values.shape}")
+        if self._tail is not None and self._tail["index"] == index:
+            self._tail = None
+        self._save_chunk(index, columns)
+
+    def _save_chunk(self, index, columns):
+        for name in self.dtype.names:
+            values = np.ascontiguousarray(columns[name], dtype=self.dtype[name])
+            target = self._chunk_file(name, index)
+            with open(target + ".tmp", "wb") as f:
+                np.save(f, values)
+            os.replace(target + ".tmp", target)
+            self._open.pop((name, index), None)
+
+    def append(self, data):
+        """Append rows, topping up a partial last chunk first.
+
+        Full chunks are written, and the header updated, as they fill. The
+        rows of a partial last chunk stay in memory until flush() or close().
+        """
+        self._check_writable()
+        columns = _as_columns(data, self.dtype)
+        n = len(columns[self.dtype.names[0]])
+        offset = 0
+        while offset < n:
+            index, within = divmod(self.rows, self.chunk_rows)
+            take = min(self.chunk_rows - within, n - offset)
+            if within == 0 and take == self.chunk_rows:
+                self.rows += take
+                self._save_chunk(index, {name: columns[name][offset:offset + take] for name in self.dtype.names})
+                self.flush()
+            else:
+                tail = self._tail_buffer(index, within, within + take)
+                for name in self.dtype.names:
+                    tail["columns"][name][within:within + take] = columns[name][offset:offset + take]
+                tail["dirty"] = True
+                self.rows += take
+                if within + take == self.chunk_rows:
+                    self.flush()
+                    self._tail = None
+            offset += take
+
+    def _tail_buffer(self, index, rows, size):
+        """The in-memory partial chunk index holding rows rows, with room for size rows"""
+        tail = self._tail
+        if tail is None:
+            # A partial chunk already on disk (reopened store) is loaded once
+            loaded = {name: np.array(self._chunk(name, index)[:rows]) if rows else np.empty(0, self.dtype[name])
+                      for name in self.dtype.names}
+            tail = self._tail = {"index": index, "dirty": False, "columns": loaded}
+        capacity = len(tail["columns"][self.dtype.names[0]])
+        if size > capacity:
+            # Grow geometrically so a long run of small appends copies each row O(1) times
+            capacity = min(max(size, 2 * capacity), self.chunk_rows)
+            for name, values in tail["columns"].items():
+                grown = np.empty(capacity, self.dtype[name])
+                grown[:rows] = values[:rows]
+                tail["columns"][name] = grown
+        return tail
+
+    # Reading
+
+    def _chunk(self, name, index):
+        if self._tail is not None and self._tail["index"] == index:
+            return self._tail["columns"][name]
+        key = (name, index)
+        array = self._open.get(key)
+        if array is None:
+            array = np.load(self._chunk_file(name, index), mmap_mode="r")
+            self._open[key] = array
+            if len(self._open) > OPEN_CHUNKS:
+                self._open.popitem(last=False)
+        else:
+            self._open.move_to_end(key)
+        return array
+
+    def column(self, name):
+        """Lazy view of one column"""
+        if name not in self.dtype.names:
+            raise KeyError(name)
+        return ColumnView(self, name)
+
+    def read(self, key=slice(None), columns=None):
+        """Read rows (slice, integer or index array) of the given columns into a structured array"""
+        names = list(columns or self.dtype.names)
+        dtype = np.dtype([(name, self.dtype[name]) for name in names])
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.rows)
+            if step != 1:
+                return self.read(np.arange(start, stop, step), names)
+            out = np.empty(max(stop - start, 0), dtype=dtype)
+            row = start
+            while row < stop:
+                index, within = divmod(row, self.chunk_rows)
+                take = min(self.chunk_rows - within, stop - row)
+                for name in names:
+                    out[name][row - start:row - start + take] = self._chunk(name, index)[within:within + take]
+                row += take
+            return out
+        if np.isscalar(key):
+            key = int(key)
+            if key < 0:
+                key += self.rows
+            return self.read(slice(key, key + 1), names)[0]
+
+        rows = np.asarray(key).reshape(-1)
+        if rows.dtype == np.bool_:
+            rows = np.flatnonzero(rows)
+        rows = np.where(rows < 0, rows + self.rows, rows).astype(np.int64)
+        if rows.size and (rows.min() < 0 or rows.max() >= self.rows):
+            raise IndexError("row index out of range")
+        out = np.empty(rows.shape, dtype=dtype)
+        chunk_of = rows // self.chunk_rows
+        order = np.argsort(chunk_of, kind="stable")
+        bounds = np.flatnonzero(np.diff(chunk_of[order])) + 1
+        for group in np.split(order, bounds):
+            if group.size == 0:
+                continue
+            index = int(chunk_of[group[0]])
+            within = rows[group] - index * self.chunk_rows
+            for name in names:
+                out[name][group] = self._chunk(name, index)[within]
+        return out
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return self.read(key)
+
+    def close(self):
+        """Write any rows append() still holds in memory and release the memory maps"""
+        if self._tail is not None and self._tail["dirty"]:
+            self.flush()
+        self._tail = None
+        self._open.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path, mode="r"):
+    """Open an existing result store"""
+    return ResultStore(path, mode)
+
+
+def iter_store_chunks(path, chunk_rows=None, columns=None, skip_missing=False):
+    """Yield dicts of column arrays from a store, chunk_rows rows at a time"""
+    store = ResultStore(path)
+    names = list(store.columns if columns is None else columns)
+    missing = [name for name in names if name not in store.columns]
+    if missing and not skip_missing:
+        raise KeyError(f"{path}: missing column(s) {', '.join(missing)}")
+    names = [name for name in names if name in store.columns]
+    if not names:
+        return
+    step = chunk_rows or store.chunk_rows
+    for start in range(0, len(store), step):
+        block = store.read(slice(start, start + step), names)
+        yield {name: block[name] for name in names}
+
+
+class StoreWriter:
+    """TableWriter-compatible writer that appends chunks of columns to a store.
+
+    The store is created on the first write, with column dtypes taken from the
+    data, unless it already exists, in which case rows are appended to it.
+    """
+
+    def __init__(self, path, columns):
+        self.path = str(path)
+        self.columns = list(columns)
+        self.rows = 0
+        self.store = None
+        if os.path.exists(os.path.join(self.path, HEADER_NAME)):
+            self.store = ResultStore(self.path, "r+")
+            if list(self.store.columns) != self.columns:
+                raise ValueError(f"{self.path} has columns {', '.join(self.store.columns)}")
+
+    def write(self, chunk):
+        """Append one chunk of rows"""
+        if self.store is None:
+            dtype = np.dtype([(name, np.asarray(chunk[name]).dtype) for name in self.columns])
+            self.store = ResultStore.create(self.path, dtype)
+        self.store.append(chunk)
+        self.rows += len(chunk[self.columns[0]])
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,218 @@
+"""Multi-core parameter sweeps over Cartesian grids of the six model inputs.
+
+A sweep is described by one axis per model input (a 1-D array of values;
+inputs without an axis are held at a constant). The Cartesian grid is
+flattened in C order over slip_model.INPUT_NAMES and split into numbered
+tasks of contiguous rows. The tasks run on the work-stealing worker
+processes of slip_scheduler. Every worker maps the result file into memory
+and writes its tasks in place with slip_batch.evaluate_batch(out=...).
+Results therefore never pass through pickling: only task ids and a few
+timing figures go between the processes.
+
+The output is either a single structured .npy file with the grid's shape or,
+for paths ending in .store, a chunked slip_store.ResultStore that also holds
+the input columns. For a store, tasks are whole chunks and every worker
+writes its chunk files directly.
+
+Finished tasks are recorded in OUTPUT.manifest. A sweep restarted with
+resume=True (--resume) keeps the existing output and evaluates only the
+tasks missing from the manifest.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+import slip_batch
+import slip_model
+import slip_scheduler
+import slip_store
+
+# Grid points per task handed to a worker, and per evaluate_batch() call inside it
+DEFAULT_TASK_ROWS = 1 << 20
+BLOCK_ROWS = 1 << 18
+
+
+def log_axis(lo, hi, n):
+    """n log-spaced values from lo to hi inclusive"""
+    return np.logspace(np.log10(lo), np.log10(hi), int(n))
+
+
+def parse_axis(spec):
+    """Parse "name=lo:hi:n[:lin]" or "name=value" into (name, values).
+
+    Ranges are log-spaced unless ":lin" is appended.
+    """
+    name, _, values = spec.partition("=")
+    name = name.strip().replace("-", "_")
+    if name not in slip_model.INPUT_NAMES:
+        raise ValueError(f"unknown input '{name}' (expected one of {', '.join(slip_model.INPUT_NAMES)})")
+    parts = values.split(":")
+    if len(parts) == 1:
+        return name, np.array([float(parts[0])])
+    if len(parts) not in (3, 4) or (len(parts) == 4 and parts[3] not in ("lin", "log")):
+        raise ValueError(f"bad axis '{spec}' (expected name=lo:hi:n[:lin] or name=value)")
+    lo, hi, n = float(parts[0]), float(parts[1]), int(parts[2])
+    if len(parts) == 4 and parts[3] == "lin":
+        return name, np.linspace(lo, hi, n)
+    return name, log_axis(lo, hi, n)
+
+
+def make_axes(**axes):
+    """Return one float64 axis per model input, filling missing inputs with the GUI defaults"""
+    return [np.atleast_1d(np.asarray(axes.get(name, slip_model.DEFAULTS[name]), dtype=np.float64))
+            for name in slip_model.INPUT_NAMES]
+
+
+def grid_shape(axes):
+    return tuple(len(a) for a in axes)
+
+
+def grid_inputs(axes, start, stop):
+    """Input arrays for flat grid indices start:stop (C order over the axes)"""
+    index = np.arange(start, stop, dtype=np.int64)
+    inputs = [None] * len(axes)
+    for i in range(len(axes) - 1, -1, -1):
+        axis = axes[i]
+        if len(axis) == 1:
+            inputs[i] = axis[0]
+        else:
+            inputs[i] = axis[index % len(axis)]
+            index //= len(axis)
+    return inputs
+
+
+def evaluate_range(axes, flat_out, start, stop, block_rows=BLOCK_ROWS):
+    """Evaluate grid points start:stop into flat_out[start:stop]"""
+    for a in range(start, stop, block_rows):
+        b = min(a + block_rows, stop)
+        slip_batch.evaluate_batch(*grid_inputs(axes, a, b), out=flat_out[a:b])
+
+
+def evaluate_grid(axes):
+    """Evaluate a whole grid in this process and return it with the grid's shape"""
+    out = np.empty(grid_shape(axes), dtype=slip_batch.RESULT_DTYPE)
+    evaluate_range(axes, out.reshape(-1), 0, out.size)
+    return out
+
+
+def evaluate_chunk(axes, store, index):
+    """Evaluate the grid points held by one store chunk and write the chunk"""
+    start, stop = store.chunk_bounds(index)
+    block = np.empty(stop - start, dtype=store.dtype)
+    for a in range(start, stop, BLOCK_ROWS):
+        b = min(a + BLOCK_ROWS, stop)
+        inputs = grid_inputs(axes, a, b)
+        for name, value in zip(slip_model.INPUT_NAMES, inputs):
+            block[name][a - start:b - start] = value
+        result = slip_batch.evaluate_batch(*inputs)
+        for name in slip_batch.RESULT_DTYPE.names:
+            block[name][a - start:b - start] = result[name]
+    store.write_chunk(index, block)
+
+
+# Per-process state set up by _init_worker()
+_worker = {}
+
+
+def _init_worker(path, axes, task_rows, total):
+    _worker.clear()
+    _worker.update(axes=axes, task_rows=task_rows, total=total)
+    if slip_store.is_store_path(path):
+        _worker["store"] = slip_store.ResultStore(path, "r+")
+    else:
+        _worker["out"] = np.load(path, mmap_mode="r+").reshape(-1)
+
+
+def _run_task(task):
+    start = task * _worker["task_rows"]
+    stop = min(start + _worker["task_rows"], _worker["total"])
+    store = _worker.get("store")
+    if store is None:
+        out = _worker["out"]
+        evaluate_range(_worker["axes"], out, start, stop)
+        # The task only counts as done once its rows are on disk
+        out.flush()
+    else:
+        for index in range(start // store.chunk_rows, -(-stop // store.chunk_rows)):
+            evaluate_chunk(_worker["axes"], store, index)
+    return stop - start
+
+
+def create_output(path, axes, chunk_rows=slip_store.DEFAULT_CHUNK_ROWS):
+    """Create the .npy file or result store for a grid and return it"""
+    shape = grid_shape(axes)
+    if slip_store.is_store_path(path):
+        attrs = {"kind": "sweep", "shape": list(shape),
+                 "axes": {name: axis.tolist() for name, axis in zip(slip_model.INPUT_NAMES, axes)}}
+        return slip_store.ResultStore.create(path, chunk_rows=chunk_rows, rows=int(np.prod(shape)),
+                                             attrs=attrs, overwrite=True)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=slip_batch.RESULT_DTYPE, shape=shape)
+
+
+def save_axes(path, axes):
+    """Store the axis values next to a sweep result as <path>.axes.npz"""
+    np.savez(path + ".axes.npz", **dict(zip(slip_model.INPUT_NAMES, axes)))
+
+
+def manifest_path(path):
+    return str(path).rstrip("/\\") + ".manifest"
+
+
+def fingerprint(axes, path, task_rows, chunk_rows):
+    """Hash identifying a sweep job, used to match a manifest to its grid"""
+    job = {
+        "version": slip_model.VERSION,
+        "store": slip_store.is_store_path(path),
+        "task_rows": task_rows,
+        "chunk_rows": chunk_rows,
+        "axes": [axis.tolist() for axis in axes],
+    }
+    return hashlib.sha256(json.dumps(job).encode("utf-8")).hexdigest()
+
+
+def run_sweep(axes, path, workers=None, task_rows=DEFAULT_TASK_ROWS, progress=None,
+              chunk_rows=slip_store.DEFAULT_CHUNK_ROWS, resume=False):
+    """Evaluate a grid on work-stealing worker processes into the .npy file or store at path.
+
+    With resume, an existing output whose manifest matches this grid is kept
+    and only the unfinished tasks are run. Returns a dict with the total rows,
+    the rows computed in this run, wall time and per-worker statistics (rows,
+    busy seconds, tasks, steals). progress, if given, is called with the
+    number of rows finished after each task.
+    """
+    total = int(np.prod(grid_shape(axes)))
+    if slip_store.is_store_path(path):
+        # Tasks must hold whole chunks so that no two workers share a chunk file
+        task_rows = max(1, -(-task_rows // chunk_rows)) * chunk_rows
+    ntasks = -(-total // task_rows)
+
+    manifest = slip_scheduler.Manifest(manifest_path(path), fingerprint(axes, path, task_rows, chunk_rows),
+                                       ntasks, resume=resume and os.path.exists(path))
+    with manifest:
+        if not manifest.done:
+            create_output(path, axes, chunk_rows)
+            if not slip_store.is_store_path(path):
+                save_axes(path, axes)
+
+        rows = {}
+
+        def on_result(worker, task, seconds, stolen, count):
+            manifest.mark(task)
+            rows[worker] = rows.get(worker, 0) + count
+            if progress is not None:
+                progress(count)
+
+        t0 = time.perf_counter()
+        stats = slip_scheduler.run_tasks(manifest.pending(), _run_task, workers=workers,
+                                         initializer=_init_worker, initargs=(path, axes, task_rows, total),
+                                         on_result=on_result)
+        _worker.clear()
+        for worker, worker_stats in stats.items():
+            worker_stats["rows"] = rows.get(worker, 0)
+
+    return {"rows": total, "computed": sum(rows.values()), "seconds": time.perf_counter() - t0,
+            "workers": stats}
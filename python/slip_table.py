@@ -0,0 +1,245 @@
+"""Virtualized, sortable and filterable results table for batch runs.
+
+ResultTable keeps a batch as one NumPy array per column. Sorting and
+filtering never move the data; they produce an index array (the view) into
+the columns. VirtualTable shows a ResultTable in a ttk.Treeview that holds
+only as many items as fit on screen. Scrolling re-labels those items with
+the rows now in view, so only visible rows are ever formatted, and a table
+with millions of rows costs no more to display than one with fifty.
+
+Filters are conditions on columns joined by "and" or commas, e.g.
+"slip == 1 and gap_nm < 50" or "ratio >= 0.01, sliding_speed > 2".
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+import slip_batch
+import slip_io
+import slip_model
+import slip_store
+
+# Displayed columns, in order, with their headings
+COLUMNS = slip_model.INPUT_NAMES + slip_batch.RESULT_DTYPE.names
+HEADINGS = {
+    "gap_nm": "Gap (nm)",
+    "sliding_speed": "U (m/s)",
+    "mu": "μ (Pa·s)",
+    "lambda_friction": "λ (Pa·s/m)",
+    "gamma_crit": "γc (1/s)",
+    "exponent": "m",
+    "shear_rate": "γ (1/s)",
+    "shear_stress": "τ (Pa)",
+    "b0": "b₀ (m)",
+    "b_eff": "bₑff (m)",
+    "ratio": "bₑff/h",
+    "slip": "Decision",
+}
+
+
+def parse_filter(text):
+    """Parse a filter expression into a list of (column, operator, value)"""
+    return slip_store.parse_filter(text, COLUMNS)
+
+
+class ResultTable:
+    """Columnar batch results with a sorted and filtered view"""
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(columns[name]) for name in COLUMNS}
+        self.rows = len(self.columns["ratio"])
+        self.view = np.arange(self.rows)
+        self.sort_column = None
+        self.descending = False
+        self.conditions = []
+
+    @classmethod
+    def from_file(cls, path, defaults=None, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS, progress=None):
+        """Read a CSV/Parquet/store table of inputs and evaluate every row.
+
+        Input columns missing from the file take their value from defaults
+        (the GUI defaults if not given). progress(rows) is called per chunk.
+        """
+        defaults = dict(slip_model.DEFAULTS, **(defaults or {}))
+        parts = []
+        for chunk in slip_io.iter_table_chunks(path, chunk_rows, slip_model.INPUT_NAMES, skip_missing=True):
+            n = len(next(iter(chunk.values())))
+            inputs = [np.broadcast_to(chunk.get(name, defaults[name]), (n,)).astype(np.float64)
+                      for name in slip_model.INPUT_NAMES]
+            with np.errstate(all="ignore"):
+                parts.append((inputs, slip_batch.evaluate_batch(*inputs)))
+            if progress is not None:
+                progress(n)
+        columns = {}
+        for k, name in enumerate(slip_model.INPUT_NAMES):
+            columns[name] = np.concatenate([inputs[k] for inputs, _ in parts]) if parts else np.empty(0)
+        for name in slip_batch.RESULT_DTYPE.names:
+            columns[name] = (np.concatenate([result[name] for _, result in parts]) if parts
+                             else np.empty(0, dtype=slip_batch.RESULT_DTYPE[name]))
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.view)
+
+    def _update_view(self):
+        mask = np.ones(self.rows, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for name, op, value in self.conditions:
+                mask &= op(self.columns[name], value)
+        view = np.flatnonzero(mask)
+        if self.sort_column is not None:
+            keys = self.columns[self.sort_column][view]
+            if self.descending:
+                # Sorting the reversed keys and reversing the result keeps
+                # equal keys in their original order
+                order = len(keys) - 1 - np.argsort(keys[::-1], kind="stable")[::-1]
+            else:
+                order = np.argsort(keys, kind="stable")
+            view = view[order]
+        self.view = view
+
+    def set_filter(self, text):
+        """Show only the rows matching a filter expression (empty for all rows)"""
+        self.conditions = parse_filter(text)
+        self._update_view()
+
+    def sort(self, name, descending=False):
+        self.sort_column, self.descending = name, descending
+        self._update_view()
+
+    def view_columns(self):
+        """Columns of the rows in view, in view order"""
+        return {name: self.columns[name][self.view] for name in COLUMNS}
+
+    def row(self, index):
+        """Values of the index-th row of the view, by column name"""
+        i = self.view[index]
+        return {name: self.columns[name][i].item() for name in COLUMNS}
+
+    def formatted(self, start, stop):
+        """Display strings of view rows [start, stop), one tuple per row"""
+        rows = self.view[start:stop]
+        cells = []
+        for name in COLUMNS:
+            values = self.columns[name][rows]
+            if name == "slip":
+                cells.append(["Slip" if v else "No-slip" for v in values.tolist()])
+            elif name == "exponent":
+                cells.append([f"{v:g}" for v in values.tolist()])
+            else:
+                cells.append([f"{v:.3e}" for v in values.tolist()])
+        return list(zip(*cells))
+
+
+class VirtualTable:
+    """Treeview showing a ResultTable with only the visible rows materialized"""
+
+    def __init__(self, parent, table, on_activate=None):
+        self.table = table
+        self.on_activate = on_activate
+        self.top = 0
+        self.frame = ttk.Frame(parent)
+
+        controls = ttk.Frame(self.frame)
+        controls.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(controls, text="Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(controls, textvariable=self.filter_var, font=("Segoe UI", 10))
+        filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        filter_entry.bind("<Return>", lambda event: self.apply_filter())
+        ttk.Button(controls, text="Apply", command=self.apply_filter).pack(side=tk.LEFT)
+        self.count_var = tk.StringVar()
+        ttk.Label(controls, textvariable=self.count_var, width=24, anchor=tk.E).pack(side=tk.LEFT, padx=(10, 0))
+
+        body = ttk.Frame(self.frame)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, columns=COLUMNS, show="headings", selectmode="browse")
+        for name in COLUMNS:
+            self.tree.heading(name, text=HEADINGS[name], command=lambda n=name: self.toggle_sort(n))
+            self.tree.column(name, width=90, anchor=tk.E, stretch=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.page))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.page))
+        self.tree.bind("<Double-1>", self._activate)
+        self.tree.bind("<Return>", self._activate)
+        self.refresh()
+
+    @property
+    def page(self):
+        """Number of rows that fit in the Treeview"""
+        height = self.tree.winfo_height()
+        style = ttk.Style()
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        # Leave room for the heading row
+        return max(1, (height - row_height - 4) // row_height)
+
+    def refresh(self):
+        """Re-label the Treeview items with the rows now in view"""
+        total = len(self.table)
+        page = self.page
+        self.top = max(0, min(self.top, total - page))
+        rows = self.table.formatted(self.top, self.top + page)
+        items = self.tree.get_children()
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+            items = items[:len(rows)]
+        for k, values in enumerate(rows):
+            tag = ("slip",) if values[-1] == "Slip" else ("noslip",)
+            if k < len(items):
+                self.tree.item(items[k], values=values, tags=tag)
+            else:
+                self.tree.insert("", tk.END, values=values, tags=tag)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + page) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_var.set(f"{total:,} of {self.table.rows:,} rows")
+
+    def scroll(self, rows):
+        self.top += rows
+        self.refresh()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")"""
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.table))
+        elif args[0] == "scroll":
+            step = self.page if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.refresh()
+
+    def toggle_sort(self, name):
+        descending = self.table.sort_column == name and not self.table.descending
+        self.table.sort(name, descending)
+        for column in COLUMNS:
+            arrow = (" ▼" if descending else " ▲") if column == name else ""
+            self.tree.heading(column, text=HEADINGS[column] + arrow)
+        self.top = 0
+        self.refresh()
+
+    def apply_filter(self):
+        try:
+            self.table.set_filter(self.filter_var.get())
+        except ValueError as e:
+            self.count_var.set(str(e))
+            return
+        self.top = 0
+        self.refresh()
+
+    def _activate(self, event=None):
+        selected = self.tree.selection()
+        if not selected or self.on_activate is None:
+            return
+        index = self.top + self.tree.index(selected[0])
+        if index < len(self.table):
+            self.on_activate(self.table.row(index))
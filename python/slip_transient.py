@@ -0,0 +1,179 @@
+"""Streaming slip/no-slip evaluation of sliding-speed (and gap) time series.
+
+Tribometer and CFD monitor logs give U(t), and sometimes h(t), with far more
+samples than fit in memory. iter_series() reads such a log in fixed-size
+chunks. run_transient() evaluates bₑff(t) and bₑff/h(t) for each chunk with
+slip_batch.evaluate_batch(). A FlipDetector turns the ratio into intervals of
+constant regime. Memory use is set by the chunk size alone.
+
+The raw decision (bₑff/h ≥ 0.01) chatters when the ratio hovers near the
+threshold, so the detector applies two filters:
+
+- hysteresis: the regime only switches to slip once the ratio reaches
+  0.01·(1 + H), and back to no-slip once it falls below 0.01 / (1 + H);
+- minimum dwell: a switch only counts once the new regime has lasted at
+  least min_dwell time units. Shorter excursions are absorbed into the
+  surrounding interval.
+
+Both filters are vectorized over whole chunks. An interval is emitted as
+soon as the flip that ends it is confirmed, at most min_dwell after the flip,
+so the stream can be followed online.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import slip_batch
+import slip_io
+import slip_model
+
+# One interval of constant regime; end is the time of the flip that ends it
+Interval = namedtuple("Interval", ("start", "end", "slip", "samples"))
+
+INTERVAL_COLUMNS = ("start", "end", "duration", "slip", "samples")
+SAMPLE_COLUMNS = ("time", "sliding_speed", "gap_nm", "b_eff", "ratio", "slip")
+
+
+class FlipDetector:
+    """Debounced slip/no-slip regime tracker fed with chunks of (time, ratio) samples.
+
+    Times must be non-decreasing across all chunks. update() returns the
+    intervals completed by a chunk; finish() returns the last, open interval.
+    """
+
+    def __init__(self, hysteresis=0.0, min_dwell=0.0, threshold=slip_model.SLIP_THRESHOLD):
+        if hysteresis < 0:
+            raise ValueError("hysteresis must be >= 0")
+        if min_dwell < 0:
+            raise ValueError("min_dwell must be >= 0")
+        self.threshold = threshold
+        self.upper = threshold * (1 + hysteresis)
+        self.lower = threshold / (1 + hysteresis)
+        self.min_dwell = min_dwell
+        self.reset()
+
+    def reset(self):
+        self.index = 0
+        self.confirmed = None
+        self.last_time = None
+        # Hysteresis level of the last sample and the run of equal levels it ends
+        self._level = None
+        self._run_time = None
+        self._run_index = 0
+        # Start of the current interval
+        self._start_time = None
+        self._start_index = 0
+
+    def update(self, time, ratio):
+        """Process one chunk and return the list of intervals it completes"""
+        time = np.asarray(time, dtype=np.float64)
+        ratio = np.asarray(ratio, dtype=np.float64)
+        n = len(ratio)
+        if n == 0:
+            return []
+        if self.confirmed is None:
+            # The first sample sets the initial regime with the plain threshold
+            self._level = self.confirmed = bool(slip_batch.decide(ratio[0]))
+            self._run_time = self._start_time = time[0]
+
+        # Hysteresis: inside the band the level holds its previous value.
+        # NaN counts as slip, as in the plain decision.
+        slip = ~(ratio < self.upper)
+        known = slip | (ratio < self.lower)
+        last_known = np.where(known, np.arange(n), -1)
+        np.maximum.accumulate(last_known, out=last_known)
+        level = np.where(last_known >= 0, slip[last_known], self._level)
+
+        # Runs of equal level; the first one may continue the previous chunk's run
+        begins = np.flatnonzero(np.diff(level, prepend=self._level))
+        continued = len(begins) == 0 or begins[0] != 0
+        if continued:
+            begins = np.concatenate(([0], begins))
+        ends = np.append(begins[1:] - 1, n - 1)
+        run_time = time[begins]
+        run_index = self.index + begins
+        if continued:
+            run_time[0] = self._run_time
+            run_index[0] = self._run_index
+        run_level = level[begins]
+
+        # A run confirms its regime once it has lasted min_dwell; the regime
+        # flips at every confirmed run whose level differs from the one before
+        qualified = np.flatnonzero(time[ends] - run_time >= self.min_dwell)
+        states = run_level[qualified]
+        flips = qualified[states != np.append(self.confirmed, states[:-1])]
+
+        intervals = []
+        for k in flips.tolist():
+            intervals.append(Interval(float(self._start_time), float(run_time[k]), self.confirmed,
+                                      int(run_index[k] - self._start_index)))
+            self.confirmed = bool(run_level[k])
+            self._start_time, self._start_index = run_time[k], run_index[k]
+
+        self._level = bool(level[-1])
+        self._run_time, self._run_index = run_time[-1], run_index[-1]
+        self.index += n
+        self.last_time = time[-1]
+        return intervals
+
+    def finish(self):
+        """Return the final interval (ending at the last sample) and reset"""
+        intervals = []
+        if self.confirmed is not None:
+            intervals.append(Interval(float(self._start_time), float(self.last_time), self.confirmed,
+                                      int(self.index - self._start_index)))
+        self.reset()
+        return intervals
+
+
+def iter_series(path, speed_column="sliding_speed", time_column="time", gap_column=None,
+                sample_rate=None, chunk_rows=slip_io.DEFAULT_CHUNK_ROWS):
+    """Yield (time, sliding_speed, gap_nm or None) arrays from a CSV/Parquet/store log.
+
+    With sample_rate (Hz), times are sample_index / sample_rate and the time
+    column is not read. Without gap_column, gap_nm is None.
+    """
+    columns = [speed_column]
+    if sample_rate is None:
+        columns.append(time_column)
+    if gap_column is not None:
+        columns.append(gap_column)
+    offset = 0
+    for chunk in slip_io.iter_table_chunks(path, chunk_rows, columns):
+        speed = chunk[speed_column]
+        if sample_rate is None:
+            time = chunk[time_column]
+        else:
+            time = (offset + np.arange(len(speed))) / sample_rate
+        offset += len(speed)
+        yield time, speed, chunk[gap_column] if gap_column is not None else None
+
+
+def run_transient(series, mu, lambda_friction, gamma_crit, exponent, gap_nm=slip_model.DEFAULTS["gap_nm"],
+                  detector=None, on_samples=None, progress=None):
+    """Evaluate the model along a time series and yield its regime intervals.
+
+    series yields (time, sliding_speed, gap_nm or None) chunks, as from
+    iter_series(); gap_nm is used for chunks without a gap. on_samples(time,
+    speed, gap, results) receives each chunk's RESULT_DTYPE array, and
+    progress(samples) is called per chunk.
+    """
+    if detector is None:
+        detector = FlipDetector()
+    buffer = None
+    for time, speed, gap in series:
+        n = len(speed)
+        if gap is None:
+            gap = gap_nm
+        if buffer is None or len(buffer) < n:
+            buffer = np.empty(n, dtype=slip_batch.RESULT_DTYPE)
+        with np.errstate(all="ignore"):
+            results = slip_batch.evaluate_batch(gap, speed, mu, lambda_friction, gamma_crit, exponent,
+                                                out=buffer[:n])
+        if on_samples is not None:
+            on_samples(time, speed, gap, results)
+        yield from detector.update(time, results["ratio"])
+        if progress is not None:
+            progress(n)
+    yield from detector.finish()
@@ -0,0 +1,355 @@
+"""Temperature- and pressure-dependent viscosity laws μ(T, p).
+
+The GUI uses one constant viscosity. Heated films at GPa pressures need μ to
+follow the local temperature T (K) and pressure p (Pa). Every law here is a
+callable law(T, p, out=None) that evaluates μ (Pa·s) with NumPy ufuncs
+written into out, so it runs over whole fields without temporaries:
+
+- Constant(mu)
+- VFT(a, b, c): Vogel–Fulcher–Tammann, μ = a·exp(b / (T − c))
+- Arrhenius(mu_ref, activation_energy, t_ref): μ = μ_ref·exp(E/R (1/T − 1/T_ref))
+- Barus(alpha, base): μ = μ_base(T)·exp(α p)
+- Roelands(z, base, p0): μ = μ_base·exp((ln μ_base + 9.67)((1 + p/p0)^z − 1))
+- LookupTable: tabulated data (see FLUIDS and LookupTable.from_csv), or any
+  law tabulated with LookupTable.from_law(). ln μ is resampled onto a uniform
+  grid once, so a lookup is index arithmetic plus linear interpolation.
+
+evaluate_batch() feeds μ(T, p) into the b₀ = μ/λ and τ = μγ chain of
+slip_batch.evaluate_batch(). It works chunk by chunk, so μ never exists as a
+full-size array.
+"""
+
+import numpy as np
+
+import slip_batch
+import slip_io
+
+# Molar gas constant (J/(mol·K))
+GAS_CONSTANT = 8.314462618
+
+# Roelands reference pressure (Pa) and the constant 9.67 = -ln(6.31e-5 Pa·s)
+ROELANDS_P0 = 1.96e8
+ROELANDS_LN_MU_INF = -9.67
+
+# Temperature and pressure used where a table or the options give none
+DEFAULT_TEMPERATURE = 293.15
+DEFAULT_PRESSURE = 1e5
+
+# Grid points of a LookupTable: along T for μ(T), per axis for μ(T, p).
+# A 2D table is kept small enough to stay in cache.
+LUT_SIZE = 1024
+LUT_SIZE_2D = 256
+
+# Tabulated fluids: temperature (K) -> viscosity (Pa·s) at 0.1 MPa.
+# Water: IAPWS 2008 viscosity formulation, 0–100 °C.
+FLUIDS = {
+    "water": (
+        (273.15, 283.15, 293.15, 298.15, 303.15, 313.15, 323.15, 333.15, 343.15, 353.15, 363.15, 373.15),
+        (1.792e-3, 1.306e-3, 1.002e-3, 0.890e-3, 0.797e-3, 0.653e-3, 0.547e-3, 0.466e-3, 0.404e-3,
+         0.354e-3, 0.315e-3, 0.282e-3),
+    ),
+}
+
+
+def _output(out, *values):
+    if out is None:
+        out = np.empty(np.broadcast_shapes(*(np.shape(v) for v in values)))
+    return out
+
+
+class Constant:
+    """μ independent of temperature and pressure"""
+
+    def __init__(self, mu):
+        self.mu = float(mu)
+
+    def __call__(self, temperature, pressure, out=None):
+        out = _output(out, temperature, pressure)
+        out[...] = self.mu
+        return out
+
+    def __repr__(self):
+        return f"Constant({self.mu:g})"
+
+
+class VFT:
+    """Vogel–Fulcher–Tammann law μ = a·exp(b / (T − c))"""
+
+    def __init__(self, a, b, c):
+        self.a, self.b, self.c = float(a), float(b), float(c)
+
+    def __call__(self, temperature, pressure, out=None):
+        out = _output(out, temperature, pressure)
+        np.subtract(temperature, self.c, out=out)
+        np.divide(self.b, out, out=out)
+        np.exp(out, out=out)
+        np.multiply(out, self.a, out=out)
+        return out
+
+    def __repr__(self):
+        return f"VFT({self.a:g}, {self.b:g}, {self.c:g})"
+
+
+class Arrhenius:
+    """Arrhenius law μ = μ_ref·exp(E/R (1/T − 1/T_ref)), E in J/mol"""
+
+    def __init__(self, mu_ref, activation_energy, t_ref=DEFAULT_TEMPERATURE):
+        self.mu_ref, self.activation_energy, self.t_ref = float(mu_ref), float(activation_energy), float(t_ref)
+
+    def __call__(self, temperature, pressure, out=None):
+        out = _output(out, temperature, pressure)
+        np.divide(1.0, temperature, out=out)
+        np.subtract(out, 1.0 / self.t_ref, out=out)
+        np.multiply(out, self.activation_energy / GAS_CONSTANT, out=out)
+        np.exp(out, out=out)
+        np.multiply(out, self.mu_ref, out=out)
+        return out
+
+    def __repr__(self):
+        return f"Arrhenius({self.mu_ref:g}, {self.activation_energy:g}, {self.t_ref:g})"
+
+
+class Barus:
+    """Barus pressure law μ = μ_base(T)·exp(α p), α in 1/Pa"""
+
+    def __init__(self, alpha, base):
+        self.alpha, self.base = float(alpha), base
+        self._scratch = None
+
+    def __call__(self, temperature, pressure, out=None):
+        out = self.base(temperature, pressure, out)
+        scratch = _scratch(self, out)
+        np.multiply(pressure, self.alpha, out=scratch)
+        np.exp(scratch, out=scratch)
+        np.multiply(out, scratch, out=out)
+        return out
+
+    def __repr__(self):
+        return f"Barus({self.alpha:g}, {self.base!r})"
+
+
+class Roelands:
+    """Roelands pressure law μ = μ_base·exp((ln μ_base + 9.67)((1 + p/p0)^z − 1))"""
+
+    def __init__(self, z, base, p0=ROELANDS_P0):
+        self.z, self.base, self.p0 = float(z), base, float(p0)
+        self._scratch = None
+
+    def __call__(self, temperature, pressure, out=None):
+        out = self.base(temperature, pressure, out)
+        scratch = _scratch(self, out)
+        np.divide(pressure, self.p0, out=scratch)
+        np.add(scratch, 1.0, out=scratch)
+        np.power(scratch, self.z, out=scratch)
+        # ln μ = ln μ_base + (ln μ_base + 9.67)(q − 1) = (ln μ_base + 9.67) q − 9.67, q = (1 + p/p0)^z
+        np.log(out, out=out)
+        np.subtract(out, ROELANDS_LN_MU_INF, out=out)
+        np.multiply(out, scratch, out=out)
+        np.add(out, ROELANDS_LN_MU_INF, out=out)
+        np.exp(out, out=out)
+        return out
+
+    def __repr__(self):
+        return f"Roelands({self.z:g}, {self.base!r}, p0={self.p0:g})"
+
+
+def _scratch(law, like):
+    """Per-law scratch buffer with the shape of like"""
+    if law._scratch is None or law._scratch.shape != like.shape:
+        law._scratch = np.empty(like.shape)
+    return law._scratch
+
+
+class LookupTable:
+    """Viscosity interpolated from a uniform grid of ln μ over T (and p).
+
+    Lookups outside the tabulated range are clamped to its edges. Without a
+    pressure axis the table depends on temperature only.
+    """
+
+    def __init__(self, t_range, log_mu, p_range=None):
+        self.t_range = (float(t_range[0]), float(t_range[1]))
+        self.p_range = None if p_range is None else (float(p_range[0]), float(p_range[1]))
+        self.log_mu = np.ascontiguousarray(log_mu, dtype=np.float64)
+        self._t_scale = (self.log_mu.shape[0] - 1) / (self.t_range[1] - self.t_range[0])
+        g = self.log_mu
+        # Per-cell coefficients, so that a lookup gathers one contiguous row:
+        # ln μ = a + c·ft (1D), or a + b·fp + ft·(c + d·fp) (2D)
+        if self.p_range is None:
+            self._cells = np.stack([g[:-1], g[1:] - g[:-1]], axis=-1)
+        else:
+            self._p_scale = (g.shape[1] - 1) / (self.p_range[1] - self.p_range[0])
+            self._cells = np.stack([g[:-1, :-1], g[:-1, 1:] - g[:-1, :-1], g[1:, :-1] - g[:-1, :-1],
+                                    g[1:, 1:] - g[1:, :-1] - g[:-1, 1:] + g[:-1, :-1]], axis=-1).reshape(-1, 4)
+
+    @classmethod
+    def from_points(cls, temperature, mu, pressure=None, size=None):
+        """Build a table from tabulated points.
+
+        Without pressure, the points are μ(T). With pressure they must cover a
+        full rectilinear grid of temperatures × pressures, in any order.
+        """
+        temperature = np.asarray(temperature, dtype=np.float64)
+        log_mu = np.log(np.asarray(mu, dtype=np.float64))
+        t_axis = np.unique(temperature)
+        if len(t_axis) < 2:
+            raise ValueError("a viscosity table needs at least two temperatures")
+        one_d = pressure is None or len(np.unique(pressure)) == 1
+        size = size or (LUT_SIZE if one_d else LUT_SIZE_2D)
+        t_grid = np.linspace(t_axis[0], t_axis[-1], size)
+        if one_d:
+            order = np.argsort(temperature)
+            return cls((t_axis[0], t_axis[-1]), np.interp(t_grid, temperature[order], log_mu[order]))
+
+        pressure = np.asarray(pressure, dtype=np.float64)
+        p_axis = np.unique(pressure)
+        if len(temperature) != len(t_axis) * len(p_axis):
+            raise ValueError("a μ(T, p) table must cover every combination of its temperatures and pressures")
+        grid = np.empty((len(t_axis), len(p_axis)))
+        grid[np.searchsorted(t_axis, temperature), np.searchsorted(p_axis, pressure)] = log_mu
+        p_grid = np.linspace(p_axis[0], p_axis[-1], size)
+        # Resample one axis at a time onto the uniform grid
+        grid = np.array([np.interp(t_grid, t_axis, column) for column in grid.T]).T
+        grid = np.array([np.interp(p_grid, p_axis, row) for row in grid])
+        return cls((t_axis[0], t_axis[-1]), grid, (p_axis[0], p_axis[-1]))
+
+    @classmethod
+    def from_csv(cls, path, size=None):
+        """Build a table from a CSV file with columns temperature (K), mu (Pa·s) and optionally pressure (Pa)"""
+        columns = {}
+        for chunk in slip_io.iter_csv_chunks(path, columns=["temperature", "pressure", "mu"], skip_missing=True):
+            for name, values in chunk.items():
+                columns.setdefault(name, []).append(values)
+        if "temperature" not in columns or "mu" not in columns:
+            raise ValueError(f"{path}: a viscosity table needs 'temperature' and 'mu' columns")
+        columns = {name: np.concatenate(parts) for name, parts in columns.items()}
+        return cls.from_points(columns["temperature"], columns["mu"], columns.get("pressure"), size)
+
+    @classmethod
+    def from_fluid(cls, name, size=None):
+        """Build a table for one of the FLUIDS"""
+        if name not in FLUIDS:
+            raise ValueError(f"unknown fluid '{name}' (known: {', '.join(sorted(FLUIDS))})")
+        temperature, mu = FLUIDS[name]
+        return cls.from_points(temperature, mu, size=size)
+
+    @classmethod
+    def from_law(cls, law, t_range, p_range=None, size=None):
+        """Tabulate another law over the given temperature (and pressure) range"""
+        size = size or (LUT_SIZE if p_range is None else LUT_SIZE_2D)
+        t_grid = np.linspace(t_range[0], t_range[1], size)
+        if p_range is None:
+            return cls(t_range, np.log(law(t_grid, DEFAULT_PRESSURE)))
+        p_grid = np.linspace(p_range[0], p_range[1], size)
+        return cls(t_range, np.log(law(t_grid[:, None], p_grid[None, :])), p_range)
+
+    @staticmethod
+    def _coordinate(values, lo, scale, n):
+        """Return (cell index, fraction within the cell) along one uniform axis of n points"""
+        x = np.empty(np.shape(values))
+        np.multiply(values, scale, out=x)
+        np.subtract(x, lo * scale, out=x)
+        np.clip(x, 0, n - 1, out=x)
+        k = x.astype(np.intp)
+        np.minimum(k, n - 2, out=k)
+        np.subtract(x, k, out=x)
+        return k, x
+
+    def __call__(self, temperature, pressure, out=None):
+        out = _output(out, temperature, pressure)
+        shape = out.shape
+        i, ft = self._coordinate(np.broadcast_to(temperature, shape), self.t_range[0], self._t_scale,
+                                 self.log_mu.shape[0])
+        if self.p_range is None:
+            cells = self._cells.take(i, axis=0)
+            np.multiply(cells[..., 1], ft, out=out)
+            np.add(out, cells[..., 0], out=out)
+        else:
+            n = self.log_mu.shape[1]
+            j, fp = self._coordinate(np.broadcast_to(pressure, shape), self.p_range[0], self._p_scale, n)
+            i *= n - 1
+            i += j
+            cells = self._cells.take(i, axis=0)
+            np.multiply(cells[..., 3], fp, out=out)
+            np.add(out, cells[..., 2], out=out)
+            np.multiply(out, ft, out=out)
+            np.multiply(cells[..., 1], fp, out=fp)
+            np.add(out, fp, out=out)
+            np.add(out, cells[..., 0], out=out)
+        np.exp(out, out=out)
+        return out
+
+    def __repr__(self):
+        axes = f"T {self.t_range[0]:g}..{self.t_range[1]:g} K"
+        if self.p_range is not None:
+            axes += f", p {self.p_range[0]:g}..{self.p_range[1]:g} Pa"
+        return f"LookupTable({axes})"
+
+
+def parse_law(spec, mu=None):
+    """Parse a temperature law: VALUE, vft:A:B:C, arrhenius:MU_REF:E:T_REF, table:FILE.csv or a fluid name.
+
+    An empty spec gives Constant(mu).
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return Constant(mu)
+    kind, _, rest = spec.partition(":")
+    kind = kind.lower()
+    params = rest.split(":") if rest else []
+    try:
+        if kind == "vft" and len(params) == 3:
+            return VFT(*map(float, params))
+        if kind == "arrhenius" and len(params) in (2, 3):
+            return Arrhenius(*map(float, params))
+        if kind == "table" and rest:
+            return LookupTable.from_csv(rest)
+        if kind in FLUIDS and not params:
+            return LookupTable.from_fluid(kind)
+        if not params and kind[:1] in "0123456789.+-":
+            return Constant(float(spec))
+    except ValueError as e:
+        raise ValueError(f"invalid viscosity law '{spec}': {e}") from None
+    raise ValueError(f"invalid viscosity law '{spec}' (expected VALUE, vft:A:B:C, arrhenius:MU_REF:E[:T_REF], "
+                     f"table:FILE.csv or {', '.join(sorted(FLUIDS))})")
+
+
+def parse_pressure_law(spec, base):
+    """Wrap a temperature law in a pressure law: barus:ALPHA or roelands:Z[:P0]; empty for none"""
+    spec = (spec or "").strip()
+    if not spec:
+        return base
+    kind, _, rest = spec.partition(":")
+    params = rest.split(":") if rest else []
+    try:
+        if kind.lower() == "barus" and len(params) == 1:
+            return Barus(float(params[0]), base)
+        if kind.lower() == "roelands" and len(params) in (1, 2):
+            return Roelands(float(params[0]), base, *map(float, params[1:]))
+    except ValueError as e:
+        raise ValueError(f"invalid pressure law '{spec}': {e}") from None
+    raise ValueError(f"invalid pressure law '{spec}' (expected barus:ALPHA or roelands:Z[:P0])")
+
+
+def evaluate_batch(gap_nm, sliding_speed, temperature, pressure, viscosity, lambda_friction, gamma_crit,
+                   exponent, out=None, mu_out=None, chunk_size=slip_batch.CHUNK_SIZE, self_consistent=False):
+    """slip_batch.evaluate_batch() with μ = viscosity(T, p) computed chunk by chunk.
+
+    Inputs broadcast together as in slip_batch.evaluate_batch(). Pass a
+    float64 array as mu_out to also keep the viscosity of every element.
+    """
+    inputs = [np.asarray(v, dtype=np.float64) for v in
+              (gap_nm, sliding_speed, temperature, pressure, lambda_friction, gamma_crit, exponent)]
+    shape = np.broadcast_shapes(*(a.shape for a in inputs))
+    if out is None:
+        out = np.empty(shape, dtype=slip_batch.RESULT_DTYPE)
+    flat = out.reshape(-1)
+    mu_flat = None if mu_out is None else mu_out.reshape(-1)
+    mu = np.empty(min(chunk_size, flat.shape[0]))
+    for start, stop, (h, U, T, p, lam, gc, m) in slip_batch.iter_chunks(inputs, shape, chunk_size):
+        k = stop - start
+        chunk_mu = mu[:k] if mu_flat is None else mu_flat[start:stop]
+        viscosity(T, p, out=chunk_mu)
+        slip_batch.evaluate_batch(h, U, chunk_mu, lam, gc, m, out=flat[start:stop], chunk_size=chunk_size,
+                                  self_consistent=self_consistent)
+    return out
@@ -0,0 +1,663 @@
+"""Slip mapping on VTK surface meshes (legacy .vtk and XML .vtu/.vtp).
+
+open_surface() scans a file for the location, type and size of every data
+array without loading any of them. It handles legacy ASCII and BINARY
+files, and XML files with ascii, inline binary and appended (raw or base64,
+optionally zlib-compressed) data. Arrays stored as raw uncompressed bytes are
+returned as read-only memory maps, so a multi-million-cell surface costs no
+memory until its values are touched. Other encodings are decoded on demand.
+
+Surface.add_cell_arrays() writes a copy of the file with extra cell arrays.
+The existing mesh and data are copied through as bytes, never parsed. For
+legacy binary and XML raw appended files, the new arrays are reserved in
+the output and handed back as writable memory maps, so results go straight
+to disk. map_slip() uses this to store bₑff, bₑff/h and the slip flag of
+every cell.
+"""
+
+import base64
+import os
+import re
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+import slip_batch
+
+DEFAULT_CHUNK = 1 << 20
+
+# Arrays written by map_slip(): name, dtype
+SLIP_ARRAYS = (("b_eff", np.dtype(np.float64)), ("ratio", np.dtype(np.float64)), ("slip", np.dtype(np.uint8)))
+
+_COPY_BLOCK = 1 << 24
+
+# Legacy type names and their (big-endian) binary dtypes
+LEGACY_TYPES = {
+    "bit": None, "unsigned_char": ">u1", "char": ">i1", "unsigned_short": ">u2", "short": ">i2",
+    "unsigned_int": ">u4", "int": ">i4", "unsigned_long": ">u8", "long": ">i8",
+    "float": ">f4", "double": ">f8", "vtktypeint64": ">i8", "vtktypeuint64": ">u8", "vtkidtype": ">i4",
+}
+
+# XML type names and their dtypes (byte order added from the file header)
+XML_TYPES = {
+    "Int8": "i1", "UInt8": "u1", "Int16": "i2", "UInt16": "u2", "Int32": "i4", "UInt32": "u4",
+    "Int64": "i8", "UInt64": "u8", "Float32": "f4", "Float64": "f8",
+}
+
+
+class VtkFormatError(ValueError):
+    """Raised when a file does not look like the expected VTK data"""
+
+
+def _legacy_type(name):
+    return np.dtype(dtype) if (dtype := LEGACY_TYPES.get(name.lower())) else None
+
+
+def _xml_type_name(dtype):
+    return {v: k for k, v in XML_TYPES.items()}[dtype.kind + str(dtype.itemsize)]
+
+
+def _legacy_type_name(dtype):
+    names = {"f8": "double", "f4": "float", "u1": "unsigned_char", "i4": "int", "i8": "vtktypeint64"}
+    return names[dtype.kind + str(dtype.itemsize)]
+
+
+def _copy_range(src, dst, start, stop):
+    """Copy bytes [start, stop) of the open file src to the open file dst"""
+    src.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        block = src.read(min(remaining, _COPY_BLOCK))
+        if not block:
+            raise VtkFormatError("file is truncated")
+        dst.write(block)
+        remaining -= len(block)
+
+
+def _parse_ascii(text, dtype, count):
+    values = np.array(text.split()[:count], dtype=dtype.newbyteorder("="))
+    if values.size != count:
+        raise VtkFormatError(f"expected {count} values, found {values.size}")
+    return values
+
+
+class DataArray:
+    """Location and layout of one array in a VTK file; values are read by data()"""
+
+    def __init__(self, surface, name, dtype, ncomp, ntuples, **where):
+        self.surface = surface
+        self.name = name
+        self.dtype = dtype
+        self.ncomp = ncomp
+        self.ntuples = ntuples
+        self.where = where
+
+    @property
+    def shape(self):
+        return (self.ntuples,) if self.ncomp == 1 else (self.ntuples, self.ncomp)
+
+    def data(self):
+        """Values as an array of self.shape; a read-only memory map when stored as raw bytes"""
+        return self.surface._read(self)
+
+    def __repr__(self):
+        return f"DataArray({self.name!r}, {self.dtype}, shape={self.shape})"
+
+
+class Surface:
+    """Common interface of legacy and XML VTK files"""
+
+    path = None
+    ncells = 0
+    npoints = 0
+    points = None
+
+    def __init__(self):
+        self.cell_data = {}
+        self.point_data = {}
+
+    def _read(self, array):
+        raise NotImplementedError
+
+    def _memmap(self, array, offset):
+        return np.memmap(self.path, dtype=array.dtype, mode="r", offset=offset, shape=array.shape)
+
+    @contextmanager
+    def add_cell_arrays(self, output, specs):
+        """Write the surface to output with extra cell arrays and yield them for filling.
+
+        specs is a sequence of (name, dtype, ncomp). The yielded dict maps each
+        name to a writable array of shape (ncells,) or (ncells, ncomp), which
+        is a memory map of the output file where the format allows.
+        """
+        if os.path.abspath(output) == os.path.abspath(self.path):
+            raise ValueError("output must differ from the input file")
+        taken = [name for name, _, _ in specs if name in self.cell_data]
+        if taken:
+            raise ValueError(f"{self.path} already has cell array(s) {', '.join(taken)}")
+        specs = [(name, np.dtype(dtype), int(ncomp)) for name, dtype, ncomp in specs]
+        arrays = self._reserve(output, specs)
+        if arrays is not None:
+            try:
+                yield arrays
+            finally:
+                for array in arrays.values():
+                    array.flush()
+            return
+        arrays = {name: np.zeros((self.ncells,) if ncomp == 1 else (self.ncells, ncomp), dtype=dtype)
+                  for name, dtype, ncomp in specs}
+        yield arrays
+        self._write(output, specs, arrays)
+
+
+class LegacySurface(Surface):
+    """Legacy .vtk file (ASCII or BINARY, any dataset type)"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = str(path)
+        self.binary = False
+        self.cell_data_end = None
+        self.has_cell_data = False
+        self._scan()
+
+    def _scan(self):
+        with open(self.path, "rb") as f:
+            if not f.readline().startswith(b"# vtk DataFile"):
+                raise VtkFormatError(f"{self.path}: not a legacy VTK file")
+            f.readline()
+            self.binary = f.readline().strip().upper() == b"BINARY"
+            section = None
+            while True:
+                start = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                words = line.split()
+                if not words:
+                    continue
+                key = words[0].upper().decode()
+                if key in ("POINT_DATA", "CELL_DATA"):
+                    if section == "CELL_DATA":
+                        self.cell_data_end = start
+                    section = key
+                    count = int(words[1])
+                    if key == "CELL_DATA":
+                        self.ncells, self.has_cell_data = count, True
+                    else:
+                        self.npoints = count
+                    continue
+                if key == "POINTS":
+                    self.npoints = int(words[1])
+                    self.points = self._array(f, "points", words[2], 3, int(words[1]))
+                elif key in ("X_COORDINATES", "Y_COORDINATES", "Z_COORDINATES"):
+                    self._array(f, key, words[2], 1, int(words[1]))
+                elif key in ("CELLS", "VERTICES", "LINES", "POLYGONS", "TRIANGLE_STRIPS"):
+                    peek = f.tell()
+                    nxt = f.readline().split()
+                    if nxt and nxt[0].upper() == b"OFFSETS":
+                        # Version 5.1 layout: offsets and connectivity arrays
+                        self._array(f, "offsets", nxt[1].decode(), 1, int(words[1]))
+                        nxt = f.readline().split()
+                        while not nxt:
+                            nxt = f.readline().split()
+                        self._array(f, "connectivity", nxt[1].decode(), 1, int(words[2]))
+                        cells = int(words[1]) - 1
+                    else:
+                        f.seek(peek)
+                        self._array(f, key, "int", 1, int(words[2]))
+                        cells = int(words[1])
+                    if not self.has_cell_data:
+                        self.ncells += cells
+                elif key == "CELL_TYPES":
+                    self._array(f, key, "int", 1, int(words[1]))
+                elif key == "METADATA":
+                    while f.readline().strip():
+                        pass
+                elif key in ("SCALARS", "VECTORS", "NORMALS", "TENSORS", "TENSORS6", "TEXTURE_COORDINATES",
+                             "GLOBAL_IDS", "PEDIGREE_IDS", "COLOR_SCALARS", "LOOKUP_TABLE", "FIELD"):
+                    self._attribute(f, section, key, words)
+                # DATASET, DIMENSIONS, ORIGIN, SPACING, ... carry no data block
+            if section == "CELL_DATA":
+                self.cell_data_end = f.tell()
+            if self.cell_data_end is None:
+                self.cell_data_end = f.tell()
+
+    def _attribute(self, f, section, key, words):
+        n = self.ncells if section == "CELL_DATA" else self.npoints
+        target = self.cell_data if section == "CELL_DATA" else self.point_data
+        name = words[1].decode() if len(words) > 1 else ""
+        if key == "SCALARS":
+            ncomp = int(words[3]) if len(words) > 3 else 1
+            peek = f.tell()
+            if not f.readline().upper().startswith(b"LOOKUP_TABLE"):
+                f.seek(peek)
+            target[name] = self._array(f, name, words[2], ncomp, n)
+        elif key in ("VECTORS", "NORMALS"):
+            target[name] = self._array(f, name, words[2], 3, n)
+        elif key in ("TENSORS", "TENSORS6"):
+            target[name] = self._array(f, name, words[2], 9 if key == "TENSORS" else 6, n)
+        elif key == "TEXTURE_COORDINATES":
+            target[name] = self._array(f, name, words[3], int(words[2]), n)
+        elif key in ("GLOBAL_IDS", "PEDIGREE_IDS"):
+            target[name] = self._array(f, name, words[2], 1, n)
+        elif key == "COLOR_SCALARS":
+            target[name] = self._array(f, name, "unsigned_char" if self.binary else "float", int(words[2]), n)
+        elif key == "LOOKUP_TABLE":
+            self._array(f, name, "unsigned_char" if self.binary else "float", 4, int(words[2]))
+        elif key == "FIELD":
+            for _ in range(int(words[2])):
+                spec = f.readline().split()
+                while not spec:
+                    spec = f.readline().split()
+                if spec[-1].upper() == b"NULL_ARRAY":
+                    continue
+                array_name = spec[0].decode()
+                target[array_name] = self._array(f, array_name, spec[3].decode(), int(spec[1]), int(spec[2]))
+                peek = f.tell()
+                if not f.readline().upper().startswith(b"METADATA"):
+                    f.seek(peek)
+                else:
+                    while f.readline().strip():
+                        pass
+
+    def _array(self, f, name, type_name, ncomp, ntuples):
+        """Record the array starting at the current position and move past it"""
+        dtype = _legacy_type(type_name.decode() if isinstance(type_name, bytes) else type_name)
+        if dtype is None:
+            raise VtkFormatError(f"{self.path}: unsupported data type '{type_name}'")
+        array = DataArray(self, name, dtype, ncomp, ntuples, offset=f.tell())
+        count = ncomp * ntuples
+        if self.binary:
+            f.seek(count * dtype.itemsize, os.SEEK_CUR)
+        else:
+            seen = 0
+            while seen < count:
+                line = f.readline()
+                if not line:
+                    raise VtkFormatError(f"{self.path}: array '{name}' is truncated")
+                seen += len(line.split())
+        return array
+
+    def _read(self, array):
+        if self.binary:
+            return self._memmap(array, array.where["offset"])
+        count = array.ncomp * array.ntuples
+        with open(self.path, "rb") as f:
+            f.seek(array.where["offset"])
+            chunks, seen = [], 0
+            while seen < count:
+                line = f.readline()
+                if not line:
+                    break
+                chunks.append(line)
+                seen += len(line.split())
+        return _parse_ascii(b"".join(chunks), array.dtype, count).reshape(array.shape)
+
+    def _headers(self, specs):
+        for name, dtype, ncomp in specs:
+            yield name, dtype, f"SCALARS {name} {_legacy_type_name(dtype)} {ncomp}\nLOOKUP_TABLE default\n".encode()
+
+    def _prefix(self, src, dst):
+        _copy_range(src, dst, 0, self.cell_data_end)
+        src.seek(self.cell_data_end - 1)
+        if self.cell_data_end and src.read(1) != b"\n":
+            dst.write(b"\n")
+        if not self.has_cell_data:
+            dst.write(f"CELL_DATA {self.ncells}\n".encode())
+
+    def _reserve(self, output, specs):
+        if not self.binary:
+            return None
+        arrays = {}
+        with open(self.path, "rb") as src, open(output, "wb") as dst:
+            self._prefix(src, dst)
+            layout = []
+            for name, dtype, header in self._headers(specs):
+                ncomp = next(c for n, _, c in specs if n == name)
+                dst.write(header)
+                layout.append((name, dtype.newbyteorder(">"), ncomp, dst.tell()))
+                dst.seek(self.ncells * ncomp * dtype.itemsize, os.SEEK_CUR)
+                dst.write(b"\n")
+            src.seek(0, os.SEEK_END)
+            _copy_range(src, dst, self.cell_data_end, src.tell())
+        for name, dtype, ncomp, offset in layout:
+            shape = (self.ncells,) if ncomp == 1 else (self.ncells, ncomp)
+            arrays[name] = np.memmap(output, dtype=dtype, mode="r+", offset=offset, shape=shape)
+        return arrays
+
+    def _write(self, output, specs, arrays):
+        with open(self.path, "rb") as src, open(output, "wb") as dst:
+            self._prefix(src, dst)
+            for name, dtype, header in self._headers(specs):
+                dst.write(header)
+                values = arrays[name].reshape(self.ncells, -1)
+                as_text = repr if dtype.kind == "f" else str
+                dst.write("\n".join(" ".join(map(as_text, row)) for row in values.tolist()).encode())
+                dst.write(b"\n")
+            src.seek(0, os.SEEK_END)
+            _copy_range(src, dst, self.cell_data_end, src.tell())
+
+
+_ATTR = re.compile(rb'([\w:]+)\s*=\s*"([^"]*)"')
+
+
+def _attrs(tag):
+    return {k.decode(): v.decode() for k, v in _ATTR.findall(tag)}
+
+
+class XmlSurface(Surface):
+    """XML UnstructuredGrid (.vtu) or PolyData (.vtp) file with a single piece"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = str(path)
+        self._scan()
+
+    def _scan(self):
+        with open(self.path, "rb") as f:
+            head = b""
+            marker = -1
+            while marker < 0:
+                block = f.read(_COPY_BLOCK)
+                if not block:
+                    break
+                head += block
+                marker = head.find(b"<AppendedData")
+            self.size = f.seek(0, os.SEEK_END)
+        self.data_start = None
+        if marker >= 0:
+            tag_end = head.index(b">", marker)
+            self.appended = _attrs(head[marker:tag_end])
+            self.data_start = head.index(b"_", tag_end) + 1
+            head = head[:marker]
+        self.head = head
+
+        root = re.search(rb"<VTKFile[^>]*>", head)
+        if root is None:
+            raise VtkFormatError(f"{self.path}: not a VTK XML file")
+        root = _attrs(root.group(0))
+        self.kind = root.get("type")
+        if self.kind not in ("UnstructuredGrid", "PolyData"):
+            raise VtkFormatError(f"{self.path}: unsupported XML dataset type {self.kind}")
+        self.order = ">" if root.get("byte_order") == "BigEndian" else "<"
+        self.header_dtype = np.dtype(self.order + XML_TYPES[root.get("header_type", "UInt32")])
+        self.compressed = "compressor" in root
+        if self.compressed and "ZLib" not in root["compressor"]:
+            raise VtkFormatError(f"{self.path}: unsupported compressor {root['compressor']}")
+
+        pieces = re.findall(rb"<Piece[^>]*>", head)
+        if len(pieces) != 1:
+            raise VtkFormatError(f"{self.path}: expected one Piece, found {len(pieces)}")
+        piece = _attrs(pieces[0])
+        self.npoints = int(piece.get("NumberOfPoints", 0))
+        self.ncells = sum(int(piece.get(key, 0)) for key in
+                          ("NumberOfCells", "NumberOfVerts", "NumberOfLines", "NumberOfStrips", "NumberOfPolys"))
+
+        self.arrays = []
+        for section in ("PointData", "CellData", "Points"):
+            match = re.search(rb"<%s\b[^>]*?(/>|>(.*?)</%s>)" % (section.encode(), section.encode()), head, re.S)
+            if section == "CellData":
+                self.cell_data_tag = match
+            if match is None or match.group(2) is None:
+                continue
+            body_start = match.start(2)
+            for array in re.finditer(rb"<DataArray\b([^>]*?)(/>|>(.*?)</DataArray>)", match.group(2), re.S):
+                a = _attrs(array.group(1))
+                n = self.ncells if section == "CellData" else self.npoints
+                ncomp = int(a.get("NumberOfComponents", 1))
+                inline = (body_start + array.start(3), body_start + array.end(3)) if array.group(3) else None
+                data = DataArray(self, a.get("Name", ""), np.dtype(self.order + XML_TYPES[a["type"]]), ncomp, n,
+                                 format=a.get("format", "ascii"), offset=int(a.get("offset", 0)), inline=inline)
+                self.arrays.append(data)
+                if section == "Points":
+                    self.points = data
+                else:
+                    (self.cell_data if section == "CellData" else self.point_data)[data.name] = data
+
+        # End of the appended data: past the last appended block of any array in the file
+        self.appended_end = self.data_start
+        if self.data_start is not None:
+            raw = self.appended.get("encoding", "raw") == "raw"
+            with open(self.path, "rb") as f:
+                for tag in re.finditer(rb"<DataArray\b[^>]*>", head):
+                    a = _attrs(tag.group(0))
+                    if a.get("format") == "appended":
+                        start = self.data_start + int(a.get("offset", 0))
+                        self.appended_end = max(self.appended_end, start + self._block_size(f, start, raw))
+
+    def _base64_header(self, text):
+        """Decoded header words of a base64 block and the number of characters they take"""
+        size = self.header_dtype.itemsize
+        first = np.frombuffer(base64.b64decode(text[:_b64_len(size)])[:size], self.header_dtype)
+        words = 1 if not self.compressed else 3 + int(first[0])
+        if not self.compressed:
+            # Header and data share one base64 run
+            return first, 0
+        length = _b64_len(size * words)
+        return np.frombuffer(base64.b64decode(text[:length]), self.header_dtype), length
+
+    def _block_size(self, f, start, raw):
+        """Stored size of the appended block at start, header included"""
+        size = self.header_dtype.itemsize
+        f.seek(start)
+        if raw:
+            if not self.compressed:
+                return size + int(np.frombuffer(f.read(size), self.header_dtype)[0])
+            nblocks = int(np.frombuffer(f.read(size), self.header_dtype)[0])
+            f.seek(start)
+            header = np.frombuffer(f.read(size * (3 + nblocks)), self.header_dtype)
+            return size * (3 + nblocks) + int(header[3:].sum())
+        header, length = self._base64_header(f.read(_b64_len(size * 4) + (1 << 16)))
+        if not self.compressed:
+            return _b64_len(size + int(header[0]))
+        if length > _b64_len(size * 4) + (1 << 16):
+            f.seek(start)
+            header, length = self._base64_header(f.read(length))
+        return length + _b64_len(int(header[3:].sum()))
+
+    def _read(self, array):
+        fmt = array.where["format"]
+        count = array.ncomp * array.ntuples
+        if fmt == "ascii":
+            start, stop = array.where["inline"]
+            return _parse_ascii(self.head[start:stop], array.dtype, count).reshape(array.shape)
+        if fmt == "binary":
+            start, stop = array.where["inline"]
+            raw = self._decode_base64(b"".join(self.head[start:stop].split()))
+        else:
+            start = self.data_start + array.where["offset"]
+            raw_encoding = self.appended.get("encoding", "raw") == "raw"
+            if raw_encoding and not self.compressed:
+                return self._memmap(array, start + self.header_dtype.itemsize)
+            with open(self.path, "rb") as f:
+                stored = self._block_size(f, start, raw_encoding)
+                f.seek(start)
+                block = f.read(stored)
+            raw = self._decode_raw(block) if raw_encoding else self._decode_base64(block)
+        return np.frombuffer(raw, dtype=array.dtype, count=count).reshape(array.shape)
+
+    def _decode_raw(self, block):
+        """Data bytes of a compressed raw block"""
+        size = self.header_dtype.itemsize
+        nblocks = int(np.frombuffer(block[:size], self.header_dtype)[0])
+        sizes = np.frombuffer(block[3 * size:(3 + nblocks) * size], self.header_dtype)
+        return self._inflate(block[(3 + nblocks) * size:], sizes)
+
+    def _decode_base64(self, text):
+        """Data bytes of a base64 block"""
+        header, length = self._base64_header(text)
+        if not self.compressed:
+            size = self.header_dtype.itemsize
+            return base64.b64decode(text[:_b64_len(size + int(header[0]))])[size:]
+        return self._inflate(base64.b64decode(text[length:length + _b64_len(int(header[3:].sum()))]), header[3:])
+
+    @staticmethod
+    def _inflate(data, sizes):
+        out, position = [], 0
+        for n in sizes.tolist():
+            out.append(zlib.decompress(data[position:position + n]))
+            position += n
+        return b"".join(out)
+
+    def _new_tags(self, specs, fmt, offsets=None):
+        tags = []
+        for i, (name, dtype, ncomp) in enumerate(specs):
+            where = f'format="{fmt}"' + (f' offset="{offsets[i]}"' if offsets is not None else "")
+            tags.append(f'<DataArray type="{_xml_type_name(dtype)}" Name="{name}" '
+                        f'NumberOfComponents="{ncomp}" {where}'.encode())
+        return tags
+
+    def _head_with(self, tags):
+        """Header bytes (up to the appended data) with tags added to the CellData of the piece"""
+        if self.cell_data_tag is not None and self.cell_data_tag.group(2) is not None:
+            at = self.cell_data_tag.end(2)
+            return self.head[:at] + b"".join(tags) + self.head[at:]
+        block = b"<CellData>" + b"".join(tags) + b"</CellData>\n"
+        if self.cell_data_tag is not None:
+            return self.head[:self.cell_data_tag.start()] + block + self.head[self.cell_data_tag.end():]
+        at = re.search(rb"<(Points|Cells|Verts|Lines|Strips|Polys)\b", self.head).start()
+        return self.head[:at] + block + self.head[at:]
+
+    def _reserve(self, output, specs):
+        if self.data_start is None or self.compressed or self.appended.get("encoding", "raw") != "raw":
+            return None
+        hsize = self.header_dtype.itemsize
+        offsets, layout = [], []
+        position = self.appended_end - self.data_start
+        for name, dtype, ncomp in specs:
+            nbytes = self.ncells * ncomp * dtype.itemsize
+            offsets.append(position)
+            layout.append((name, dtype.newbyteorder(self.order), ncomp, nbytes))
+            position += hsize + nbytes
+        tags = [tag + b"/>\n" for tag in self._new_tags(specs, "appended", offsets)]
+        head = self._head_with(tags)
+        with open(self.path, "rb") as src, open(output, "wb") as dst:
+            dst.write(head)
+            _copy_range(src, dst, len(self.head), self.appended_end)
+            starts = []
+            for name, dtype, ncomp, nbytes in layout:
+                dst.write(np.array([nbytes], dtype=self.header_dtype).tobytes())
+                starts.append(dst.tell())
+                dst.seek(nbytes, os.SEEK_CUR)
+            _copy_range(src, dst, self.appended_end, self.size)
+        arrays = {}
+        for (name, dtype, ncomp, _), start in zip(layout, starts):
+            shape = (self.ncells,) if ncomp == 1 else (self.ncells, ncomp)
+            arrays[name] = np.memmap(output, dtype=dtype, mode="r+", offset=start, shape=shape)
+        return arrays
+
+    def _encode(self, values):
+        """Binary block of an array: header and data, zlib-compressed if the file is"""
+        raw = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder(self.order)).tobytes()
+        if not self.compressed:
+            return np.array([len(raw)], dtype=self.header_dtype).tobytes(), raw
+        block = 1 << 15
+        pieces = [zlib.compress(raw[i:i + block]) for i in range(0, len(raw), block)] or [b""]
+        last = len(raw) - block * (len(pieces) - 1) if raw else 0
+        header = [len(pieces), block, last] + [len(p) for p in pieces]
+        return np.array(header, dtype=self.header_dtype).tobytes(), b"".join(pieces)
+
+    def _write(self, output, specs, arrays):
+        if self.data_start is not None:
+            # Append base64 or compressed blocks after the existing appended data
+            base64_encoded = self.appended.get("encoding", "raw") != "raw"
+            blocks, offsets = [], []
+            position = self.appended_end - self.data_start
+            for name, _, _ in specs:
+                header, data = self._encode(arrays[name])
+                block = (base64.b64encode(header) + base64.b64encode(data)
+                         if base64_encoded and self.compressed else
+                         base64.b64encode(header + data) if base64_encoded else header + data)
+                offsets.append(position)
+                blocks.append(block)
+                position += len(block)
+            tags = [tag + b"/>\n" for tag in self._new_tags(specs, "appended", offsets)]
+            with open(self.path, "rb") as src, open(output, "wb") as dst:
+                dst.write(self._head_with(tags))
+                _copy_range(src, dst, len(self.head), self.appended_end)
+                for block in blocks:
+                    dst.write(block)
+                _copy_range(src, dst, self.appended_end, self.size)
+            return
+
+        # Inline data: follow the format of the existing arrays
+        fmt = "binary" if any(a.where["format"] == "binary" for a in self.arrays) else "ascii"
+        tags = []
+        for tag, (name, dtype, _) in zip(self._new_tags(specs, fmt), specs):
+            values = arrays[name]
+            if fmt == "binary":
+                header, data = self._encode(values)
+                body = (base64.b64encode(header) + base64.b64encode(data) if self.compressed
+                        else base64.b64encode(header + data))
+            else:
+                as_text = repr if dtype.kind == "f" else str
+                body = " ".join(map(as_text, values.ravel().tolist())).encode()
+            tags.append(tag + b">\n" + body + b"\n</DataArray>\n")
+        with open(output, "wb") as dst:
+            dst.write(self._head_with(tags))
+
+
+def _b64_len(nbytes):
+    return 4 * -(-nbytes // 3)
+
+
+def open_surface(path):
+    """Open a legacy .vtk or XML .vtu/.vtp file"""
+    with open(path, "rb") as f:
+        start = f.read(64)
+    if start.startswith(b"# vtk DataFile"):
+        return LegacySurface(path)
+    if b"<" in start:
+        return XmlSurface(path)
+    raise VtkFormatError(f"{path}: not a VTK file")
+
+
+def _magnitude(values):
+    if values.ndim == 1:
+        return values
+    return np.sqrt(np.einsum("ij,ij->i", values, values, dtype=np.float64))
+
+
+def map_slip(path, output, mu, lambda_friction, gamma_crit, exponent, gap_array=None, gap_nm=None,
+             speed_array=None, sliding_speed=None, prefix="", chunk=DEFAULT_CHUNK, progress=None):
+    """Evaluate the slip model on every cell of a surface and write the results as cell arrays.
+
+    The gap comes from the cell array gap_array (metres) or the constant gap_nm,
+    the sliding speed from the magnitude of speed_array or the constant
+    sliding_speed. Writes prefix + b_eff, ratio and slip (0/1) to output and
+    returns the number of cells.
+    """
+    surface = open_surface(path)
+    n = surface.ncells
+
+    def source(name, constant, what):
+        if name is None:
+            if constant is None:
+                raise ValueError(f"give a {what} cell array or a constant {what}")
+            return None, float(constant)
+        if name not in surface.cell_data:
+            raise ValueError(f"{path} has no cell array '{name}' (cell arrays: {', '.join(surface.cell_data)})")
+        return surface.cell_data[name].data(), None
+
+    gaps, gap_value = source(gap_array, gap_nm, "gap")
+    speeds, speed_value = source(speed_array, sliding_speed, "sliding speed")
+
+    specs = [(prefix + name, dtype, 1) for name, dtype in SLIP_ARRAYS]
+    buffer = np.empty(min(chunk, max(n, 1)), dtype=slip_batch.RESULT_DTYPE)
+    with surface.add_cell_arrays(output, specs) as out:
+        b_eff, ratio, slip = (out[name] for name, _, _ in specs)
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            # Constants are broadcast to the chunk so that the result has the shape of out
+            h = gaps[start:stop] * 1e9 if gaps is not None else np.broadcast_to(gap_value, (stop - start,))
+            U = _magnitude(speeds[start:stop]) if speeds is not None else np.broadcast_to(speed_value, (stop - start,))
+            result = slip_batch.evaluate_batch(h, U, mu, lambda_friction, gamma_crit, exponent,
+                                               out=buffer[:stop - start])
+            b_eff[start:stop] = result["b_eff"]
+            ratio[start:stop] = result["ratio"]
+            slip[start:stop] = result["slip"]
+            if progress is not None:
+                progress(stop - start)
+    return n
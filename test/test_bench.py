@@ -0,0 +1,46 @@
+import slip_bench
+
+MACHINE = "host x86_64 1 cpu"
+
+
+def record(rate, peak_mb, quick=False, machine=MACHINE):
+    return {"machine": machine, "quick": quick,
+            "results": {"batch_1k": {"rate": rate, "peak_mb": peak_mb, "unit": "rows", "seconds": 1.0,
+                                     "items": rate}}}
+
+
+def test_compare_uses_median_of_comparable_runs():
+    history = [record(100.0, 10.0), record(90.0, 10.0), record(110.0, 10.0),
+               record(1.0, 1.0, quick=True), record(1.0, 1.0, machine="other")]
+    row, = slip_bench.compare(record(95.0, 10.0), history)
+    assert row["baseline_rate"] == 100.0
+    assert row["baseline_peak_mb"] == 10.0
+    assert row["regressed"] == []
+
+
+def test_compare_flags_regressions():
+    history = [record(100.0, 10.0)]
+    row, = slip_bench.compare(record(70.0, 20.0), history, threshold=0.2, memory_threshold=0.25)
+    assert row["regressed"] == ["rate", "peak_mb"]
+    row, = slip_bench.compare(record(85.0, 10.5), history, threshold=0.2, memory_threshold=0.25)
+    assert row["regressed"] == []
+
+
+def test_compare_without_history():
+    assert slip_bench.compare(record(1.0, 1.0), []) == []
+
+
+def test_history_round_trip(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    assert slip_bench.read_history(path) == []
+    slip_bench.append_history(path, record(100.0, 10.0))
+    slip_bench.append_history(path, record(90.0, 10.0))
+    assert [r["results"]["batch_1k"]["rate"] for r in slip_bench.read_history(path)] == [100.0, 90.0]
+
+
+def test_run_suite_quick():
+    result = slip_bench.run_suite(["scalar_evaluate", "batch_1k"], quick=True, repeat=1)
+    assert list(result["results"]) == ["scalar_evaluate", "batch_1k"]
+    for name, values in result["results"].items():
+        assert values["rate"] > 0 and values["peak_mb"] >= 0
+    assert "batch_1k" in slip_bench.format_report(result, slip_bench.compare(result, [result]))
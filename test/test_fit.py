@@ -0,0 +1,32 @@
+import numpy as np
+
+import slip_fit
+
+
+def synthetic(k, n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    dataset = np.repeat(np.arange(k), n).astype(np.float64)
+    rate = 10**rng.uniform(4, 10, k * n)
+    b0 = np.repeat(10**rng.uniform(-10, -8, k), n)
+    gamma_crit = np.repeat(10**rng.uniform(6, 9, k), n)
+    exponent = np.repeat(rng.uniform(0.5, 3, k), n)
+    b_eff = b0 * (1 + (rate / gamma_crit)**exponent) * np.exp(rng.normal(0, 0.02, k * n))
+    return rate, b_eff, dataset, b0[::n], gamma_crit[::n], exponent[::n]
+
+
+def test_fit_recovers_parameters():
+    rate, b_eff, dataset, b0, gamma_crit, exponent = synthetic(20)
+    fits = slip_fit.fit_datasets(rate, b_eff, dataset)
+    assert fits["converged"].all()
+    np.testing.assert_allclose(fits["b0"], b0, rtol=0.1)
+    np.testing.assert_allclose(fits["exponent"], exponent, rtol=0.1)
+
+
+def test_rows_fit_independently():
+    # Converged rows leave the working arrays; the others must not notice
+    rate, b_eff, dataset = synthetic(30)[:3]
+    together = slip_fit.fit_datasets(rate, b_eff, dataset)
+    for k in (0, 7, 29):
+        alone = slip_fit.fit_datasets(rate[dataset == k], b_eff[dataset == k])
+        for name in ("b0", "gamma_crit", "exponent", "rms"):
+            assert together[name][k] == alone[name][0]
@@ -0,0 +1,125 @@
+"""The example exports 1.txt and 2.txt as golden fixtures of v1.01's values and formatting"""
+
+import datetime
+import os
+import re
+
+import numpy as np
+import pytest
+
+import slip_batch
+import slip_export
+import slip_ingest
+import slip_io
+import slip_model
+
+FIXTURES = [os.path.join(os.path.dirname(__file__), name) for name in ("1.txt", "2.txt")]
+AUTHOR = "Le Lu (lulelaboratory@gmail.com)"
+FLOAT_FIELDS = [name for name in slip_model.SlipResult._fields if name != "slip"]
+
+
+def load(path):
+    """Text of a fixture, the input values as written and its generation time"""
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    raw = {}
+    for name, (label, unit) in slip_export.REPORT_INPUTS.items():
+        raw[name] = re.search(rf"^{re.escape(label)}: (\S+){re.escape(unit)}$", text, re.M).group(1)
+    generated = datetime.datetime.strptime(re.search(r"^Generated: (.+)$", text, re.M).group(1),
+                                           "%Y-%m-%d %H:%M:%S")
+    return text, raw, generated
+
+
+def evaluate(raw):
+    return slip_model.evaluate(*[float(raw[name]) for name in slip_model.INPUT_NAMES])
+
+
+def batch_results(rows):
+    """SlipResults of the batch path for rows of inputs"""
+    inputs = [np.array(column, dtype=np.float64) for column in zip(*rows)]
+    out = slip_batch.evaluate_batch(*inputs)
+    gap_m = slip_model.nm_to_m(inputs[0])
+    return [slip_model.SlipResult(*row, gap_m[i], *[out[name][i].item() for name in slip_batch.RESULT_DTYPE.names])
+            for i, row in enumerate(rows)]
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_report_is_byte_identical(path):
+    text, raw, generated = load(path)
+    report = slip_export.format_report(evaluate(raw), author=AUTHOR, generated=generated, inputs=raw)
+    assert report == text
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_gui_export_is_byte_identical(tmp_path, path):
+    # Export Results: the GUI evaluates the Entry strings and passes them to slip_export.export() as inputs
+    text, entries, generated = load(path)
+    result = slip_model.evaluate(**{name: float(entries[name]) for name in slip_model.INPUT_NAMES})
+    report = tmp_path / "report.txt"
+    slip_export.export(str(report), result, author=AUTHOR, app_name="Slip/No-Slip Estimator",
+                       progress=lambda n: None, inputs=entries, generated=generated)
+    assert report.read_bytes() == text.encode("utf-8")
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_batch_path_matches_scalar(path):
+    text, raw, generated = load(path)
+    scalar = evaluate(raw)
+    batch, = batch_results([scalar[:len(slip_model.INPUT_NAMES)]])
+    assert batch == scalar
+    assert slip_export.format_results(batch) == slip_export.format_results(scalar)
+    assert slip_export.format_report(batch, author=AUTHOR, generated=generated, inputs=raw) == text
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_ingested_report_matches_model(path):
+    text, raw, generated = load(path)
+    scalar = evaluate(raw)
+    record = slip_ingest.parse_report(text)
+    for name in slip_model.INPUT_NAMES:
+        assert record[name] == float(raw[name])
+    # Reports hold results to four significant digits
+    for name in slip_export.REPORT_RESULTS:
+        if name in record:
+            assert record[name] == pytest.approx(getattr(scalar, name), rel=5e-4)
+    assert record["slip"] == scalar.slip
+    assert record["generated"] == generated.timestamp()
+
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl"])
+def test_exports_round_trip_fixture_values(tmp_path, extension):
+    results = [evaluate(load(path)[1]) for path in FIXTURES]
+    path = str(tmp_path / ("results" + extension))
+    slip_export.export(path, results)
+    if extension == ".csv":
+        chunk, = slip_io.iter_table_chunks(path)
+        rows = {name: chunk[name] for name in slip_model.SlipResult._fields}
+    else:
+        import json
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        rows = {name: [r[name] for r in records] for name in slip_model.SlipResult._fields}
+    for name in FLOAT_FIELDS:
+        assert list(rows[name]) == [getattr(r, name) for r in results]
+    assert [bool(v) for v in rows["slip"]] == [r.slip for r in results]
+
+
+def test_batch_path_close_to_scalar():
+    # The batch path uses NumPy's vectorized power, which may round the last bit differently from libm;
+    # that rounding only reaches the slip lengths and the ratio
+    rng = np.random.default_rng(1)
+    n = 2000
+    inputs = [10**rng.uniform(-1, 4, n), 10**rng.uniform(-4, 3, n), 10**rng.uniform(-5, 0, n),
+              10**rng.uniform(4, 10, n), 10**rng.uniform(4, 10, n), rng.uniform(0, 5, n)]
+    rows = list(zip(*[a.tolist() for a in inputs]))
+    scalar = [slip_model.evaluate(*row) for row in rows]
+    batch = batch_results(rows)
+    for name in FLOAT_FIELDS:
+        actual = np.array([getattr(r, name) for r in batch])
+        expected = np.array([getattr(r, name) for r in scalar])
+        if name in ("b_eff", "ratio"):
+            np.testing.assert_array_max_ulp(actual, expected, maxulp=4)
+        else:
+            np.testing.assert_array_equal(actual, expected)
+    assert [r.slip for r in batch] == [r.slip for r in scalar]
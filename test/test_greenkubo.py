@@ -0,0 +1,28 @@
+import numpy as np
+
+import slip_greenkubo
+
+
+def correlated_forces(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(size=(n, 2))
+    forces = np.empty_like(noise)
+    forces[0] = noise[0]
+    for i in range(1, n):
+        forces[i] = 0.9 * forces[i - 1] + noise[i]
+    return forces + 3.0
+
+
+def chunked(forces, size):
+    return (forces[i:i + size] for i in range(0, len(forces), size))
+
+
+def test_first_pass_mean_makes_result_independent_of_chunking():
+    forces = correlated_forces()
+    mean = slip_greenkubo.mean_force(chunked(forces, 777))
+    np.testing.assert_allclose(mean, forces.mean(axis=0))
+    results = [slip_greenkubo.run_green_kubo(chunked(forces, size), 1.0, 1.0, 1.0, max_lag=200, block=2000,
+                                             mean=mean)
+               for size in (333, 4096, len(forces))]
+    for result in results[1:]:
+        np.testing.assert_allclose(result["lambda_friction"], results[0]["lambda_friction"], rtol=1e-12)
@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pytest
+
+import slip_batch
+import slip_openfoam
+
+BOUNDARY = """FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       polyBoundaryMesh;
+    object      boundary;
+}
+
+1
+(
+    wall
+    {
+        type            wall;
+        nFaces          3;
+        startFace       10;
+    }
+)
+"""
+
+FIELD = """FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       %s;
+    object      %s;
+}
+
+dimensions      [0 0 0 0 0 0 0];
+
+internalField   uniform 0;
+
+boundaryField
+{
+    wall
+    {
+        type            fixedValue;
+        value           nonuniform List<%s> 3(%s);
+    }
+}
+"""
+
+MODEL = (1e-3, 1e7, 1e7)
+RATES = np.array([1e6, 2e7, 5e8])
+GAPS_M = np.array([50e-9, 100e-9, 400e-9])
+
+
+def make_case(root, region=None):
+    """A one-patch case with wall speed U, wall shear rate gammaDot and gap height h (m) at time 0"""
+    mesh = os.path.join(root, "constant", *([region] if region else []), "polyMesh")
+    directory = os.path.join(root, "0", *([region] if region else []))
+    os.makedirs(mesh)
+    os.makedirs(directory)
+    with open(os.path.join(mesh, "boundary"), "w") as f:
+        f.write(BOUNDARY)
+    fields = {"U": ("volVectorField", "vector", " ".join(f"({v!r} 0 0)" for v in (RATES * GAPS_M).tolist())),
+              "gammaDot": ("volScalarField", "scalar", " ".join(map(repr, RATES.tolist()))),
+              "h": ("volScalarField", "scalar", " ".join(map(repr, GAPS_M.tolist())))}
+    for name, (cls, kind, values) in fields.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(FIELD % (cls, name, kind, values))
+    return directory
+
+
+def patch_values(path):
+    return np.concatenate(list(slip_openfoam.iter_patch_values(path, "wall", 3)))
+
+
+def test_region_field_location(tmp_path):
+    make_case(str(tmp_path), "fluid")
+    path, = slip_openfoam.write_slip_fields(str(tmp_path), ["wall"], *MODEL, 2.0, region="fluid",
+                                            speed_field="U", gap_nm=100.0)
+    assert path == str(tmp_path / "0" / "fluid" / "slipLength")
+    with open(path) as f:
+        assert '    location    "0/fluid";\n' in f.read()
+
+
+@pytest.mark.parametrize("exponent", [2.0, -0.5])
+@pytest.mark.parametrize("gap", ["constant", "field"])
+def test_shear_rate_field(tmp_path, gap, exponent):
+    directory = make_case(str(tmp_path))
+    gap_options = {"gap_nm": 100.0} if gap == "constant" else {"gap_field": "h"}
+    gaps_nm = np.full(3, 100.0) if gap == "constant" else GAPS_M * 1e9
+    slip_openfoam.write_slip_fields(str(tmp_path), ["wall"], *MODEL, exponent, shear_rate_field="gammaDot",
+                                    ratio_field="slipRatio", **gap_options)
+    # Nominal shear rate γ = U / h, so U = γ h reproduces the wall shear rate
+    expected = slip_batch.evaluate_batch(gaps_nm, RATES * gaps_nm * 1e-9, *MODEL, exponent)
+    np.testing.assert_allclose(patch_values(os.path.join(directory, "slipLength")), expected["b_eff"], rtol=1e-12)
+    np.testing.assert_allclose(patch_values(os.path.join(directory, "slipRatio")), expected["ratio"], rtol=1e-12)
+
+
+def test_failed_write_keeps_existing_field(tmp_path):
+    directory = make_case(str(tmp_path))
+    slip_openfoam.write_slip_fields(str(tmp_path), ["wall"], *MODEL, 2.0, shear_rate_field="gammaDot",
+                                    gap_nm=100.0)
+    with open(os.path.join(directory, "slipLength"), "rb") as f:
+        before = f.read()
+    with pytest.raises(OSError):
+        slip_openfoam.write_slip_fields(str(tmp_path), ["wall"], *MODEL, 3.0, shear_rate_field="gammaDot",
+                                        gap_field="missing")
+    with open(os.path.join(directory, "slipLength"), "rb") as f:
+        assert f.read() == before
+    assert not [name for name in os.listdir(directory) if name.endswith(".tmp")]
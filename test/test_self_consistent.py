@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+import slip_batch
+import slip_model
+
+
+def random_cases(n, low, high, seed=0):
+    rng = np.random.default_rng(seed)
+    return (10**rng.uniform(-4, 3, n), 10**rng.uniform(-10, -5, n), 10**rng.uniform(-12, -6, n),
+            10**rng.uniform(4, 10, n), rng.uniform(low, high, n))
+
+
+def relative_residual(rate, speed, gap_m, b0, gamma_crit, exponent):
+    return np.abs(rate * (gap_m + 2 * b0 * (1 + (rate / gamma_crit)**exponent)) - speed) / speed
+
+
+@pytest.mark.parametrize("low, high", [(0, 5), (-0.95, 0)])
+def test_solution_is_a_root(low, high):
+    cases = random_cases(20000, low, high)
+    rate = slip_batch.solve_shear_rate(*cases)
+    assert np.isfinite(rate).all() and (rate > 0).all()
+    assert relative_residual(rate, *cases).max() < 1e-10
+    scalar = [slip_model.self_consistent_shear_rate(*map(float, case)) for case in list(zip(*cases))[:2000]]
+    np.testing.assert_allclose(scalar, rate[:2000], rtol=1e-9)
+
+
+def test_exponent_near_minus_one_converges():
+    # The root may lie below the smallest float; it then rounds to zero, never to NaN
+    cases = random_cases(20000, -0.999999, -0.95)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        rate = slip_batch.solve_shear_rate(*cases)
+        residual = relative_residual(rate, *cases)
+    assert not np.isnan(rate).any() and (rate >= 0).all()
+    normal = rate > np.finfo(float).tiny * 1e10
+    assert residual[normal].max() < 1e-10
+
+
+def test_exponent_at_most_minus_one_is_nan():
+    cases = random_cases(2000, -3, -1)
+    cases = cases[:4] + (np.append(cases[4][:-1], -1.0),)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        assert np.isnan(slip_batch.solve_shear_rate(*cases)).all()
+    assert math.isnan(slip_model.self_consistent_shear_rate(1.0, 1e-8, 1e-9, 1e7, -1.0))
+    assert math.isnan(slip_model.self_consistent_shear_rate(1.0, 1e-8, 1e-9, 1e7, -2.5))
+
+
+def test_effective_slip_length_at_zero_shear_rate():
+    # bₑff is infinite at γ = 0 for m < 0, for Python numbers and arrays alike
+    assert slip_model.effective_slip_length(1e-8, 0.0, 1e7, -0.5) == math.inf
+    with np.errstate(divide="ignore"):
+        b_eff = slip_model.effective_slip_length(1e-8, np.array([0.0, 1e7]), 1e7, -0.5)
+    np.testing.assert_array_equal(b_eff, [math.inf, 2e-8])
+    np.testing.assert_allclose(slip_model.effective_slip_length(1e-8, np.array([1e6, 2e6]), 1e7, 2.0),
+                               [1.01e-8, 1.04e-8])
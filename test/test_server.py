@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+import slip_server
+
+
+async def exchange(server, request):
+    """Send raw request bytes to a running server; returns everything it sends before closing"""
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(request)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def run(request, patch=None):
+    async def main():
+        server = slip_server.SlipServer(port=0)
+        if patch is not None:
+            patch(server)
+        await server.start()
+        try:
+            # A connection left open by a failed handler would otherwise hang the test
+            return await asyncio.wait_for(exchange(server, request), 10)
+        finally:
+            server.server.close()
+            await server.server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_calculate():
+    body = b'{"gap_nm": 100}'
+    response = run(b"POST /calculate HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%b"
+                   % (len(body), body))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert json.loads(response.split(b"\r\n\r\n", 1)[1])["ratio"] == pytest.approx(2e-3)
+
+
+@pytest.mark.parametrize("path", [b"/calculate", b"/batch"])
+@pytest.mark.parametrize("flag", ['"false"', "0", "1.0", "null"])
+def test_self_consistent_must_be_boolean(path, flag):
+    body = b'{"gap_nm": 100, "self_consistent": %b}' % flag.encode()
+    response = run(b"POST %b HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%b"
+                   % (path, len(body), body))
+    assert response.startswith(b"HTTP/1.1 400")
+    assert b"self_consistent must be true or false" in response
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-3"])
+def test_malformed_content_length(length):
+    response = run(b"POST /calculate HTTP/1.1\r\nContent-Length: %b\r\n\r\n{}" % length)
+    assert response.startswith(b"HTTP/1.1 400")
+    assert b"Content-Length" in response
+
+
+def test_stream_failure_after_headers_aborts():
+    def fail_second_chunk(server):
+        lines = server._batch_lines
+
+        def patched(columns, start, stop, self_consistent):
+            if start:
+                raise RuntimeError("disk on fire")
+            return lines(columns, start, stop, self_consistent)
+        server._batch_lines = patched
+
+    body = json.dumps({"gap_nm": [10.0] * (slip_server.STREAM_ROWS + 1)}).encode()
+    response = run(b"POST /batch HTTP/1.1\r\nContent-Length: %d\r\n\r\n%b" % (len(body), body), fail_second_chunk)
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.count(b"HTTP/1.1") == 1
+    assert not response.endswith(b"0\r\n\r\n")
@@ -0,0 +1,36 @@
+import numpy as np
+
+import slip_store
+
+DTYPE = np.dtype([("a", np.float64), ("b", np.int64)])
+
+
+def rows(start, stop):
+    return {"a": np.arange(start, stop) * 0.5, "b": np.arange(start, stop)}
+
+
+def test_small_appends_write_the_last_chunk_once(tmp_path, monkeypatch):
+    saved = []
+    save = np.save
+    monkeypatch.setattr(np, "save", lambda f, values: (saved.append(len(values)), save(f, values)))
+    store = slip_store.ResultStore.create(tmp_path / "s.store", DTYPE, chunk_rows=100)
+    for start in range(0, 250, 5):
+        store.append(rows(start, start + 5))
+    # Two full chunks, one file per column each; the last 50 rows are still in memory
+    assert saved == [100] * 4
+    np.testing.assert_array_equal(store.read(slice(180, 250))["b"], np.arange(180, 250))
+    assert len(slip_store.ResultStore(tmp_path / "s.store")) == 200
+    store.close()
+    assert saved == [100] * 4 + [50] * 2
+    np.testing.assert_array_equal(slip_store.ResultStore(tmp_path / "s.store")["b"][:], np.arange(250))
+
+
+def test_append_to_a_reopened_partial_chunk(tmp_path):
+    with slip_store.ResultStore.create(tmp_path / "s.store", DTYPE, chunk_rows=100) as store:
+        store.append(rows(0, 30))
+    with slip_store.ResultStore(tmp_path / "s.store", "r+") as store:
+        store.append(rows(30, 40))
+        store.append(rows(40, 230))
+    data = slip_store.ResultStore(tmp_path / "s.store")[:]
+    np.testing.assert_array_equal(data["b"], np.arange(230))
+    np.testing.assert_array_equal(data["a"], np.arange(230) * 0.5)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import slip_batch
+import slip_vtk
+
+# Two triangles of a unit square, with a cell array of gaps in metres
+SURFACE = """# vtk DataFile Version 3.0
+wall
+ASCII
+DATASET POLYDATA
+POINTS 4 float
+0 0 0 1 0 0 1 1 0 0 1 0
+POLYGONS 2 8
+3 0 1 2
+3 0 2 3
+CELL_DATA 2
+SCALARS gap double 1
+LOOKUP_TABLE default
+1e-8 1e-7
+"""
+
+
+@pytest.fixture
+def surface(tmp_path):
+    path = tmp_path / "wall.vtk"
+    path.write_text(SURFACE)
+    return str(path)
+
+
+@pytest.mark.parametrize("gap_array, gap_nm", [(None, 10.0), ("gap", None)])
+def test_map_slip_with_constant_speed(tmp_path, surface, gap_array, gap_nm):
+    output = str(tmp_path / "slip.vtk")
+    n = slip_vtk.map_slip(surface, output, 1e-3, 1e7, 1e7, 2, gap_array=gap_array, gap_nm=gap_nm,
+                          sliding_speed=1.0)
+    assert n == 2
+    expected = slip_batch.evaluate_batch(np.array([10.0, 10.0 if gap_nm else 100.0]), 1.0, 1e-3, 1e7, 1e7, 2)
+    cells = slip_vtk.open_surface(output).cell_data
+    np.testing.assert_array_equal(cells["ratio"].data(), expected["ratio"])
+    np.testing.assert_array_equal(cells["slip"].data(), expected["slip"])